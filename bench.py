@@ -0,0 +1,391 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from housing_market_sim import log
+from housing_market_sim.params import ENGINE_VERSIONS, SCENARIOS
+from housing_market_sim.simulation import ENGINES, get_engine
+
+# ========== 基准测试 ==========
+# 离线可复现（固定种子、不联网），结果写成 JSON，便于跨引擎、跨提交比较：
+#   python -m housing_market_sim.bench throughput --out bench.json   # 默认按 DEFAULT_BUDGETS 跳过超大用例
+#   python -m housing_market_sim.bench throughput --no-budget --out full.json   # 完整网格（Mesa 大用例需数小时）
+#   python -m housing_market_sim.bench compare old.json bench.json   # 变慢超过阈值时退出码为 1
+#   python -m housing_market_sim.bench logging --agents 20000
+#   python -m housing_market_sim.bench llm --requests 200 --latency 0.5 --concurrency 1,8,32
+#   python -m housing_market_sim.bench startup --budget 3   # 首张图超出预算时退出码为 1
+
+SIZES = (50, 1_000, 10_000, 100_000)
+HORIZONS = (100, 1_000)
+BENCH_SCENARIOS = tuple(name[:-len("_scenario")] for name in SCENARIOS)
+# 各引擎单个用例默认允许的代理步数（agents × steps）：Mesa 每秒约 3 万代理步，10 万户 × 1000 步需要一小时以上
+DEFAULT_BUDGETS = {"mesa": 200_000, "vectorized": 100_000_000}
+
+
+def _build(engine, n_agents, scenario="baseline", seed=42):
+    """ 与 simulate() 相同的参数构造模型（随机数由模型自己的 Generator 提供） """
+    return get_engine(engine)(n_agents, SCENARIOS[f"{scenario}_scenario"], seed=seed)
+
+
+def _time_run(engine, n_agents, steps, scenario="baseline", seed=42):
+    """ 构造模型并运行 steps 步（每步 step + render_model），返回耗时（秒） """
+    start = time.perf_counter()
+    model = _build(engine, n_agents, scenario, seed)
+    for _ in range(steps):
+        model.step()
+        model.render_model()
+    return time.perf_counter() - start
+
+
+# ---------- 吞吐量与内存 ----------
+def _current_rss_mb():
+    """ 当前常驻内存（MB），读取 /proc/self/statm，非 Linux 平台返回 None """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 2)
+
+
+def _run_case(case):
+    """
+    在独立子进程中运行一个用例，使峰值 RSS 只反映该用例。
+    先计时（不开 tracemalloc），再在同一进程里开 tracemalloc 重新运行一次测 Python 堆峰值。
+    """
+    engine, scenario, n_agents, steps, use_tracemalloc = (
+        case["engine"], case["scenario"], case["agents"], case["steps"], case["tracemalloc"])
+    get_engine(engine)  # 先完成导入，构造时间不含 import
+    rss_before = _current_rss_mb()
+    start = time.perf_counter()
+    model = _build(engine, n_agents, scenario)
+    construct_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(steps):
+        model.step()
+        model.render_model()
+        model.step_statistics()
+    run_s = time.perf_counter() - start
+    population = model.snapshot()["group"].size
+    del model
+    result = {
+        "construct_s": round(construct_s, 6),
+        "run_s": round(run_s, 6),
+        "steps_per_s": round(steps / run_s, 3) if run_s else None,
+        "final_population": int(population),
+        "rss_before_mb": rss_before,  # 导入完成、构造模型之前的常驻内存
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),  # Linux 下单位为 KB
+    }
+    if use_tracemalloc:
+        tracemalloc.start()
+        model = _build(engine, n_agents, scenario)
+        for _ in range(steps):
+            model.step()
+            model.render_model()
+            model.step_statistics()
+        result["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 3)
+        tracemalloc.stop()
+    return result
+
+
+def throughput_cases(engines=ENGINES, sizes=SIZES, horizons=HORIZONS, scenarios=BENCH_SCENARIOS,
+                     use_tracemalloc=True, budget=DEFAULT_BUDGETS):
+    """
+    用例网格；budget 为单个用例允许的代理步数（agents × steps）上限，可以是一个数（所有引擎）、
+    {引擎: 上限} 或 None（不限），超出的用例记为 skipped
+    """
+    for engine, scenario, n_agents, steps in itertools.product(engines, scenarios, sizes, horizons):
+        case = {"engine": engine, "scenario": scenario, "agents": n_agents, "steps": steps,
+                "tracemalloc": use_tracemalloc}
+        limit = budget.get(engine) if isinstance(budget, dict) else budget
+        case["skipped"] = limit is not None and n_agents * steps > limit
+        yield case
+
+
+def throughput(cases, on_result=None):
+    """ 逐个用例在新进程中运行，返回结果列表 """
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for case in cases:
+        row = dict(case)
+        if not case["skipped"]:
+            with ctx.Pool(1) as pool:
+                row.update(pool.apply(_run_case, (case,)))
+        results.append(row)
+        if on_result is not None:
+            on_result(row)
+    return results
+
+
+def environment():
+    """ 记录运行环境，便于比较不同机器 / 提交的结果 """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    versions = {"python": platform.python_version(), "numpy": np.__version__}
+    try:
+        import mesa
+        versions["mesa"] = mesa.__version__
+    except ImportError:
+        pass
+    return {"commit": commit, "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "platform": platform.platform(), "cpu_count": os.cpu_count(), "versions": versions,
+            "engine_versions": ENGINE_VERSIONS}
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    按 (engine, scenario, agents, steps) 对齐两份结果，
+    返回 steps/s 下降或构造时间上升超过 threshold 的用例
+    """
+    def key(row):
+        return row["engine"], row["scenario"], row["agents"], row["steps"]
+
+    old = {key(r): r for r in baseline["cases"] if not r.get("skipped")}
+    regressions = []
+    for row in current["cases"]:
+        prev = old.get(key(row))
+        if row.get("skipped") or prev is None:
+            continue
+        slower = prev["steps_per_s"] and row["steps_per_s"] < prev["steps_per_s"] * (1 - threshold)
+        construct = prev["construct_s"] and row["construct_s"] > prev["construct_s"] * (1 + threshold)
+        if slower or construct:
+            regressions.append({"case": dict(zip(("engine", "scenario", "agents", "steps"), key(row))),
+                                "steps_per_s": (prev["steps_per_s"], row["steps_per_s"]),
+                                "construct_s": (prev["construct_s"], row["construct_s"])})
+    return regressions
+
+
+# ---------- 日志开销 ----------
+def logging_overhead(n_agents=20000, steps=0, engine="mesa", repeats=3):
+    """
+    比较三种日志设置下的耗时（预热一次后取 repeats 次中的最短时间）：
+    disabled（默认 WARNING，热路径只做一次属性判断）、debug_sampled（DEBUG，每 1000 次记录一次）、
+    debug_every_call（DEBUG 且逐代理写入临时文件，相当于原来每户一行 print 的开销）。
+    """
+    _time_run(engine, min(n_agents, 1000), 1)
+    timings = {}
+    with tempfile.TemporaryFile("w") as sink:
+        for mode, level, every in (("disabled", "WARNING", log.SAMPLE_EVERY),
+                                   ("debug_sampled", "DEBUG", log.SAMPLE_EVERY),
+                                   ("debug_every_call", "DEBUG", 1)):
+            default_every = log.SAMPLE_EVERY
+            log.SAMPLE_EVERY = every
+            log.configure_logging(level, stream=sink)
+            try:
+                timings[mode] = round(min(_time_run(engine, n_agents, steps) for _ in range(repeats)), 3)
+            finally:
+                log.SAMPLE_EVERY = default_every
+                log.configure_logging("WARNING")
+    base = timings["disabled"]
+    return {"benchmark": "logging", "engine": engine, "agents": n_agents, "steps": steps, "seconds": timings,
+            "overhead_vs_disabled": {k: round(v / base - 1, 3) for k, v in timings.items() if k != "disabled"}}
+
+
+# ---------- 批量总结吞吐量 ----------
+def llm_throughput(requests=200, latency=0.5, concurrency=(1, 8, 32), tokens=64):
+    """
+    用本地替身服务（固定延迟 latency 秒）测批量总结的吞吐量：
+    每个并发度各发送 requests 条互不相同的请求（不使用缓存），记录总耗时与每秒请求数。
+    """
+    from housing_market_sim.summarize import MockBackend, run_batch
+    items = [{"key": f"bench-{i}", "run": i, "language": "English", "role": "analyst",
+              "params": {}, "messages": [{"role": "user", "content": f"bench request {i}"}]}
+             for i in range(requests)]
+    cases = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for level in concurrency:
+            out = os.path.join(tmp, f"c{level}.jsonl")
+            start = time.perf_counter()
+            stats = run_batch(items, MockBackend(latency=latency, tokens=tokens), out, concurrency=level)
+            seconds = time.perf_counter() - start
+            cases.append({"concurrency": level, "seconds": round(seconds, 3),
+                          "requests_per_s": round(stats["generated"] / seconds, 2), "failed": stats["failed"]})
+    return {"benchmark": "llm", "requests": requests, "latency_s": latency,
+            "serial_estimate_s": round(requests * latency, 3), "cases": cases}
+
+
+# ---------- 冷启动 ----------
+# 在全新子进程里模拟界面的冷启动路径：导入界面模块 → 加载图标与文本 → 默认参数模拟 → 渲染第一张图。
+# eager 模式额外预先导入旧版界面在启动时加载的绘图 / 大模型 / Mesa 可视化模块，用于对比延迟导入的收益。
+APP_IMPORTS = ("streamlit", "housing_market_sim.cache", "housing_market_sim.simulation",
+               "housing_market_sim.figures", "housing_market_sim.replicate", "housing_market_sim.llm",
+               "housing_market_sim.prompts", "housing_market_sim.resources", "housing_market_sim.results")
+EAGER_IMPORTS = ("matplotlib.pyplot", "openai", "mesa.visualization")
+STARTUP_BUDGET_S = 3.0  # 冷启动到第一张图的预算（秒）
+
+_FIRST_CHART = """
+import json, time
+t0 = time.perf_counter()
+import {imports}
+t_imports = time.perf_counter()
+from housing_market_sim.resources import get_bundle
+lang = get_bundle().translations["English"]
+t_resources = time.perf_counter()
+from housing_market_sim.params import SCENARIOS
+from housing_market_sim.simulation import simulate
+result = simulate(SCENARIOS["baseline_scenario"], 42, 50, 100)
+t_simulate = time.perf_counter()
+from housing_market_sim.figures import render_figure
+render_figure("transactions", "png", result.history, {{}}, lang)
+t_chart = time.perf_counter()
+print(json.dumps({{"imports_s": t_imports - t0, "resources_s": t_resources - t_imports,
+                  "simulate_s": t_simulate - t_resources, "first_chart_render_s": t_chart - t_simulate,
+                  "time_to_first_chart_s": t_chart - t0}}))
+"""
+
+
+def _parse_importtime(text, top=10):
+    """ 解析 -X importtime 输出：总耗时与累计耗时最多的顶层模块 """
+    total, modules = 0, []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total += int(self_us)
+        if not name[1:].startswith(" "):  # 没有缩进的是顶层导入
+            modules.append((name.strip(), int(cumulative_us)))
+    modules.sort(key=lambda m: -m[1])
+    return {"total_s": round(total / 1e6, 3),
+            "top_modules": [{"module": m, "cumulative_s": round(us / 1e6, 3)} for m, us in modules[:top]]}
+
+
+def _startup_run(imports, importtime=False):
+    code = _FIRST_CHART.format(imports=", ".join(imports))
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def startup(repeats=3, eager=True):
+    """ 冷启动耗时（每种模式取 repeats 次新进程中最短的一次）与导入耗时报告 """
+    modes = {"lazy": APP_IMPORTS}
+    if eager:
+        modes["eager"] = EAGER_IMPORTS + APP_IMPORTS
+    report = {"benchmark": "startup", "budget_s": STARTUP_BUDGET_S, "modes": {}}
+    for mode, imports in modes.items():
+        runs = [_startup_run(imports)[0] for _ in range(repeats)]
+        best = min(runs, key=lambda r: r["time_to_first_chart_s"])
+        report["modes"][mode] = {k: round(v, 3) for k, v in best.items()}
+        report["modes"][mode]["import_report"] = _parse_importtime(_startup_run(imports, importtime=True)[1])
+    if eager:
+        report["gain_s"] = round(report["modes"]["eager"]["time_to_first_chart_s"]
+                                 - report["modes"]["lazy"]["time_to_first_chart_s"], 3)
+    return report
+
+
+# ---------- 命令行 ----------
+def _int_list(text):
+    return tuple(int(v) for v in text.split(","))
+
+
+def cmd_throughput(args):
+    cases = list(throughput_cases(args.engines.split(","), args.sizes, args.horizons, args.scenarios.split(","),
+                                  use_tracemalloc=not args.no_tracemalloc,
+                                  budget=None if args.no_budget else args.budget or DEFAULT_BUDGETS))
+
+    def progress(row):
+        status = "skipped" if row["skipped"] else f"{row['steps_per_s']} steps/s, {row['peak_rss_mb']} MB"
+        print(f"{row['engine']:<10} {row['scenario']:<16} N={row['agents']:<7} T={row['steps']:<5} {status}",
+              file=sys.stderr, flush=True)
+
+    report = {"benchmark": "throughput", "environment": environment(), "cases": throughput(cases, progress)}
+    text = json.dumps(report, ensure_ascii=False, indent=1)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+def cmd_compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    print(json.dumps({"threshold": args.threshold, "regressions": regressions}, ensure_ascii=False, indent=1))
+    return 1 if regressions else 0
+
+
+def cmd_logging(args):
+    print(json.dumps(logging_overhead(args.agents, args.steps, args.engine), ensure_ascii=False))
+    return 0
+
+
+def cmd_llm(args):
+    print(json.dumps(llm_throughput(args.requests, args.latency, args.concurrency), ensure_ascii=False))
+    return 0
+
+
+def cmd_startup(args):
+    report = startup(args.repeats, eager=not args.no_eager)
+    report["budget_s"] = args.budget
+    print(json.dumps(report, ensure_ascii=False, indent=1))
+    return 1 if report["modes"]["lazy"]["time_to_first_chart_s"] > args.budget else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m housing_market_sim.bench",
+                                     description="Offline, seeded benchmarks for the housing filtering ABM.")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    tp = sub.add_parser("throughput", help="construction time, steps/s and peak memory over a grid of cases")
+    tp.add_argument("--engines", default=",".join(ENGINES), help="comma-separated engines (default: all)")
+    tp.add_argument("--sizes", type=_int_list, default=SIZES, help="comma-separated initial populations")
+    tp.add_argument("--horizons", type=_int_list, default=HORIZONS, help="comma-separated step counts")
+    tp.add_argument("--scenarios", default=",".join(BENCH_SCENARIOS), help="comma-separated preset scenarios")
+    tp.add_argument("--budget", type=float,
+                    help="skip cases with more than this many agent-steps (default: "
+                         + ", ".join(f"{k} {v:,}" for k, v in DEFAULT_BUDGETS.items()) + ")")
+    tp.add_argument("--no-budget", action="store_true", help="run every case, including hours-long Mesa runs")
+    tp.add_argument("--no-tracemalloc", action="store_true", help="skip the second, tracemalloc-instrumented run")
+    tp.add_argument("--out", help="JSON output path (default: stdout)")
+    tp.set_defaults(func=cmd_throughput)
+
+    cmp_ = sub.add_parser("compare", help="compare two throughput reports; exit 1 on regressions")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--threshold", type=float, default=0.10, help="relative slowdown tolerated (default: 0.10)")
+    cmp_.set_defaults(func=cmd_compare)
+
+    lg = sub.add_parser("logging", help="overhead of disabled vs sampled vs per-call debug logging")
+    lg.add_argument("--agents", type=int, default=20000)
+    lg.add_argument("--steps", type=int, default=0, help="steps after construction (default: construction only)")
+    lg.add_argument("--engine", choices=ENGINES, default="mesa")
+    lg.set_defaults(func=cmd_logging)
+
+    llm = sub.add_parser("llm", help="batch summarization throughput against the local mock LLM server")
+    llm.add_argument("--requests", type=int, default=200)
+    llm.add_argument("--latency", type=float, default=0.5, help="mock reply delay in seconds (default: 0.5)")
+    llm.add_argument("--concurrency", type=_int_list, default=(1, 8, 32), help="comma-separated levels")
+    llm.set_defaults(func=cmd_llm)
+
+    st = sub.add_parser("startup", help="cold start to first chart in a fresh process, with an import-time report")
+    st.add_argument("--repeats", type=int, default=3, help="fresh processes per mode; the fastest is kept")
+    st.add_argument("--budget", type=float, default=STARTUP_BUDGET_S,
+                    help=f"exit 1 if time to first chart exceeds this many seconds (default: {STARTUP_BUDGET_S})")
+    st.add_argument("--no-eager", action="store_true", help="skip the eager-import comparison run")
+    st.set_defaults(func=cmd_startup)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
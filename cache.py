@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from housing_market_sim.demography import DEFAULT_DEMOGRAPHY
+from housing_market_sim.params import ENGINE_VERSIONS, GRID_SIZE, PARAM_KEYS
+
+
+def default_cache_dir():
+    """ 本地持久缓存目录（结果库、大模型总结缓存）：环境变量 HOUSING_SIM_CACHE_DIR，否则 ~/.cache/housing_market_sim """
+    return Path(os.environ.get("HOUSING_SIM_CACHE_DIR") or Path.home() / ".cache" / "housing_market_sim")
+
+
+def demography_values(demography):
+    """ 影响模拟结果的人口动态设置：(新增户数区间, 退出概率, 稳态人口)；capacity 只影响预分配，不计入 """
+    return tuple(demography.arrivals), float(demography.exit_rate), demography.target_population
+
+
+def result_key(params, seed, n_agents, steps, engine, replicates=1, schedule=None, grid_size=GRID_SIZE,
+               demography=None):
+    """
+    模拟结果的内容哈希：九个政策参数 + 种子 + 规模 + 步数 + 引擎版本（+ 重复次数、政策路径、网格大小、人口动态）；
+    后几项取缺省值时不写入，已有的键保持不变
+    """
+    payload = {
+        "params": {k: float(params[k]) for k in PARAM_KEYS},
+        "seed": int(seed),
+        "n_agents": int(n_agents),
+        "steps": int(steps),
+        "engine": engine,
+        "engine_version": ENGINE_VERSIONS[engine],
+    }
+    if replicates > 1:
+        payload["replicates"] = int(replicates)
+    if schedule:
+        payload["schedule"] = schedule.to_dict()
+    if grid_size != GRID_SIZE:
+        payload["grid_size"] = int(grid_size)
+    if demography is not None:
+        dynamics = demography_values(demography)
+        if dynamics != demography_values(DEFAULT_DEMOGRAPHY):
+            payload["demography"] = dict(zip(("arrivals", "exit_rate", "target_population"), dynamics))
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _sizeof(value):
+    """ 粗略估计缓存条目的内存占用（字节） """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_sizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    if hasattr(value, "__dict__"):
+        return _sizeof(vars(value))
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    以内容哈希为键的模拟结果缓存，按最近最少使用（LRU）淘汰。
+    同时限制条目数与总字节数；Streamlit 各会话在不同线程中共享同一实例，所以读写加锁。
+    """
+
+    def __init__(self, max_entries=32, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        size = _sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self.nbytes -= self._sizes[key]
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._sizes[key] = size
+            self.nbytes += size
+            # 淘汰最久未使用的条目，但始终保留刚写入的这一条
+            while len(self._data) > 1 and (len(self._data) > self.max_entries or self.nbytes > self.max_bytes):
+                old_key, _ = self._data.popitem(last=False)
+                self.nbytes -= self._sizes.pop(old_key)
+
+    def get_or_compute(self, key, compute):
+        """ 命中则直接返回，否则调用 compute() 计算并写入缓存 """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
@@ -0,0 +1,67 @@
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+
+from housing_market_sim.demography import DEFAULT_DEMOGRAPHY, Demography
+from housing_market_sim.history import HISTORY_KEYS
+
+# ========== 检查点 ==========
+# 第 k 步结束时的完整模型状态：代理数组、二手房挂牌、新房供应等标量、随机数发生器状态与前 k 步 history。
+# 写成一个压缩 .npz（数组各占一项，其余放在一段 JSON 元数据里，随机数发生器状态本身可写成 JSON），
+# 读回后由 resume() / branch() 继续运行，
+# 共享前缀只需模拟一次：例如“基准情景跑到第 50 步，再分别施加不同政策冲击”。
+
+FORMAT_VERSION = 2  # 2：两个引擎都只保存 numpy Generator 的状态
+
+
+@dataclass
+class Checkpoint:
+    """ 一次模拟在第 step 步结束时的快照 """
+    engine: str
+    step: int  # 已完成的步数
+    params: dict
+    seed: int
+    n_agents: int  # 初始户数
+    demography: Demography
+    state: dict  # model.state_dict()
+    history: dict  # {字段: 前 step 步的数组}
+
+    def save(self, path):
+        """ 写成压缩 .npz """
+        arrays = {f"agents/{k}": v for k, v in self.state["agents"].items()}
+        arrays.update({f"history/{k}": np.asarray(self.history[k]) for k in HISTORY_KEYS})
+        arrays["released"] = self.state["released"]
+        meta = {
+            "format_version": FORMAT_VERSION, "engine": self.engine, "step": self.step, "params": self.params,
+            "seed": self.seed, "n_agents": self.n_agents, "demography": asdict(self.demography),
+            # 其余状态（标量、事件计数、计数器、随机数发生器）本身可以写成 JSON
+            "state": {k: v for k, v in self.state.items() if k not in ("agents", "released")},
+        }
+        arrays["meta"] = np.array(json.dumps(meta))
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        return Path(path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("format_version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported checkpoint format {meta.get('format_version')!r} in {path}")
+            agents = {k.split("/", 1)[1]: data[k] for k in data.files if k.startswith("agents/")}
+            history = {k: data[f"history/{k}"] for k in HISTORY_KEYS}
+            state = {**meta["state"], "agents": agents, "released": data["released"]}
+        demography = meta["demography"]
+        demography["arrivals"] = tuple(demography["arrivals"])
+        return cls(meta["engine"], meta["step"], meta["params"], meta["seed"], meta["n_agents"],
+                   Demography(**demography), state, history)
+
+
+def capture(model, history, step, params, seed, n_agents, demography=None):
+    """ 记录模型与 history 在第 step 步结束时的状态（数组均为副本） """
+    return Checkpoint(model.engine, step, dict(params), seed, n_agents,
+                      DEFAULT_DEMOGRAPHY if demography is None else demography,
+                      model.state_dict(), {k: np.array(history[k]) for k in HISTORY_KEYS})
+
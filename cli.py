@@ -0,0 +1,449 @@
+import argparse
+import contextlib
+import os
+import importlib.util
+import json
+import sys
+import time
+
+from housing_market_sim.checkpoint import Checkpoint
+from housing_market_sim.demography import Demography
+from housing_market_sim.log import configure_logging
+from housing_market_sim.params import GRID_SIZE, PARAM_KEYS, SCENARIOS
+from housing_market_sim.policy import PolicySchedule
+from housing_market_sim.prompts import LANGUAGES, SUMMARY_ROLES
+from housing_market_sim.profiling import CAPTURE_MODES, capture
+from housing_market_sim.simulation import ENGINES, branch, simulate
+from housing_market_sim.replicate import run_replicates
+from housing_market_sim.sweep import DESIGNS, run_sweep, write_rows
+
+# ========== 命令行入口 ==========
+# 用法：python -m housing_market_sim run --scenario credit_stimulus --steps 500 --agents 100000 --out run.parquet
+#       python -m housing_market_sim run --steps 120 --schedule 40:lr=3.5 --schedule 80:lr=5,gs=10
+#       python -m housing_market_sim run --steps 50 --checkpoint-at 50 --checkpoint-out base50.npz
+#       python -m housing_market_sim branch base50.npz --scenario credit_stimulus --scenario fiscal_subsidy --steps 100
+#       python -m housing_market_sim summarize --design lhs --samples 100 --language en --out summaries.jsonl
+#       python -m housing_market_sim queue init grid.sqlite --design lhs --samples 5000 && \
+#       python -m housing_market_sim queue work grid.sqlite --workers 16
+#       python -m housing_market_sim sweep --design lhs --samples 200 --store runs.sqlite --out lhs.csv
+#       python -m housing_market_sim results query --store runs.sqlite --where "lr<4" --where "gs>10" --out low_rate.csv
+
+SCENARIO_NAMES = tuple(name[:-len("_scenario")] for name in SCENARIOS)
+SUMMARY_LANGUAGES = dict(zip(("zh", "en"), LANGUAGES))
+
+
+def scenario_params(scenario, overrides=None):
+    """ 取预设情景参数，并用命令行给出的单项参数覆盖 """
+    params = dict(SCENARIOS[f"{scenario}_scenario"])
+    for k, v in (overrides or {}).items():
+        if v is not None:
+            params[k] = v
+    return params
+
+
+def add_param_arguments(parser):
+    parser.add_argument("--scenario", choices=SCENARIO_NAMES, default="baseline",
+                        help="preset scenario supplying the nine policy parameters (default: baseline)")
+    for k in PARAM_KEYS:
+        parser.add_argument(f"--{k}", type=float, help=f"override {k.upper()} from the scenario")
+
+
+def add_demography_arguments(parser):
+    parser.add_argument("--exit-rate", type=float, default=0.0,
+                        help="per-step probability that a household exits (default: 0, no exits)")
+    parser.add_argument("--target-population", type=int,
+                        help="steady-state population; arrivals top the population up to this size each step")
+
+
+def demography_from_args(args):
+    return Demography(exit_rate=args.exit_rate, target_population=args.target_population)
+
+
+def add_store_arguments(parser):
+    parser.add_argument("--store", metavar="PATH",
+                        help="results database: reuse runs already stored there and record new ones (off by default)")
+
+
+def store_from_args(args):
+    """ 命令行指定的结果库；未指定 --store 时为 None（不读写任何结果库） """
+    if args.store is None:
+        return None
+    from housing_market_sim.results import ResultStore
+    return ResultStore(args.store)
+
+
+def store_options(args):
+    """ 参数扫描 / 工作进程的结果库选项：(run_sweep 的关键字参数, 报告字段)；库中已有的设计点直接读回，新算的写入 """
+    store = store_from_args(args)
+    if store is None:
+        return {}, {}
+    from housing_market_sim.results import stored_point_fn
+    path = store.path  # 这里只负责建表，各工作进程自己打开
+    store.close()
+    return {"point_fn": stored_point_fn(path)}, {"store": str(path)}
+
+
+def cmd_run(args):
+    params = scenario_params(args.scenario, {k: getattr(args, k) for k in PARAM_KEYS})
+    try:
+        schedule = PolicySchedule.parse(args.schedule)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    profile = args.profile or bool(args.profile_out)
+    start = time.perf_counter()
+    if args.capture == "pyinstrument" and importlib.util.find_spec("pyinstrument") is None:
+        raise SystemExit("pyinstrument capture requires pyinstrument (pip install pyinstrument)")
+    # 计时、落盘与检查点需要真正运行一次，其余情况先查结果库
+    store = None if profile or args.capture or args.spill_dir or args.checkpoint_at is not None \
+        else store_from_args(args)
+    from_store = False
+    if store is not None:
+        from housing_market_sim.results import simulate_cached
+        result, from_store = simulate_cached(store, params, args.seed, args.agents, args.steps, args.engine,
+                                             schedule=schedule, grid_size=args.grid_size,
+                                             demography=demography_from_args(args))
+    else:
+        with capture(args.capture, args.capture_out) if args.capture else contextlib.nullcontext():
+            result = simulate(params, args.seed, args.agents, args.steps, engine=args.engine,
+                              demography=demography_from_args(args), spill_dir=args.spill_dir, profile=profile,
+                              checkpoint_at=args.checkpoint_at, schedule=schedule, grid_size=args.grid_size)
+    elapsed = time.perf_counter() - start
+    if args.out:
+        result.save(args.out)
+    if result.checkpoint is not None:
+        result.checkpoint.save(args.checkpoint_out)
+    if args.spill_dir:
+        result.history.close()
+    report = {"engine": args.engine, "params": params, "seed": args.seed, "agents": args.agents,
+              "steps": args.steps, "seconds": round(elapsed, 3), **result.summary()}
+    if store is not None:
+        report.update(store=str(store.path), from_store=from_store)
+    if schedule:
+        report["schedule"] = schedule.to_dict()
+    if profile:
+        print(result.profile.format_table(), file=sys.stderr)
+        report["profile"] = result.profile.summary()
+        if args.profile_out:
+            write_rows(result.profile.rows, args.profile_out)
+    print(json.dumps(report, ensure_ascii=False))
+    return 0
+
+
+def cmd_branch(args):
+    checkpoint = Checkpoint.load(args.checkpoint)
+    policies = {name: scenario_params(name) for name in args.scenario}
+    start = time.perf_counter()
+    results = branch(checkpoint, policies, args.steps)
+    report = {"checkpoint": args.checkpoint, "engine": checkpoint.engine, "from_step": checkpoint.step,
+              "steps": args.steps, "seconds": round(time.perf_counter() - start, 3), "branches": {}}
+    for name, result in results.items():
+        entry = result.summary()
+        if args.out:
+            entry["out"] = str(result.save(args.out.format(scenario=name)))
+        report["branches"][name] = entry
+    print(json.dumps(report, ensure_ascii=False))
+    return 0
+
+
+def parse_vary(items, design):
+    """ 解析 --vary：全因子设计为 key=v1,v2,...，抽样设计为 key=lo:hi """
+    spec = {}
+    for item in items or []:
+        key, _, value = item.partition("=")
+        if key not in PARAM_KEYS or not value:
+            raise SystemExit(f"--vary expects KEY=VALUES with KEY in {PARAM_KEYS}, got {item!r}")
+        if design == "factorial":
+            spec[key] = [float(v) for v in value.split(",")]
+        else:
+            lo, _, hi = value.partition(":")
+            spec[key] = (float(lo), float(hi))
+    return spec
+
+
+def sweep_points(args):
+    """ 按 --design / --vary 生成设计点 """
+    base = scenario_params(args.scenario, {k: getattr(args, k) for k in PARAM_KEYS})
+    spec = parse_vary(args.vary, args.design)
+    if args.design == "factorial":
+        if not spec:
+            raise SystemExit("factorial sweeps need at least one --vary KEY=v1,v2,...")
+        return DESIGNS["factorial"](spec, base=base)
+    try:
+        return DESIGNS[args.design](args.samples, bounds=spec or None, seed=args.design_seed, base=base)
+    except ImportError as e:
+        raise SystemExit(str(e))
+
+
+def cmd_sweep(args):
+    points = sweep_points(args)
+    start = time.perf_counter()
+    options, report = store_options(args)
+    rows = run_sweep(points, args.seed, args.agents, args.steps, engine=args.engine, max_workers=args.workers,
+                     **options)
+    count = write_rows(rows, args.out)
+    print(json.dumps({"design": args.design, "runs": count, "out": args.out,
+                      "seconds": round(time.perf_counter() - start, 3), **report}))
+    return 0
+
+
+def cmd_results_query(args):
+    from housing_market_sim.results import ResultStore, parse_filter
+    try:
+        filters = [parse_filter(text) for text in args.where]
+        rows = ResultStore(args.store).query(filters, order_by=args.order_by, descending=args.desc,
+                                             limit=args.limit)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if args.out:
+        write_rows(rows, args.out)
+    else:
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+    print(json.dumps({"runs": len(rows), "out": args.out}), file=sys.stderr)
+    return 0
+
+
+def cmd_replicate(args):
+    params = scenario_params(args.scenario, {k: getattr(args, k) for k in PARAM_KEYS})
+    start = time.perf_counter()
+    reducer = run_replicates(params, args.replicates, args.seed, args.agents, args.steps,
+                             engine=args.engine, max_workers=args.workers)
+    if args.out:
+        write_rows(reducer.to_rows(), args.out)
+    print(json.dumps({"replicates": reducer.count, "out": args.out,
+                      "seconds": round(time.perf_counter() - start, 3)}))
+    return 0
+
+
+def cmd_queue_init(args):
+    from housing_market_sim.jobqueue import JobQueue, sweep_tasks
+    tasks = sweep_tasks(sweep_points(args), args.seed, args.agents, args.steps, args.engine)
+    queue = JobQueue(args.queue)
+    added = queue.enqueue(tasks)
+    print(json.dumps({"queue": args.queue, "points": len(tasks), "added": added, **queue.counts()}))
+    return 0
+
+
+def cmd_queue_work(args):
+    from housing_market_sim.jobqueue import run_workers
+    start = time.perf_counter()
+    options, report = store_options(args)
+    finished = run_workers(args.queue, args.workers, lease=args.lease, max_attempts=args.max_attempts,
+                           wait=args.wait, max_jobs=args.max_jobs, **options)
+    print(json.dumps({"queue": args.queue, "finished": finished, "seconds": round(time.perf_counter() - start, 3),
+                      **report}))
+    return 0
+
+
+def cmd_queue_status(args):
+    from housing_market_sim.jobqueue import JobQueue
+    queue = JobQueue(args.queue)
+    if args.retry_failed:
+        queue.retry_failed()
+    counts = queue.counts()
+    print(json.dumps({"queue": args.queue, **counts}))
+    for task, error in queue.errors():
+        print(f"run {task['run']} failed: {error}", file=sys.stderr)
+    return 0
+
+
+def cmd_queue_export(args):
+    from housing_market_sim.jobqueue import JobQueue
+    queue = JobQueue(args.queue)
+    count = write_rows(queue.results(), args.out)
+    print(json.dumps({"queue": args.queue, "runs": count, "out": args.out, **queue.counts()}))
+    return 0
+
+
+def cmd_summarize(args):
+    from housing_market_sim.llm import SummaryCache
+    from housing_market_sim.summarize import BACKENDS, run_batch, simulate_runs, summary_items
+    if args.design == "scenarios":
+        points = [scenario_params(name) for name in SCENARIO_NAMES]
+    else:
+        points = sweep_points(args)
+    options = {"timeout": args.timeout, "max_retries": args.max_retries}
+    if args.model:
+        options["model"] = args.model
+    if args.backend == "mock":
+        backend = BACKENDS["mock"](latency=args.mock_latency, **options)
+    else:
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise SystemExit("the openai backend needs OPENAI_API_KEY (or use --backend mock)")
+        backend = BACKENDS["openai"](api_key=api_key, base_url=args.base_url, **options)
+    start = time.perf_counter()
+    runs = simulate_runs(points, args.seed, args.agents, args.steps, engine=args.engine, max_workers=args.workers)
+    languages = [SUMMARY_LANGUAGES[code] for code in args.language or SUMMARY_LANGUAGES]
+    items = list(summary_items(runs, languages, args.role or SUMMARY_ROLES, backend.model))
+    simulated = time.perf_counter()
+
+    def progress(row, stats):
+        finished = stats["skipped"] + stats["generated"] + stats["cached"] + stats["failed"]
+        status = f"failed: {row['error']}" if "error" in row else f"{row['source']} {row['seconds']}s"
+        print(f"[{finished}/{stats['total']}] run {row['run']} {row['language']} {row['role']}: {status}",
+              file=sys.stderr, flush=True)
+
+    stats = run_batch(items, backend, args.out, args.concurrency, args.rate,
+                      cache=None if args.no_cache else SummaryCache(), on_result=progress)
+    print(json.dumps({"backend": backend.name, "model": backend.model, "runs": len(runs), **stats, "out": args.out,
+                      "simulate_seconds": round(simulated - start, 3),
+                      "summarize_seconds": round(time.perf_counter() - simulated, 3)}, ensure_ascii=False))
+    return 1 if stats["failed"] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m housing_market_sim",
+                                     description="Headless runner for the housing filtering ABM.")
+    parser.add_argument("--log-level", default="WARNING", help="logging level, e.g. DEBUG or INFO (default: WARNING)")
+    parser.add_argument("--log-json", action="store_true", help="emit one JSON object per log line")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run one simulation and optionally write its history table")
+    add_param_arguments(run)
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--steps", type=int, default=100)
+    run.add_argument("--agents", type=int, default=50, help="initial number of households")
+    run.add_argument("--engine", choices=ENGINES, default="vectorized")
+    run.add_argument("--grid-size", type=int, default=GRID_SIZE,
+                     help=f"side of the periodic grid; scale it up with the population (default: {GRID_SIZE})")
+    add_demography_arguments(run)
+    add_store_arguments(run)
+    run.add_argument("--out", help="output path (.parquet, .csv or .json)")
+    run.add_argument("--spill-dir", help="write the per-step history to this directory in chunks (very long runs)")
+    run.add_argument("--profile", action="store_true",
+                     help="time each phase of every step; prints a timing table to stderr")
+    run.add_argument("--profile-out", help="also write the per-step timing table (CSV or .parquet)")
+    run.add_argument("--capture", choices=CAPTURE_MODES, help="wrap the run in cProfile or pyinstrument")
+    run.add_argument("--capture-out", help="capture output (.prof for cprofile, .html for pyinstrument)")
+    run.add_argument("--schedule", action="append", metavar="STEP:KEY=V[,KEY=V]",
+                     help="policy change taking effect at STEP, e.g. 40:lr=3.5 (repeatable)")
+    run.add_argument("--checkpoint-at", type=int, metavar="K", help="save a checkpoint after step K")
+    run.add_argument("--checkpoint-out", default="checkpoint.npz",
+                     help="checkpoint path for --checkpoint-at (default: checkpoint.npz)")
+    run.set_defaults(func=cmd_run)
+
+    br = sub.add_parser("branch", help="continue several scenarios from one checkpoint (shared prefix runs once)")
+    br.add_argument("checkpoint", help="checkpoint written by run --checkpoint-at")
+    br.add_argument("--scenario", action="append", choices=SCENARIO_NAMES, required=True,
+                    help="policy to apply from the checkpoint step on; repeat for several branches")
+    br.add_argument("--steps", type=int, required=True, help="total steps, counted from the start of the run")
+    br.add_argument("--out", help="output path template, e.g. branch_{scenario}.parquet")
+    br.set_defaults(func=cmd_branch)
+
+    sweep = sub.add_parser("sweep", help="run a parameter sweep in parallel and stream one CSV row per run")
+    add_param_arguments(sweep)
+    sweep.add_argument("--design", choices=tuple(DESIGNS), default="lhs")
+    sweep.add_argument("--vary", action="append", metavar="KEY=SPEC",
+                       help="factorial: KEY=v1,v2,...; lhs/sobol: KEY=lo:hi (default: all nine slider ranges)")
+    sweep.add_argument("--samples", type=int, default=64, help="number of points for lhs/sobol designs")
+    sweep.add_argument("--design-seed", type=int, default=0, help="seed for drawing the lhs/sobol points")
+    sweep.add_argument("--seed", type=int, default=42, help="simulation seed shared by every point")
+    sweep.add_argument("--steps", type=int, default=100)
+    sweep.add_argument("--agents", type=int, default=50)
+    sweep.add_argument("--engine", choices=ENGINES, default="vectorized")
+    sweep.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    add_store_arguments(sweep)
+    sweep.add_argument("--out", required=True, help="CSV or .parquet file receiving one row per completed run")
+    sweep.set_defaults(func=cmd_sweep)
+
+    replicate = sub.add_parser("replicate", help="run R seeds of one scenario and write per-step mean/std/quantiles")
+    add_param_arguments(replicate)
+    replicate.add_argument("--replicates", type=int, default=20)
+    replicate.add_argument("--seed", type=int, default=42,
+                           help="root seed; replicate r draws from its own stream of this seed")
+    replicate.add_argument("--steps", type=int, default=100)
+    replicate.add_argument("--agents", type=int, default=50)
+    replicate.add_argument("--engine", choices=ENGINES, default="vectorized")
+    replicate.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    replicate.add_argument("--out", help="CSV or .parquet file with one row per step")
+    replicate.set_defaults(func=cmd_replicate)
+
+    results = sub.add_parser("results", help="query the persistent database of simulated runs")
+    results_sub = results.add_subparsers(dest="results_command", required=True)
+    r_query = results_sub.add_parser("query", help="list stored runs (parameters, seed, summary metrics)")
+    r_query.add_argument("--store", help="results database (default: results.sqlite in the cache directory)")
+    r_query.add_argument("--where", action="append", default=[], metavar="COND",
+                         help='condition on a parameter / metric column, e.g. "lr<4" (repeatable; all must hold)')
+    r_query.add_argument("--order-by", default="created", help="column to sort by (default: created)")
+    r_query.add_argument("--desc", action="store_true", help="sort in descending order")
+    r_query.add_argument("--limit", type=int)
+    r_query.add_argument("--out", help="CSV or .parquet file (default: one JSON object per line on stdout)")
+    r_query.set_defaults(func=cmd_results_query)
+
+    queue = sub.add_parser("queue", help="durable sweep job queue: enqueue points, run workers on any node, export")
+    queue_sub = queue.add_subparsers(dest="queue_command", required=True)
+    q_init = queue_sub.add_parser("init", help="enqueue a sweep design (points already queued are skipped)")
+    q_init.add_argument("queue", help="SQLite queue file (created if missing)")
+    add_param_arguments(q_init)
+    q_init.add_argument("--design", choices=tuple(DESIGNS), default="lhs")
+    q_init.add_argument("--vary", action="append", metavar="KEY=SPEC", help="as for sweep")
+    q_init.add_argument("--samples", type=int, default=64, help="number of points for lhs/sobol designs")
+    q_init.add_argument("--design-seed", type=int, default=0, help="seed for drawing the lhs/sobol points")
+    q_init.add_argument("--seed", type=int, default=42, help="simulation seed shared by every point")
+    q_init.add_argument("--steps", type=int, default=100)
+    q_init.add_argument("--agents", type=int, default=50)
+    q_init.add_argument("--engine", choices=ENGINES, default="vectorized")
+    q_init.set_defaults(func=cmd_queue_init)
+    q_work = queue_sub.add_parser("work", help="claim and run queued points until the queue is drained")
+    q_work.add_argument("queue")
+    q_work.add_argument("--workers", type=int, help="worker processes on this node (default: CPU count)")
+    q_work.add_argument("--lease", type=float, default=60.0,
+                        help="seconds before a job held by a dead worker is handed out again (default: 60)")
+    q_work.add_argument("--max-attempts", type=int, default=3, help="attempts before a job is marked failed")
+    q_work.add_argument("--max-jobs", type=int, help="stop each worker after this many jobs")
+    q_work.add_argument("--wait", action="store_true", help="keep polling for new jobs instead of exiting")
+    add_store_arguments(q_work)
+    q_work.set_defaults(func=cmd_queue_work)
+    q_status = queue_sub.add_parser("status", help="job counts by state; lists failed jobs on stderr")
+    q_status.add_argument("queue")
+    q_status.add_argument("--retry-failed", action="store_true", help="put failed jobs back in the queue")
+    q_status.set_defaults(func=cmd_queue_status)
+    q_export = queue_sub.add_parser("export", help="write the finished runs, in design order")
+    q_export.add_argument("queue")
+    q_export.add_argument("--out", required=True, help="CSV or .parquet file receiving one row per finished run")
+    q_export.set_defaults(func=cmd_queue_export)
+
+    summ = sub.add_parser("summarize", help="simulate many runs and write one LLM summary per run/language/role")
+    add_param_arguments(summ)
+    summ.add_argument("--design", choices=("scenarios",) + tuple(DESIGNS), default="scenarios",
+                      help="runs to summarize: the preset scenarios (default) or a sweep design")
+    summ.add_argument("--vary", action="append", metavar="KEY=SPEC", help="as for sweep")
+    summ.add_argument("--samples", type=int, default=64, help="number of points for lhs/sobol designs")
+    summ.add_argument("--design-seed", type=int, default=0, help="seed for drawing the lhs/sobol points")
+    summ.add_argument("--seed", type=int, default=42, help="simulation seed shared by every run")
+    summ.add_argument("--steps", type=int, default=100)
+    summ.add_argument("--agents", type=int, default=50)
+    summ.add_argument("--engine", choices=ENGINES, default="vectorized")
+    summ.add_argument("--workers", type=int, help="simulation worker processes (default: CPU count)")
+    summ.add_argument("--language", action="append", choices=tuple(SUMMARY_LANGUAGES),
+                      help="summary language, repeatable (default: zh and en)")
+    summ.add_argument("--role", action="append", choices=SUMMARY_ROLES,
+                      help="summary role, repeatable (default: all three)")
+    summ.add_argument("--backend", choices=("openai", "mock"), default="openai",
+                      help="openai: any OpenAI-compatible endpoint (OPENAI_API_KEY); mock: local stand-in server")
+    summ.add_argument("--model", help="model name (default: gpt-4o, or 'mock' for the mock backend)")
+    summ.add_argument("--base-url", help="OpenAI-compatible endpoint (default: OPENAI_BASE_URL or api.openai.com)")
+    summ.add_argument("--concurrency", type=int, default=8, help="requests in flight at once (default: 8)")
+    summ.add_argument("--rate", type=float, help="maximum requests per second (default: unlimited)")
+    summ.add_argument("--timeout", type=float, default=60.0, help="seconds per request (default: 60)")
+    summ.add_argument("--max-retries", type=int, default=2, help="retries on connection errors, 429 and 5xx")
+    summ.add_argument("--mock-latency", type=float, default=0.5, help="mock backend reply delay in seconds")
+    summ.add_argument("--no-cache", action="store_true", help="skip the persistent summary cache")
+    summ.add_argument("--out", required=True,
+                      help="JSONL file, one summary per line; rerunning with the same file resumes")
+    summ.set_defaults(func=cmd_summarize)
+    return parser
+
+
+COMMANDS = ("run", "branch", "sweep", "replicate", "queue", "results", "summarize")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(args.log_level, json_format=args.log_json)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import numpy as np
+
+from housing_market_sim.params import GROUPS
+
+# ========== 增量统计计数器 ==========
+# 代理每次买房、卖房、置换、新增、退出时更新计数，每步统计直接读取，不再逐户扫描。
+
+LOW_QUALITY = 2.5  # 低质量住房阈值（与 low_quality_ratio 口径一致）
+
+
+class TenureCounters:
+    """ 按 (组别, 是否有房) 维护人数，并维护有房户的房屋质量总和与低质量户数 """
+
+    def __init__(self):
+        self.counts = {(grp, own): 0 for grp in GROUPS for own in (False, True)}
+        self.owned_quality_sum = 0.0
+        self.low_quality_owned = 0
+
+    def _quality(self, sign, quality):
+        if quality is None:  # 买房时先置 has_house 再赋质量，中间状态不计入
+            return
+        self.owned_quality_sum += sign * quality
+        if quality < LOW_QUALITY:
+            self.low_quality_owned += sign
+
+    def add(self, group, has_house, quality):
+        """ 新代理加入 """
+        self.counts[(group, bool(has_house))] += 1
+        if has_house:
+            self._quality(1, quality)
+
+    def remove(self, group, has_house, quality):
+        """ 代理退出 """
+        self.counts[(group, bool(has_house))] -= 1
+        if has_house:
+            self._quality(-1, quality)
+
+    def move(self, group, old_has_house, old_quality, has_house, quality):
+        """ 代理状态变化（买 / 卖 / 置换 / 折旧） """
+        if old_has_house != has_house:
+            self.counts[(group, bool(old_has_house))] -= 1
+            self.counts[(group, bool(has_house))] += 1
+        if old_has_house:
+            self._quality(-1, old_quality)
+        if has_house:
+            self._quality(1, quality)
+
+    # ---------- O(1) 读取 ----------
+    def tenure_counts(self):
+        """ 返回 {(组别, 是否有房): 人数} """
+        return dict(self.counts)
+
+    def population(self, group=None):
+        if group is None:
+            return sum(self.counts.values())
+        return self.counts[(group, False)] + self.counts[(group, True)]
+
+    def owners(self):
+        return sum(n for (_, own), n in self.counts.items() if own)
+
+    def renters(self):
+        return sum(n for (_, own), n in self.counts.items() if not own)
+
+    def avg_quality(self):
+        owners = self.owners()
+        return self.owned_quality_sum / owners if owners else 0
+
+    def low_quality_ratio(self):
+        owners = self.owners()
+        return self.low_quality_owned / owners if owners else 0
+
+
+def tenure_counts(group, has_house):
+    """ 由组别编码数组与有房标记数组一次计算 {(组别, 是否有房): 人数} """
+    counts = np.bincount(group.astype(np.intp) * 2 + has_house, minlength=2 * len(GROUPS))
+    return {(grp, bool(own)): int(counts[code * 2 + own]) for code, grp in enumerate(GROUPS) for own in (0, 1)}
@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+
+# ========== 家庭生命周期 ==========
+# 原模型每步新增 5~10 户且从不退出，人口、内存与每步耗时随步数线性增长。
+# Demography 描述迁入、退出（迁出 / 合并）与稳态人口；缺省值与原逻辑完全一致（只进不出、无上限）。
+
+
+@dataclass(frozen=True)
+class Demography:
+    """ 人口动态设置（两个引擎共用） """
+    arrivals: tuple = (5, 10)  # 每步新增户数区间（闭区间）
+    exit_rate: float = 0.0  # 每步每户退出（迁出 / 合并）的概率，退出户的房产挂牌进入二手市场
+    target_population: int = None  # 稳态人口：每步新增户数把人口补足到该规模（低于时增长，退出户被替换）
+    capacity: int = None  # 向量化引擎预分配的代理槽位数（缺省按需倍增）
+
+    def arrivals_for(self, drawn, population):
+        """
+        本步新增户数：无稳态人口时即抽到的户数；
+        否则把（退出之后的）人口 population 补足到稳态人口，已达到或超过时不再新增。
+        低于稳态人口时一步补足，此后每步恰好替换退出的户数，人口保持在稳态人口。
+        """
+        if self.target_population is None:
+            return drawn
+        return max(0, self.target_population - population)
+
+    def initial_capacity(self, n_agents):
+        """ 向量化引擎的初始槽位数：给定稳态人口时一次分配到位，之后不再扩容 """
+        if self.capacity is not None:
+            return max(self.capacity, n_agents)
+        if self.target_population is not None:
+            return max(n_agents, self.target_population) + self.arrivals[1]
+        return 2 * n_agents + self.arrivals[1]
+
+
+DEFAULT_DEMOGRAPHY = Demography()
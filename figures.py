@@ -0,0 +1,471 @@
+import functools
+import io
+
+import numpy as np
+
+from housing_market_sim.cache import ResultCache
+from housing_market_sim.params import GRID_SIZE, GROUPS
+
+# ========== 统计图表 ==========
+# 四张图的绘制与导出。直接使用 matplotlib.figure.Figure（不经过 pyplot 的全局状态），
+# Streamlit 各会话线程可以并发绘制。
+# FigureService 以 (结果哈希, 图编号, 格式, 语言) 为键缓存渲染好的字节：
+# 页面上只渲染展示用的 png，eps / jpeg 等导出格式在点击下载时才生成；
+# 切换格式或语言只渲染缺失的那一份，不会把四张图全部重画。
+# 长序列先降采样到至多 MAX_POINTS 个点（默认 LTTB，保留峰谷形状），
+# 人口结构图超过 STACKED_BAR_LIMIT 步时改画堆叠面积图，绘图耗时与图片大小不随步数增长。
+# matplotlib 在第一次绘图时才导入，页面标题、侧栏与表单不必等绘图库加载完。
+
+EXPORT_FORMATS = ("eps", "jpeg", "png")
+MIME_TYPES = {"eps": "application/postscript", "jpeg": "image/jpeg", "png": "image/png"}
+# 展示用 png 与 st.pyplot 默认一致（dpi=200），下载 png 时直接复用同一份缓存
+SAVE_OPTIONS = {"png": {"dpi": 200}}
+
+MAX_POINTS = 1000  # 每条序列最多绘制的点数
+STACKED_BAR_LIMIT = 300  # 超过该步数时人口结构图改用堆叠面积图
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+# 每张图的折线序列：(history 字段, 颜色)；质量图的两条线使用各自独立的纵轴
+LINE_SERIES = {
+    "transactions": (("new_home_market", "black"), ("secondary_market", "red"), ("rental_market", "gold")),
+    "swaps": (("high_income_swaps", "blue"), ("upgrade_swaps", "green")),
+    "quality": (("avg_quality", "purple"), ("low_quality_ratio", "red")),
+}
+
+
+# ---------- 降采样 ----------
+def _bucket_starts(n, n_buckets):
+    """ 把 [0, n) 均分为 n_buckets 段，返回各段起点 """
+    return np.linspace(0, n, n_buckets, endpoint=False).astype(np.int64)
+
+
+def lttb_indices(y, n_out):
+    """
+    Largest-Triangle-Three-Buckets：保留首尾点，其余点均分成 n_out - 2 个桶，
+    每个桶选与“上一个选中点、下一个桶均值”构成三角形面积最大的点，峰谷得以保留。
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = y.size
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < edges.size:
+            nxt = slice(edges[i + 1], max(edges[i + 2], edges[i + 1] + 1))
+            cx, cy = (nxt.start + nxt.stop - 1) / 2, y[nxt].mean()
+        else:
+            cx, cy = n - 1, y[-1]
+        bx = np.arange(lo, hi)
+        area = np.abs((a - cx) * (y[lo:hi] - y[a]) - (a - bx) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def minmax_indices(y, n_out):
+    """ 最小/最大值分桶：每个桶保留最小值与最大值所在的点（再加首尾点） """
+    y = np.asarray(y, dtype=np.float64)
+    n = y.size
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    n_buckets = (n_out - 2) // 2
+    width = -(-n // n_buckets)
+    padded = np.full(n_buckets * width, np.nan)
+    padded[:n] = y
+    rows = padded.reshape(n_buckets, width)
+    valid = ~np.all(np.isnan(rows), axis=1)
+    offsets = np.arange(n_buckets)[valid] * width
+    picks = np.concatenate(([0, n - 1], offsets + np.nanargmin(rows[valid], axis=1),
+                            offsets + np.nanargmax(rows[valid], axis=1)))
+    return np.unique(picks)
+
+
+def downsample(x, y, max_points=MAX_POINTS, method="lttb"):
+    """ 返回降采样后的 (x, y)；点数不超过 max_points 时原样返回 """
+    if len(y) <= max_points:
+        return x, y
+    if method == "lttb":
+        idx = lttb_indices(y, max_points)
+    elif method == "minmax":
+        idx = minmax_indices(y, max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method {method!r}; expected one of {DOWNSAMPLE_METHODS}")
+    return np.asarray(x)[idx], np.asarray(y)[idx]
+
+
+def bucket_reduce(values, n_buckets, ufunc=np.add):
+    """ 按桶归约（np.add 求和、np.minimum / np.maximum 求包络） """
+    return ufunc.reduceat(np.asarray(values, dtype=np.float64), _bucket_starts(len(values), n_buckets))
+
+
+def bucket_mean(values, n_buckets):
+    n = len(values)
+    starts = _bucket_starts(n, n_buckets)
+    return bucket_reduce(values, n_buckets) / np.diff(np.append(starts, n))
+
+
+def bucket_x(x, n_buckets):
+    """ 各桶的中点横坐标 """
+    starts = _bucket_starts(len(x), n_buckets)
+    ends = np.append(starts[1:], len(x)) - 1
+    x = np.asarray(x, dtype=np.float64)
+    return (x[starts] + x[ends]) / 2
+
+
+@functools.lru_cache(maxsize=None)
+def _matplotlib():
+    """ 导入 matplotlib 并设置中文字体（每个进程一次） """
+    import matplotlib
+    from matplotlib.figure import Figure
+    matplotlib.rcParams["axes.unicode_minus"] = False
+    matplotlib.rcParams["font.sans-serif"] = ["SimHei"]
+    return Figure
+
+
+def new_figure(figsize):
+    return _matplotlib()(figsize=figsize)
+
+
+def plot_series(ax, x, history, bands, key, max_points=MAX_POINTS, **style):
+    """
+    画一条 history 序列；有重复模拟时叠加同色阴影带。
+    长序列的线用 LTTB 降采样，阴影带按桶取下界最小值、上界最大值，保证包络不变窄。
+    """
+    line, = ax.plot(*downsample(x, history[key], max_points), **style)
+    if key in bands:
+        lo, hi = bands[key]
+        if len(x) > max_points:
+            x, lo, hi = (bucket_x(x, max_points), bucket_reduce(lo, max_points, np.minimum),
+                         bucket_reduce(hi, max_points, np.maximum))
+        ax.fill_between(x, lo, hi, color=line.get_color(), alpha=0.2, linewidth=0)
+    return line
+
+
+# ① 新房/二手/租赁交易量趋势
+def transactions_figure(history, bands, lang):
+    fig = new_figure((6, 4))
+    ax = fig.subplots()
+    x = np.arange(1, len(history["new_home_market"]) + 1)
+    for key, color in LINE_SERIES["transactions"]:
+        plot_series(ax, x, history, bands, key, label=lang[key], color=color, linewidth=2)
+    ax.set_xlabel(lang["step_length"])
+    ax.set_ylabel(lang["transactions"])
+    ax.grid(True)
+    ax.legend(loc="upper right")
+    return fig
+
+
+# ② 换房行为趋势
+def swaps_figure(history, bands, lang):
+    fig = new_figure((6, 4))
+    ax = fig.subplots()
+    x = np.arange(1, len(history["high_income_swaps"]) + 1)
+    for key, color in LINE_SERIES["swaps"]:
+        plot_series(ax, x, history, bands, key, label=lang[key], color=color, linewidth=2)
+    ax.set_xlabel(lang["step_length"])
+    ax.set_ylabel(lang["transactions"])
+    ax.grid(True)
+    ax.legend(loc="upper right")
+    return fig
+
+
+# ③ 平均住房质量 vs 低质住房占比
+def quality_figure(history, bands, lang):
+    fig = new_figure((7.8, 5.2))  # 原来是(6, 4)，现在稍微加宽
+    ax = fig.subplots()
+    x = np.arange(1, len(history["avg_quality"]) + 1)
+    plot_series(ax, x, history, bands, "avg_quality", label=lang["avg_quality"], color="purple", linewidth=2)
+    ax.set_ylabel(lang["avg_quality"], color="purple", fontsize=15)
+    ax.grid(True)
+    ax.set_ylim(0, 5)
+    ax.tick_params(axis='x', labelsize=15)
+    ax.tick_params(axis='y', labelsize=15)
+    ax.set_xlabel(lang["step_length"], fontsize=15)
+
+    ratio_ax = ax.twinx()
+    plot_series(ratio_ax, x, history, bands, "low_quality_ratio", label=lang["low_quality_ratio"], color="red", linewidth=2)
+    ratio_ax.set_ylabel(lang["low_quality_ratio"], color="red", fontsize=15)
+    # ✅ 强制设置Y轴范围一致感
+    ratio_ax.set_ylim(0, 1)
+    ratio_ax.tick_params(axis='y', labelsize=15)
+    # 图例合并
+    h1, l1 = ax.get_legend_handles_labels()
+    h2, l2 = ratio_ax.get_legend_handles_labels()
+    ax.legend(h1 + h2, l1 + l2, loc="upper right", fontsize=15)
+    fig.tight_layout()
+    return fig
+
+
+# ④ 人口结构堆叠柱状图
+POPULATION_LAYERS = (
+    ("pop_high", "pop_high_owner", "blue"),
+    ("mid_own", "pop_mid_owner", "green"),
+    ("mid_rent", "pop_mid_renter", "lightgreen"),
+    ("low_own", "pop_low_owner", "red"),
+    ("low_rent", "pop_low_renter", "lightcoral"),
+)
+
+
+def population_figure(history, bands, lang):
+    fig = new_figure((6, 4))
+    ax = fig.subplots()
+    n = len(history["low_own"])
+    if n > STACKED_BAR_LIMIT:
+        _population_area(ax, history, bands, lang, n)
+    else:
+        _population_bars(ax, history, bands, lang, n)
+    ax.set_xlabel(lang["pop_structure_xlabel"])
+    ax.set_ylabel(lang["pop_structure_ylabel"])
+    ax.grid(True)
+    ax.legend(loc="upper left")
+    return fig
+
+
+def _population_bars(ax, history, bands, lang, n):
+    """ 步数较少时每步一根堆叠柱 """
+    x = np.arange(n)
+    bottom = np.zeros(n)
+    for key, label, color in POPULATION_LAYERS:
+        ax.bar(x, history[key], label=lang[label], color=color, bottom=bottom)
+        bottom = bottom + np.asarray(history[key])
+    # 有重复模拟时，在每一层的上边界叠加该层的分位数阴影带（画在全部柱子之上）
+    if bands:
+        bottom = np.zeros(n)
+        for key, _, _ in POPULATION_LAYERS:
+            lo, hi = bands[key]
+            ax.fill_between(x, bottom + lo, bottom + hi, color="black", alpha=0.15, linewidth=0)
+            bottom = bottom + np.asarray(history[key])
+
+
+def _population_area(ax, history, bands, lang, n):
+    """ 长序列画堆叠面积图：各层按桶取均值（各层之和仍等于总人口），最多 MAX_POINTS 个点 """
+    n_buckets = min(n, MAX_POINTS)
+    x = bucket_x(np.arange(n), n_buckets)
+    layers = [bucket_mean(history[key], n_buckets) for key, _, _ in POPULATION_LAYERS]
+    ax.stackplot(x, layers, labels=[lang[label] for _, label, _ in POPULATION_LAYERS],
+                 colors=[color for _, _, color in POPULATION_LAYERS], linewidth=0)
+    if bands:
+        bottom = np.zeros(n_buckets)
+        for (key, _, _), layer in zip(POPULATION_LAYERS, layers):
+            lo, hi = bands[key]
+            ax.fill_between(x, bottom + bucket_reduce(lo, n_buckets, np.minimum),
+                            bottom + bucket_reduce(hi, n_buckets, np.maximum),
+                            color="black", alpha=0.15, linewidth=0)
+            bottom = bottom + layer
+
+
+# 图编号 -> (绘图函数, 下载文件名)
+FIGURES = {
+    "transactions": (transactions_figure, "transaction_volume_change"),
+    "swaps": (swaps_figure, "housing_swap_behavior_change"),
+    "quality": (quality_figure, "housing_quality_change"),
+    "population": (population_figure, "population_structure_change"),
+}
+
+
+def render_figure(figure_id, fmt, history, bands, lang):
+    """ 绘制一张图并按 fmt 输出为字节 """
+    if fmt not in MIME_TYPES:
+        raise ValueError(f"Unknown figure format {fmt!r}; expected one of {EXPORT_FORMATS}")
+    build, _ = FIGURES[figure_id]
+    fig = build(history, bands, lang)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, bbox_inches='tight', **SAVE_OPTIONS.get(fmt, {}))
+    return buffer.getvalue()
+
+
+def file_name(figure_id, fmt):
+    return f"{FIGURES[figure_id][1]}.{fmt}"
+
+
+# ---------- 代理网格 ----------
+# 取代 Mesa 的 CanvasGrid + ModularServer：直接由数组快照（model.snapshot()）绘制，
+# 画法与原 agent_portrayal 一致：有房为圆形、租房为方形，大小随住房质量变化，当步新房为黑色圆形。
+# 同一格内的多个代理按格内序号沿螺线错开；代理数超过 GRID_SCATTER_LIMIT 时改为按格着色的图像。
+GRID_SCATTER_LIMIT = 5000
+HIGH, MIDDLE, LOW = (GROUPS.index(g) for g in ("high", "middle", "low"))
+# (组别编码, 是否有房) -> (颜色, 标记)
+GRID_STYLES = {
+    (LOW, False): ("lightcoral", "s"),
+    (LOW, True): ("red", "o"),
+    (MIDDLE, False): ("lightgreen", "s"),
+    (MIDDLE, True): ("green", "o"),
+    (HIGH, True): ("blue", "o"),
+}
+NEW_HOME_STYLE = ("black", "o")
+# 租房代理还没有租房质量时按组别取区间中点（原实现在绘制时临时随机补一个值）
+DEFAULT_RENTAL_QUALITY = {LOW: 1.75, MIDDLE: 3.75}
+
+
+def _grid_categories(state):
+    """ 每个代理的 (颜色, 标记) 类别与半径（单位：格），不绘制的代理类别为 None """
+    group, own = state["group"], state["has_house"]
+    rental = state["rental_quality"].copy()
+    for code, quality in DEFAULT_RENTAL_QUALITY.items():
+        rental[np.isnan(rental) & (group == code)] = quality
+    radius = np.where(own, np.nan_to_num(state["house_quality"]), rental) / 8
+    styles = {style: (group == g) & (own == o) & ~state["is_new_home"] for (g, o), style in GRID_STYLES.items()}
+    styles[NEW_HOME_STYLE] = state["is_new_home"] & ~((group == HIGH) & ~own)
+    return styles, np.nan_to_num(radius)
+
+
+def _cell_offsets(cells):
+    """ 同一格内的第 k 个代理沿黄金角螺线偏移，返回 (dx, dy, 该格代理数) """
+    order = np.argsort(cells, kind="stable")
+    sorted_cells = cells[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    counts = np.diff(np.r_[starts, cells.size])
+    rank = np.empty(cells.size, dtype=np.int64)
+    rank[order] = np.arange(cells.size) - np.repeat(starts, counts)
+    per_cell = np.empty(cells.size, dtype=np.int64)
+    per_cell[order] = np.repeat(counts, counts)
+    dist = 0.35 * np.sqrt(rank / np.maximum(per_cell, 1))
+    angle = rank * 2.39996
+    return dist * np.cos(angle), dist * np.sin(angle), per_cell
+
+
+def grid_figure(state, width=GRID_SIZE, height=GRID_SIZE, size_in=5.0):
+    fig = new_figure((size_in, size_in))
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_xlim(-0.5, width - 0.5)
+    ax.set_ylim(-0.5, height - 0.5)
+    ax.set_aspect("equal")
+    ax.set_xticks(np.arange(-0.5, width), minor=True)
+    ax.set_yticks(np.arange(-0.5, height), minor=True)
+    ax.grid(True, which="minor", color="#dddddd", linewidth=0.5)
+    ax.tick_params(which="both", left=False, bottom=False, labelleft=False, labelbottom=False)
+
+    styles, radius = _grid_categories(state)
+    x, y = state["pos_x"], state["pos_y"]
+    if x.size > GRID_SCATTER_LIMIT:
+        # 按格取可见代理颜色的平均值
+        from matplotlib.colors import to_rgb
+        cells = y.astype(np.int64) * width + x
+        rgb = np.zeros((width * height, 3))
+        visible = np.zeros(width * height)
+        for (color, _), mask in styles.items():
+            weights = np.bincount(cells[mask], minlength=width * height)
+            rgb += np.outer(weights, to_rgb(color))
+            visible += weights
+        image = np.ones((width * height, 3))
+        filled = visible > 0
+        image[filled] = rgb[filled] / visible[filled, None]
+        ax.imshow(image.reshape(height, width, 3), origin="lower", interpolation="nearest")
+        return fig
+
+    dx, dy, per_cell = _cell_offsets(y.astype(np.int64) * width + x)
+    cell_pt = size_in * 72 / max(width, height)
+    # 原 CanvasGrid 中圆的半径、方块的边长均为 radius 个格；同格代理越多画得越小
+    scale = cell_pt / np.sqrt(per_cell)
+    for (color, marker), mask in styles.items():
+        if not mask.any():
+            continue
+        side = radius[mask] * scale[mask] * (2 if marker == "o" else 1)
+        ax.scatter(x[mask] + dx[mask], y[mask] + dy[mask], s=side ** 2, c=color, marker=marker, linewidths=0)
+    return fig
+
+
+def render_grid(state, width=GRID_SIZE, height=GRID_SIZE):
+    buffer = io.BytesIO()
+    grid_figure(state, width, height).savefig(buffer, format="png", dpi=100)
+    return buffer.getvalue()
+
+
+class FigureService:
+    """
+    渲染结果的 LRU 缓存，键为 (结果哈希, 图编号, 格式, 语言)。
+    history / bands / lang 只在缓存未命中时使用，必须与结果哈希和语言对应。
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.cache = ResultCache(max_entries=max_entries, max_bytes=max_bytes)
+
+    def render(self, result_hash, figure_id, fmt, language, history, bands, lang):
+        return self.cache.get_or_compute(
+            (result_hash, figure_id, fmt, language),
+            lambda: render_figure(figure_id, fmt, history, bands, lang)
+        )
+
+    def chart(self, result_hash, figure_id, language, history, bands, lang):
+        """ 交互式图表的 Vega-Lite 规格（同样按结果哈希与语言缓存） """
+        return self.cache.get_or_compute(
+            (result_hash, figure_id, "vega-lite", language),
+            lambda: interactive_spec(figure_id, history, bands, lang)
+        )
+
+    def grid(self, result_hash, state, width=GRID_SIZE, height=GRID_SIZE):
+        """ 代理网格的 png（与语言无关） """
+        return self.cache.get_or_compute(
+            (result_hash, "grid", "png", None),
+            lambda: render_grid(state, width, height)
+        )
+
+    def exporter(self, result_hash, figure_id, fmt, language, history, bands, lang):
+        """ 返回无参函数，供 st.download_button(data=...) 在点击时才生成导出文件 """
+        return lambda: self.render(result_hash, figure_id, fmt, language, history, bands, lang)
+
+
+# ---------- 交互式矢量图（Vega-Lite） ----------
+
+def _series_frame(history, bands, key, label, max_points=MAX_POINTS):
+    """ 一条序列降采样后的数据表；有重复模拟时附带按桶包络的分位数带 """
+    import pandas as pd
+    x = np.arange(1, len(history[key]) + 1)
+    line_x, line_y = downsample(x, history[key], max_points)
+    line = pd.DataFrame({"step": line_x, "value": line_y, "series": label})
+    if key not in bands:
+        return line, None
+    lo, hi = bands[key]
+    if len(x) > max_points:
+        x, lo, hi = (bucket_x(x, max_points), bucket_reduce(lo, max_points, np.minimum),
+                     bucket_reduce(hi, max_points, np.maximum))
+    return line, pd.DataFrame({"step": x, "lo": lo, "hi": hi, "series": label})
+
+
+def interactive_spec(figure_id, history, bands, lang):
+    """
+    用 Altair（Streamlit 自带依赖）生成可缩放、可悬停查看数值的 Vega-Lite 规格，
+    数据与静态图一样先降采样，浏览器端的点数同样有上限。
+    """
+    import altair as alt
+    import pandas as pd
+
+    if figure_id == "population":
+        n = len(history["low_own"])
+        n_buckets = min(n, MAX_POINTS)
+        x = bucket_x(np.arange(n), n_buckets)
+        frame = pd.concat([pd.DataFrame({"step": x, "value": bucket_mean(history[key], n_buckets),
+                                         "series": lang[label], "order": i})
+                           for i, (key, label, _) in enumerate(POPULATION_LAYERS)])
+        chart = alt.Chart(frame).mark_area().encode(
+            x=alt.X("step:Q", title=lang["pop_structure_xlabel"]),
+            y=alt.Y("value:Q", stack="zero", title=lang["pop_structure_ylabel"]),
+            color=alt.Color("series:N", title=None,
+                            scale=alt.Scale(domain=[lang[label] for _, label, _ in POPULATION_LAYERS],
+                                            range=[color for _, _, color in POPULATION_LAYERS])),
+            order="order:Q",
+            tooltip=["step:Q", "series:N", alt.Tooltip("value:Q", format=".1f")],
+        )
+        return chart.interactive().to_dict()
+
+    layers = []
+    for key, color in LINE_SERIES[figure_id]:
+        line, band = _series_frame(history, bands, key, lang[key])
+        y_title = lang[key] if figure_id == "quality" else lang["transactions"]
+        base = alt.Chart(line).encode(x=alt.X("step:Q", title=lang["step_length"]))
+        layer = base.mark_line(color=color).encode(
+            y=alt.Y("value:Q", title=y_title),
+            tooltip=["step:Q", "series:N", alt.Tooltip("value:Q", format=".3f")],
+        )
+        if band is not None:
+            layer = alt.layer(alt.Chart(band).mark_area(color=color, opacity=0.2).encode(
+                x="step:Q", y="lo:Q", y2="hi:Q"), layer)
+        layers.append(layer)
+    chart = alt.layer(*layers)
+    if figure_id == "quality":
+        chart = chart.resolve_scale(y="independent")
+    return chart.interactive().to_dict()
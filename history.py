@@ -0,0 +1,199 @@
+import os
+import tempfile
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+
+# ========== 逐步统计记录 ==========
+# 固定字段的列式记录器：每个字段一列预分配的 NumPy 数组，按倍数扩容；
+# 指定 spill_dir 时每满 chunk_rows 行就把整块写到磁盘（.npz），记录时的内存占用与总步数无关；
+# 读取某个字段时落盘部分只载入一次并缓存，直到下一次落盘。
+# 导出 Arrow / Parquet / CSV 时直接从列数组构造，不经过逐行的 Python 对象。
+
+HISTORY_SCHEMA = {
+    "new_home_market": np.int64,
+    "secondary_market": np.int64,
+    "rental_market": np.int64,
+    "high_income_swaps": np.int64,
+    "upgrade_swaps": np.int64,
+    "avg_quality": np.float64,
+    "low_quality_ratio": np.float64,
+    "supply": np.int64,
+    "demand": np.int64,
+    "pop_high": np.int64,
+    "pop_mid": np.int64,
+    "pop_low": np.int64,
+    "secondary_supply": np.int64,
+    "low_own": np.int64,
+    "low_rent": np.int64,
+    "mid_own": np.int64,
+    "mid_rent": np.int64,
+}
+
+HISTORY_KEYS = tuple(HISTORY_SCHEMA)
+
+
+class HistoryRecorder(Mapping):
+    """
+    history 的列式存储。按字段名取值得到该列已记录部分的数组（未落盘时为零拷贝视图），
+    因此原来 history["avg_quality"][-1]、sum(history["new_home_market"]) 等用法保持不变。
+    """
+
+    def __init__(self, capacity=1024, spill_dir=None, chunk_rows=65536):
+        self.spill_dir = None if spill_dir is None else Path(spill_dir)
+        self.chunk_rows = chunk_rows
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            capacity = min(capacity, chunk_rows)
+        self._columns = {k: np.zeros(max(1, capacity), dtype=dtype) for k, dtype in HISTORY_SCHEMA.items()}
+        self._n = 0  # 内存中的行数
+        self._chunks = []  # 已落盘的块文件
+        self._spilled_rows = 0
+        self._spilled = {}  # 字段 -> 已落盘部分拼接好的数组（读取时按字段载入一次，再次落盘时作废）
+
+    @classmethod
+    def from_columns(cls, columns, capacity=None):
+        """ 由 {字段: 序列} 构造（例如从 JSON 读回的 history）；capacity 为预留的总行数 """
+        n = len(columns[HISTORY_KEYS[0]])
+        recorder = cls(capacity=max(n, capacity or 0))
+        for k, dtype in HISTORY_SCHEMA.items():
+            recorder._columns[k][:n] = np.asarray(columns[k], dtype=dtype)
+        recorder._n = n
+        return recorder
+
+    # ---------- 写入 ----------
+    @property
+    def n_rows(self):
+        return self._spilled_rows + self._n
+
+    @property
+    def capacity(self):
+        return self._columns[HISTORY_KEYS[0]].size
+
+    def append(self, row):
+        """ 记录一步的统计；row 必须包含 HISTORY_SCHEMA 的全部字段 """
+        if self._n == self.capacity:
+            if self.spill_dir is not None and self._n >= self.chunk_rows:
+                self._spill()
+            else:
+                self._grow()
+        i = self._n
+        for k, col in self._columns.items():
+            col[i] = row[k]
+        self._n = i + 1
+
+    def _grow(self):
+        capacity = 2 * self.capacity
+        if self.spill_dir is not None:
+            capacity = min(capacity, self.chunk_rows)
+        for k, col in self._columns.items():
+            grown = np.zeros(capacity, dtype=col.dtype)
+            grown[:self._n] = col[:self._n]
+            self._columns[k] = grown
+
+    def _spill(self):
+        """ 把内存中的整块写入 spill_dir，并复用同一组缓冲区 """
+        fd, path = tempfile.mkstemp(prefix="history-", suffix=".npz", dir=self.spill_dir)
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **{k: col[:self._n] for k, col in self._columns.items()})
+        self._chunks.append(path)
+        self._spilled_rows += self._n
+        self._spilled = {}
+        self._n = 0
+
+    def close(self):
+        """ 删除落盘的块文件 """
+        for path in self._chunks:
+            Path(path).unlink(missing_ok=True)
+        self._chunks = []
+        self._spilled_rows = 0
+        self._spilled = {}
+
+    # ---------- 读取 ----------
+    def __getitem__(self, key):
+        if key not in self._columns:
+            raise KeyError(key)
+        tail = self._columns[key][:self._n]
+        if not self._chunks:
+            return tail
+        spilled = self._spilled.get(key)
+        if spilled is None:
+            parts = []
+            for path in self._chunks:
+                with np.load(path) as chunk:
+                    parts.append(chunk[key])
+            spilled = self._spilled[key] = np.concatenate(parts)
+        return np.concatenate([spilled, tail])
+
+    def __iter__(self):
+        return iter(HISTORY_KEYS)
+
+    def __len__(self):
+        return len(HISTORY_KEYS)
+
+    def batches(self):
+        """ 按块依次产出 (起始步号, {字段: 数组})，导出时无需一次性载入全部行 """
+        start = 0
+        for path in self._chunks:
+            with np.load(path) as chunk:
+                columns = {k: chunk[k] for k in HISTORY_KEYS}
+            yield start, columns
+            start += len(columns[HISTORY_KEYS[0]])
+        if self._n or not self._chunks:
+            yield start, {k: col[:self._n] for k, col in self._columns.items()}
+
+    def __getstate__(self):
+        # 跨进程传递时只序列化已记录的行（并载入落盘部分）
+        return {"columns": {k: np.array(self[k]) for k in HISTORY_KEYS}}
+
+    def __setstate__(self, state):
+        self.__init__(capacity=len(state["columns"][HISTORY_KEYS[0]]))
+        for k, values in state["columns"].items():
+            self._columns[k][:values.size] = values
+        self._n = len(state["columns"][HISTORY_KEYS[0]])
+
+    # ---------- 导出 ----------
+    def _record_batches(self, constants=None):
+        import pyarrow as pa
+        for start, columns in self.batches():
+            n = len(columns[HISTORY_KEYS[0]])
+            arrays = {"step": pa.array(np.arange(start + 1, start + n + 1))}
+            arrays.update({k: pa.array(v) for k, v in columns.items()})  # 数值列零拷贝
+            for k, v in (constants or {}).items():
+                # 标量为常数列；数组为逐步取值（如按步生效的政策参数），按行号切片
+                arrays[k] = pa.array(np.full(n, v) if np.ndim(v) == 0 else np.asarray(v)[start:start + n])
+            yield pa.RecordBatch.from_pydict(arrays)
+
+    def to_arrow(self, constants=None):
+        """ 转为 pyarrow.Table；constants 为附加列（如政策参数、种子），值为标量或逐步数组 """
+        import pyarrow as pa
+        return pa.Table.from_batches(list(self._record_batches(constants)))
+
+    def to_parquet(self, path, constants=None):
+        """ 逐块写 Parquet（每块一个 row group） """
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for batch in self._record_batches(constants):
+                if writer is None:
+                    writer = pq.ParquetWriter(str(path), batch.schema)
+                writer.write_batch(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+        return path
+
+    def to_csv(self, path, constants=None):
+        """ 逐块写 CSV """
+        import pyarrow.csv as pcsv
+        writer = None
+        try:
+            for batch in self._record_batches(constants):
+                if writer is None:
+                    writer = pcsv.CSVWriter(str(path), batch.schema)
+                writer.write_batch(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+        return path
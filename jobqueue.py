@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from housing_market_sim.log import get_logger
+from housing_market_sim.sweep import run_point
+
+# ========== 持久化的参数扫描任务队列 ==========
+# 设计点（政策参数 + 种子 + 规模）写入一个本地 SQLite 文件，一行一个任务；
+# 任意多个工作进程（同一台机器，或挂载同一目录的多台机器）各自打开这个文件领取任务：
+# 领取时在一个写事务里把任务标记为 running 并写上租约到期时间，运行期间定期续租，完成后写回结果。
+# 工作进程崩溃或被杀时租约到期，任务回到可领取状态，由其他进程重新运行；已完成的任务不会重复运行。
+# 任务键是任务内容的哈希，同一设计重复入队不会产生重复任务，中断后重新入队并启动工作进程即可继续。
+# 全部离线运行，不依赖任何服务。
+#   python -m housing_market_sim queue init grid.sqlite --design factorial --vary lr=3,5,8 --vary ml=20,50,80
+#   python -m housing_market_sim queue work grid.sqlite --workers 8      # 可在多台机器上同时运行
+#   python -m housing_market_sim queue status grid.sqlite
+#   python -m housing_market_sim queue export grid.sqlite --out grid.parquet
+# 多台机器共用时，队列文件所在的文件系统需要支持 POSIX 文件锁（SQLite 的要求）。
+
+DEFAULT_LEASE = 60.0  # 秒；运行期间每 lease / 3 续租一次
+DEFAULT_MAX_ATTEMPTS = 3  # 超过次数仍失败（或反复崩溃）的任务标记为 failed
+STATUSES = ("pending", "running", "done", "failed")
+
+log = get_logger("jobqueue")
+
+
+def task_key(task):
+    """ 任务内容（含设计点编号）的哈希，用于去重：同一设计重复入队得到相同的键 """
+    blob = json.dumps(task, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class JobQueue:
+    """ SQLite 上的任务队列；每个进程（线程）使用自己的 JobQueue 对象 """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 手动管理事务；timeout 为等待其他进程写锁的秒数
+        self._conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()  # 续租线程与工作循环共用一个连接
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY, key TEXT UNIQUE, task TEXT, status TEXT DEFAULT 'pending', "
+            "attempts INTEGER DEFAULT 0, worker TEXT, lease_until REAL, result TEXT, error TEXT, updated REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until)")
+
+    def close(self):
+        self._conn.close()
+
+    def _write(self, sql, args=()):
+        """ 在一个立即加写锁的事务里执行一条语句，返回受影响的行数 """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                count = self._conn.execute(sql, args).rowcount
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return count
+
+    # ---------- 入队 ----------
+    def enqueue(self, tasks):
+        """ 加入任务（可写成 JSON 的字典）；已存在的任务（同一内容）跳过，返回新加入的个数 """
+        now = time.time()
+        rows = [(task_key(task), json.dumps(task), now) for task in tasks]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO jobs (key, task, updated) VALUES (?, ?, ?)", rows)
+            added = self._conn.total_changes - before
+            self._conn.execute("COMMIT")
+        return added
+
+    # ---------- 领取与租约 ----------
+    def claim(self, worker, lease=DEFAULT_LEASE, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """ 领取一个待运行或租约已过期的任务，返回 (任务编号, 任务)；没有可领取的任务时返回 None """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 租约过期且次数用尽的任务（反复崩溃）不再重试
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'lease expired', worker = NULL, updated = ? "
+                    "WHERE status = 'running' AND lease_until < ? AND attempts >= ?", (now, now, max_attempts))
+                row = self._conn.execute(
+                    "SELECT id, task FROM jobs WHERE status = 'pending' "
+                    "OR (status = 'running' AND lease_until < ?) ORDER BY id LIMIT 1", (now,)).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                        "updated = ? WHERE id = ?", (worker, now + lease, now, row[0]))
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def renew(self, job_id, worker, lease=DEFAULT_LEASE):
+        """ 续租；任务已被他人接手或已完成时返回 False """
+        return self._write("UPDATE jobs SET lease_until = ?, updated = ? "
+                           "WHERE id = ? AND worker = ? AND status = 'running'",
+                           (time.time() + lease, time.time(), job_id, worker)) == 1
+
+    def complete(self, job_id, worker, result):
+        """
+        写回结果。模拟结果只取决于任务内容，租约过期后被他人接手的任务仍接受先完成的一份结果；
+        已完成的任务不会被覆盖。
+        """
+        return self._write("UPDATE jobs SET status = 'done', worker = ?, lease_until = NULL, result = ?, "
+                           "error = NULL, updated = ? WHERE id = ? AND status != 'done'",
+                           (worker, json.dumps(result), time.time(), job_id)) == 1
+
+    def fail(self, job_id, worker, error, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """ 运行出错：次数未用尽时放回队列，否则标记为 failed """
+        return self._write("UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+                           "worker = NULL, lease_until = NULL, error = ?, updated = ? "
+                           "WHERE id = ? AND worker = ? AND status = 'running'",
+                           (max_attempts, error, time.time(), job_id, worker)) == 1
+
+    def retry_failed(self):
+        """ 把 failed 任务放回队列（重置次数），返回个数 """
+        return self._write("UPDATE jobs SET status = 'pending', attempts = 0, error = NULL, updated = ? "
+                           "WHERE status = 'failed'", (time.time(),))
+
+    # ---------- 查询 ----------
+    def counts(self):
+        """ {状态: 任务数}（running 中租约已过期的计入 expired） """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT CASE WHEN status = 'running' AND lease_until < ? THEN 'expired' ELSE status END, COUNT(*) "
+                "FROM jobs GROUP BY 1", (time.time(),)).fetchall()
+        return {**dict.fromkeys(STATUSES + ("expired",), 0), **dict(rows)}
+
+    def results(self):
+        """ 按任务编号顺序产出已完成任务的结果 """
+        with self._lock:
+            rows = self._conn.execute("SELECT result FROM jobs WHERE status = 'done' ORDER BY id").fetchall()
+        for (result,) in rows:
+            yield json.loads(result)
+
+    def errors(self):
+        """ failed 任务的 (任务, 错误信息) """
+        with self._lock:
+            rows = self._conn.execute("SELECT task, error FROM jobs WHERE status = 'failed' ORDER BY id").fetchall()
+        return [(json.loads(task), error) for task, error in rows]
+
+
+def sweep_tasks(points, seed=42, n_agents=50, steps=100, engine="vectorized"):
+    """ 设计点 -> 任务字典（字段与 sweep.run_point 的参数一致） """
+    return [{"run": i, "params": dict(p), "seed": seed, "n_agents": n_agents, "steps": steps, "engine": engine}
+            for i, p in enumerate(points)]
+
+
+class _Lease:
+    """ 任务运行期间在后台线程里定期续租 """
+
+    def __init__(self, queue, job_id, worker, lease):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(queue, job_id, worker, lease), daemon=True)
+
+    def _run(self, queue, job_id, worker, lease):
+        while not self._stop.wait(lease / 3):
+            try:
+                if not queue.renew(job_id, worker, lease):
+                    log.warning("Lease on job %s was lost; another worker may run it too", job_id)
+                    return
+            except sqlite3.Error as e:  # 暂时拿不到写锁：下一轮再试，租约留有余量
+                log.warning("Could not renew lease on job %s: %s", job_id, e)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def work(path, worker=None, lease=DEFAULT_LEASE, max_attempts=DEFAULT_MAX_ATTEMPTS, poll=1.0, wait=False,
+         max_jobs=None, point_fn=run_point):
+    """
+    工作循环：领取任务、运行、写回结果，直到队列为空（wait=True 时继续等待新任务）或完成 max_jobs 个。
+    point_fn 与 sweep.run_sweep 相同（参数为 (run, params, seed, n_agents, steps, engine)）。
+    返回由本进程写回结果的任务数（已被他人完成的重复运行不计）。
+    """
+    worker = worker or default_worker_id()
+    queue = JobQueue(path)
+    finished = 0
+    try:
+        while max_jobs is None or finished < max_jobs:
+            claimed = queue.claim(worker, lease, max_attempts)
+            if claimed is None:
+                counts = queue.counts()
+                if not wait and counts["pending"] == 0 and counts["running"] == 0 and counts["expired"] == 0:
+                    break
+                time.sleep(poll)  # 其他进程仍在运行：等待新任务或过期租约
+                continue
+            job_id, task = claimed
+            try:
+                with _Lease(queue, job_id, worker, lease):
+                    result = point_fn((task["run"], task["params"], task["seed"], task["n_agents"], task["steps"],
+                                       task["engine"]))
+            except Exception as e:
+                log.warning("Job %s failed on %s: %s", job_id, worker, e)
+                queue.fail(job_id, worker, f"{type(e).__name__}: {e}", max_attempts)
+                continue
+            if queue.complete(job_id, worker, result):
+                finished += 1
+            else:  # 租约过期后另一个进程接手并先完成了同一任务，保留先写入的结果
+                log.info("Job %s was already finished by another worker; %s discarded its duplicate result",
+                         job_id, worker)
+    finally:
+        queue.close()
+    return finished
+
+
+def _work_process(args):
+    path, kwargs = args
+    return work(path, **kwargs)
+
+
+def run_workers(path, workers=None, **kwargs):
+    """ 在本机启动 workers 个工作进程（默认 CPU 数），全部退出后返回各自完成的任务数之和 """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return work(path, **kwargs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(_work_process, [(path, kwargs)] * workers))
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from housing_market_sim.cache import default_cache_dir
+from housing_market_sim.log import get_logger
+
+# ========== 大模型总结服务 ==========
+# 同一进程共用一个服务对象：OpenAI 客户端按 (api_key, base_url) 复用连接池，超时与重试交给客户端
+# （timeout / max_retries，连接错误、429 与 5xx 按指数退避重试）；生成在后台线程里以流式方式进行，
+# 页面只需轮询 SummaryJob 已收到的文本。完整结果写入本地 SQLite，键为
+# (语言, 总结角色, data_dict 哈希, 模型)，相同请求再次生成时直接返回，不再计费也不再等待。
+
+DEFAULT_MODEL = "gpt-4o"
+TEMPERATURE = 0.2
+MAX_TOKENS = 3000
+DEFAULT_TIMEOUT = 60.0  # 秒，单次请求（含流式读取间隔）
+DEFAULT_RETRIES = 2
+
+log = get_logger("llm")
+
+
+def _json_value(value):
+    """ numpy 标量按对应的 Python 数值写入，其余按字符串 """
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def summary_key(language, summary_role, data_dict, model=DEFAULT_MODEL):
+    """ 总结请求的内容哈希：语言 + 角色 + 输入数据 + 模型 """
+    data = hashlib.sha256(json.dumps(data_dict, sort_keys=True, ensure_ascii=False, default=_json_value)
+                          .encode("utf-8")).hexdigest()
+    blob = json.dumps([language, summary_role, data, model], ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """ 持久化的总结缓存（SQLite，一条请求一行） """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None else default_cache_dir() / "llm_summaries.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS summaries ("
+                               "key TEXT PRIMARY KEY, model TEXT, created REAL, text TEXT)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM summaries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, text, model):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                               (key, model, time.time(), text))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+
+class SummaryJob:
+    """ 一次总结生成：后台线程追加文本片段，页面按需读取 """
+
+    def __init__(self, key, cached=None):
+        self.key = key
+        self.chunks = [] if cached is None else [cached]
+        self.cached = cached is not None  # 命中缓存时一开始就已完成
+        self.error = None
+        self._done = threading.Event()
+        if self.cached:
+            self._done.set()
+
+    @property
+    def text(self):
+        return "".join(self.chunks)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def stream(self, poll=0.05):
+        """ 逐段产出文本直到生成结束（可直接交给 st.write_stream 或在命令行打印）；失败时抛出原异常 """
+        sent = 0
+        while True:
+            finished = self._done.wait(poll)
+            chunks = self.chunks[sent:]
+            sent += len(chunks)
+            yield from chunks
+            if finished and sent == len(self.chunks):
+                break
+        if self.error is not None:
+            raise self.error
+
+
+class SummaryService:
+    """ 带连接池、超时重试与持久缓存的流式总结服务 """
+
+    def __init__(self, cache=None, model=DEFAULT_MODEL, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_RETRIES,
+                 max_workers=4):
+        self.cache = cache if cache is not None else SummaryCache()
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._clients = {}
+        self._running = {}  # 同一请求正在生成时复用同一个任务
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-summary")
+
+    def client(self, api_key, base_url=None):
+        """ 按 (api_key, base_url) 复用的 OpenAI 客户端 """
+        with self._lock:
+            client = self._clients.get((api_key, base_url))
+            if client is None:
+                from openai import OpenAI
+                client = OpenAI(api_key=api_key, base_url=base_url, timeout=self.timeout,
+                                max_retries=self.max_retries)
+                self._clients[(api_key, base_url)] = client
+            return client
+
+    def key(self, language, summary_role, data_dict):
+        return summary_key(language, summary_role, data_dict, self.model)
+
+    def submit(self, key, messages, api_key, base_url=None):
+        """ 开始（或复用）一次生成；命中缓存时返回已完成的任务 """
+        cached = self.cache.get(key)
+        if cached is not None:
+            return SummaryJob(key, cached)
+        with self._lock:
+            job = self._running.get(key)
+            if job is None:
+                job = self._running[key] = SummaryJob(key)
+                self._executor.submit(self._generate, job, messages, api_key, base_url)
+        return job
+
+    def _generate(self, job, messages, api_key, base_url):
+        try:
+            response = self.client(api_key, base_url).chat.completions.create(
+                model=self.model, messages=messages, temperature=TEMPERATURE, max_tokens=MAX_TOKENS, stream=True)
+            for chunk in response:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    job.chunks.append(delta)
+            self.cache.put(job.key, job.text, self.model)  # 只缓存完整结果，中途失败不写入
+        except Exception as e:
+            log.warning("LLM summary %s failed: %s", job.key[:12], e)
+            job.error = e
+        finally:
+            with self._lock:
+                self._running.pop(job.key, None)
+            job._done.set()
@@ -0,0 +1,79 @@
+import json
+import logging
+from collections import Counter
+
+# ========== 日志 ==========
+# 取代模型与界面中的调试 print()：统一使用 "housing_market_sim" 命名空间下的 logging 记录器。
+# 默认不输出 DEBUG；逐代理的热路径只在 DEBUG 打开时按采样间隔记录，
+# 异常事件按次数聚合，每次运行结束时汇总输出一条，而不是每次一行。
+
+ROOT = "housing_market_sim"
+SAMPLE_EVERY = 1000  # 热路径日志的默认采样间隔
+logging.getLogger(ROOT).addHandler(logging.NullHandler())
+
+
+def get_logger(name):
+    """ 返回包内的子记录器，例如 get_logger("model") -> housing_market_sim.model """
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+class JsonFormatter(logging.Formatter):
+    """ 每条日志输出一行 JSON，附带通过 extra={"fields": {...}} 传入的结构化字段 """
+
+    def format(self, record):
+        payload = {"level": record.levelname, "logger": record.name, "message": record.getMessage()}
+        payload.update(getattr(record, "fields", {}))
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def configure_logging(level="WARNING", json_format=False, stream=None):
+    """ 给包记录器挂一个输出到 stderr（或 stream）的处理器；重复调用只替换处理器 """
+    root = logging.getLogger(ROOT)
+    for handler in list(root.handlers):
+        if not isinstance(handler, logging.NullHandler):
+            root.removeHandler(handler)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter() if json_format else
+                         logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    return root
+
+
+class SampledLog:
+    """
+    热路径日志：只在 level 已启用时才格式化，并且每 every 次调用只记录一次。
+    enabled 在创建时确定，逐代理调用时只做一次属性判断。
+    """
+
+    def __init__(self, logger, level=logging.DEBUG, every=None):
+        self.logger = logger
+        self.level = level
+        self.every = SAMPLE_EVERY if every is None else every
+        self.enabled = logger.isEnabledFor(level)
+        self._calls = 0
+
+    def __call__(self, msg, *args, **fields):
+        if not self.enabled:
+            return
+        self._calls += 1
+        if (self._calls - 1) % self.every == 0:
+            self.logger.log(self.level, msg, *args, extra={"fields": {**fields, "sampled_every": self.every}})
+
+
+class RunEvents:
+    """ 一次运行内的事件计数，结束时由 report() 汇总为一条日志 """
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.counts = Counter()
+
+    def count(self, event, n=1):
+        self.counts[event] += n
+
+    def report(self, level=logging.INFO, **fields):
+        if self.counts and self.logger.isEnabledFor(level):
+            summary = ", ".join(f"{k}={v}" for k, v in sorted(self.counts.items()))
+            self.logger.log(level, "run events: %s", summary,
+                            extra={"fields": {**fields, "events": dict(self.counts)}})
+        return dict(self.counts)
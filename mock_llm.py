@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ========== 本地 OpenAI 兼容替身服务 ==========
+# 只实现 POST /v1/chat/completions（普通与 stream=True 两种返回），回复内容由请求消息的哈希决定，
+# 可设置固定延迟与逐 token 间隔，用于离线测试批量总结与测量吞吐量：
+#   python -m housing_market_sim.mock_llm --port 8765 --latency 0.5
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python -m housing_market_sim summarize ...
+
+
+def mock_reply(model, messages, tokens):
+    """ 确定性的假回复：同样的请求得到同样的文本 """
+    digest = hashlib.sha256(json.dumps(messages, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    words = [f"[mock {model} {digest[:8]}]"] + [digest[i % 64:i % 64 + 4] for i in range(tokens - 1)]
+    return [w if i == 0 else f" {w}" for i, w in enumerate(words)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 非流式回复保持长连接，客户端连接池可以复用
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+            return self._json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+        try:
+            request = json.loads(body)
+            model, messages = request["model"], request["messages"]
+        except (ValueError, KeyError) as e:
+            return self._json(400, {"error": {"message": f"Bad request: {e}", "type": "invalid_request_error"}})
+        with server.lock:
+            server.requests += 1
+        time.sleep(server.latency)
+        words = mock_reply(model, messages, server.tokens)
+        created = int(time.time())
+        if request.get("stream"):
+            return self._stream(model, words, created)
+        self._json(200, {
+            "id": "chatcmpl-mock", "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(words)},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(body) // 4, "completion_tokens": len(words),
+                      "total_tokens": len(body) // 4 + len(words)},
+        })
+
+    def _json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, model, words, created):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")  # 流式回复以关闭连接结束
+        self.end_headers()
+        self.close_connection = True
+        for word in words:
+            chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.server.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # 默认的 5 在高并发下会让新连接排队等待重传
+
+
+class MockLLMServer:
+    """ 在后台线程里运行的替身服务；port=0 时自动选择空闲端口 """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, tokens=64, token_delay=0.0):
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.latency = latency
+        self._httpd.tokens = max(1, tokens)
+        self._httpd.token_delay = token_delay
+        self._httpd.requests = 0
+        self._httpd.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests(self):
+        """ 已收到的补全请求数 """
+        return self._httpd.requests
+
+    def serve_forever(self):
+        """ 在当前线程中运行（命令行模式） """
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m housing_market_sim.mock_llm",
+                                     description="Local OpenAI-compatible stand-in for offline LLM tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before each reply (default: 0.5)")
+    parser.add_argument("--tokens", type=int, default=64, help="words per reply (default: 64)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed words")
+    args = parser.parse_args(argv)
+    server = MockLLMServer(args.host, args.port, args.latency, args.tokens, args.token_delay)
+    print(f"mock LLM listening on {server.base_url}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,468 @@
+import numpy as np
+from mesa import Agent, Model
+from mesa.time import RandomActivation
+
+from housing_market_sim.counters import TenureCounters
+from housing_market_sim.demography import DEFAULT_DEMOGRAPHY
+from housing_market_sim.log import RunEvents, SampledLog, get_logger
+from housing_market_sim.orderbook import ReleasedHousingBook
+from housing_market_sim.profiling import NULL_PROFILER
+from housing_market_sim.params import (
+    GRID_SIZE, GROUPS, Q0, Q_pref, SCENARIOS, delta
+)
+from housing_market_sim.policy import PolicyContext
+from housing_market_sim.rng import GeneratorRandom, make_generator
+from housing_market_sim.spatial import ArrayGrid
+
+logger = get_logger("model")
+
+# ========== Agent ==========
+
+class HouseholdAgent(Agent):
+    # has_house / house_quality 的每次变化都同步到 model.counters（加入模型前不计数）
+    _counted = False
+    _has_house = False
+    _house_quality = None
+
+    @property
+    def has_house(self):
+        return self._has_house
+
+    @has_house.setter
+    def has_house(self, value):
+        if self._counted:
+            self.model.counters.move(self.group, self._has_house, self._house_quality, value, self._house_quality)
+        self._has_house = value
+
+    @property
+    def house_quality(self):
+        return self._house_quality
+
+    @house_quality.setter
+    def house_quality(self, value):
+        if self._counted:
+            self.model.counters.move(self.group, self._has_house, self._house_quality, self._has_house, value)
+        self._house_quality = value
+
+    def __init__(self, uid, model, group):
+        super().__init__(uid, model)
+        self.group = group
+        random = model.random  # 模型的随机数（见 rng.py）
+        # 设置是否拥有房产
+        self.has_house = True if group == "high" else random.random() < (0.8 if group == "middle" else 0.6)
+        # 设置 is_renter 属性        # 根据是否拥有房产设置租房代理属性
+        self.is_renter = not self.has_house  # 没有房产是租户，反之是房主
+        # 调试信息（DEBUG 级别且按采样间隔记录，默认关闭）
+        self.model.agent_log("agent %s: group=%s has_house=%s is_renter=%s", uid, self.group, self.has_house,
+                             self.is_renter)
+
+        # 初始化房屋质量
+        if self.has_house:
+            # 如果拥有房产，根据收入组别设定房屋质量
+            if self.group == "high":
+                self.house_quality = round(random.uniform(4, 5), 2)
+            elif self.group == "middle":
+                self.house_quality = round(random.uniform(2.5, 4), 2)
+            else:
+                self.house_quality = round(random.uniform(0.5, 3), 2)
+        else:
+            # 对于没有房产的代理，房屋质量为 None（标记为租房代理）
+            self.house_quality = None
+
+            # 根据收入组别初始化租房质量
+            if self.group == "low":
+                self.rental_quality = round(random.uniform(0.5, 3), 2)  # 低收入群体的租房质量范围为 [1, 3]
+            elif self.group == "middle":
+                self.rental_quality = round(random.uniform(2.5, 5), 2)  # 中等收入群体的租房质量范围为 [2.5, 5]
+
+        self.is_new_home = False  # 默认不是新房
+        # 登记到增量计数器
+        self.model.counters.add(self.group, self.has_house, self.house_quality)
+        self._counted = True
+
+    @classmethod
+    def restore(cls, uid, model, group, has_house, house_quality, rental_quality, is_new_home):
+        """ 按检查点中的状态重建代理（不抽随机数）；质量为 nan 表示“无” """
+        agent = cls.__new__(cls)
+        Agent.__init__(agent, uid, model)
+        agent.group = group
+        agent.has_house = has_house
+        agent.house_quality = None if house_quality != house_quality else house_quality
+        agent.is_renter = not has_house
+        if rental_quality == rental_quality:
+            agent.rental_quality = rental_quality
+        agent.is_new_home = is_new_home
+        model.counters.add(group, has_house, agent.house_quality)
+        agent._counted = True
+        return agent
+
+    def step(self):
+        random = self.model.random
+        # 如果是拥有房产的代理，进行房屋质量折旧
+        if self.has_house:
+            self.house_quality = max(1.0, self.house_quality * (1 - delta))  # 房屋质量折旧
+
+        # 默认设置为不是新房，避免上轮状态影响本轮显示
+        self.is_new_home = False
+
+        # 高收入群体换房逻辑：当房屋质量低于 4.5 时，只有当有新房供应时才会触发换房
+        if self.group == "high" and self.has_house and self.house_quality < 4:
+            # 只有新房供应量大于 0，才会卖掉当前房产并尝试购买新房
+            if self.model.new_supply > 0:
+                self.has_house = False  # 卖掉当前房产
+                self.model.released_houses.append(self.house_quality)  # 将当前房产放入二手市场
+                self.model.high_income_swaps += 1  # 记录高收入群体换房次数
+
+               # 高收入代理买新房的逻辑：只有在没有房产的情况下，且有新房供应时
+            if self.group == "high" and not self.has_house and self.model.new_supply > 0:
+                new_house_quality = round(random.uniform(4.5, 5), 2)  # 新房质量设定
+                self.has_house = True  # 购买新房
+                self.house_quality = new_house_quality  # 为购买的新房设定质量
+                self.model.new_supply -= 1  # 新房供应量减少
+                self.model.new_home += 1  # 记录新房交易
+                self.is_new_home = True  # ✅ 关键：让可视化显示黑色圆形
+
+        # 中低收入群体置换：即升级置换
+        if self.group in ["middle", "low"] and random.random() < 0.2:  # 中低收入群体置换
+            self.model.released_houses.append(self.house_quality)  # 将旧房质量加入市场
+            self.model.upgrade_swaps += 1  # 记录中低收入群体置换次数
+            self.has_house = False  # 中低收入群体卖房
+
+        # 卖 / 买概率按组别查表（政策参数变化时由 PolicyContext 重新计算）
+        policy = self.model.policy
+
+        # 卖房决策
+        if self.has_house and random.random() < policy.sell_prob[self.group]:
+            self.has_house = False
+            self.model.secondary_market += 1
+            self.model.released_houses.append(self.house_quality)
+
+        # 买房决策
+        if not self.has_house and random.random() < policy.buy_prob[self.group]:
+            # 购买新房或二手房的逻辑
+            if self.group == "high" and self.model.new_supply > 0:
+                pool_new = [Q0] * self.model.new_supply
+                better = [q for q in pool_new if q > self.house_quality]
+                worse = [q for q in pool_new if q <= self.house_quality]
+                if better and random.random() < 0.8:
+                    chosen = random.choice(better)
+                elif worse:
+                    chosen = random.choice(worse)
+                else:
+                    chosen = random.choice(pool_new)
+                self.has_house = True
+                self.house_quality = chosen
+                self.is_new_home = True
+                self.model.new_supply -= 1
+                self.model.new_home += 1
+            elif self.model.released_houses:
+                q = self.model.released_houses.pop_oldest()
+                if q is not None and q > Q_pref:
+                    self.has_house = True
+                    self.house_quality = q
+                    if self.group == "high":
+                        self.model.high_income_swaps += 1
+                    else:
+                        self.model.upgrade_swaps += 1
+                    self.model.new_home += 1
+
+        # 代理迁移逻辑
+        if random.random() < 0.2:
+            grid = self.model.grid
+            new_x = (self.pos[0] + random.randint(-1, 1)) % grid.width  # 周期性边界
+            new_y = (self.pos[1] + random.randint(-1, 1)) % grid.height
+            grid.move_agent(self, (new_x, new_y))  # 移动代理（只写位置数组）
+            self.model.grid_moves += 1
+        # ✅ 更新租房状态（必须放在最后）
+        self.is_renter = not self.has_house
+        # ✅ 若新变成租户，补上租房质量
+        if self.is_renter and not hasattr(self, "rental_quality"):
+            if self.group == "low":
+                self.rental_quality = round(random.uniform(0.5, 3), 2)
+            elif self.group == "middle":
+                self.rental_quality = round(random.uniform(2.5, 5), 2)
+
+# ========== Model ==========
+
+
+class HousingMarketModel(Model):
+    engine = "mesa"
+
+    def __new__(cls, *args, **kwargs):
+        # 不让 Mesa 按 seed 创建 random.Random：随机数统一由 _setup() 中的 Generator 提供
+        return super().__new__(cls)
+
+    def __init__(self, N, params=None, seed=None, matching="fifo", demography=None, grid_size=GRID_SIZE):
+        super().__init__()
+        self._setup(N, params, seed, matching, demography, grid_size)
+        random = self.random
+
+        # 创建代理并随机放置到网格中
+        for i in range(self.num_agents):
+            grp = random.choices(["high", "middle", "low"], weights=[0.2, 0.5, 0.3])[0]  # 随机分配收入组别
+            agent = HouseholdAgent(i, self, grp)  # 创建代理
+            self.schedule.add(agent)  # 将代理添加到调度器中
+            # 不再检查空位置，允许重叠
+            x = random.randrange(self.grid.width)
+            y = random.randrange(self.grid.height)
+            # 允许代理重叠，直接放置到网格上
+            self.grid.place_agent(agent, (x, y))
+        self.current_id = self.num_agents - 1  # 之后的新代理用 next_id() 取唯一编号
+
+        # 在初始化时就执行一次step，让代理执行“买新房”逻辑
+        self.step()
+
+    def _setup(self, N, params, seed, matching, demography, grid_size=GRID_SIZE):
+        """ 随机数、网格、调度器与统计变量（不创建代理、不消耗随机数），供构造与从检查点恢复共用 """
+        # 调度器的随机激活顺序、网格放置、迁移与逐户决策共用同一个由 (seed, stream) 派生的 Generator
+        self.rng = make_generator(seed)
+        self.random = GeneratorRandom(self.rng)
+        self.num_agents = N  # 代理数量
+        # 九个政策参数，缺省时使用基准情景
+        self.policy = PolicyContext(SCENARIOS["baseline_scenario"] if params is None else params)
+        self.params = self.policy.params
+        self.demography = DEFAULT_DEMOGRAPHY if demography is None else demography  # 迁入 / 退出 / 稳态人口
+        # grid_size x grid_size 的周期性网格，允许代理从边界移出后从对面进入；位置存放在数组里（见 spatial.py）
+        self.grid = ArrayGrid(grid_size, grid_size, torus=True)
+        self.schedule = RandomActivation(self)  # 随机激活调度器，用于控制代理的活动
+
+        # 新房、二手房交易的统计变量
+        # 初始化新房供应量 (假设一开始有10个新房)
+        self.new_supply = 10  # ✅ 设置初始的新房供应量
+        self.new_home = 0  # 新房交易量
+        self.secondary_market = 0  # 二手房市场交易量
+        self.rental_market_transactions = 0  # 租赁市场交易量
+        self.matching = matching  # 二手房匹配规则："fifo" 取最早挂牌的合格房源（原逻辑），"best" 取上限内最高质量档
+        self.released_houses = ReleasedHousingBook()  # 被卖出的二手房（按质量分桶的挂牌簿）
+        self.counters = TenureCounters()  # 各组别购 / 租人数与有房户质量的增量统计
+        self.agent_log = SampledLog(logger)  # 逐代理调试日志（采样）
+        self.events = RunEvents(logger)  # 异常事件计数，运行结束时汇总
+        self.profiler = NULL_PROFILER  # 分阶段计时（simulate(profile=True) 时替换）
+        self.grid_moves = 0  # 本步网格移动次数
+        self.high_income_swaps = 0  # 高收入群体换房次数
+        self.upgrade_swaps = 0  # 中低收入群体置换次数
+        self.current_step = 1  # 初始化step
+
+    def set_params(self, params):
+        """ 更换政策参数（政策冲击 / 按步生效的政策路径），从下一次行动起生效 """
+        self.policy.update(params)
+        self.params = self.policy.params
+
+    # ---------- 检查点 ----------
+    # 标量状态：统计变量、新房供应与代理编号计数
+    _STATE_SCALARS = ("new_supply", "new_home", "secondary_market", "rental_market_transactions",
+                      "high_income_swaps", "upgrade_swaps", "current_step", "current_id", "grid_moves")
+
+    def state_dict(self):
+        """
+        当前完整状态：代理数组（按调度器加入顺序，附 unique_id）、按挂牌先后排列的二手房、
+        标量状态，以及随机数发生器的状态；恢复后继续运行与不中断运行逐位一致。
+        """
+        agents = self.snapshot()
+        agents["unique_id"] = np.array([a.unique_id for a in self.schedule.agents], dtype=np.int64)
+        return {
+            "agents": agents,
+            "released": np.array([np.nan if q is None else q for q in self.released_houses], dtype=float),
+            "scalars": {k: int(getattr(self, k)) for k in self._STATE_SCALARS},
+            "events": dict(self.events.counts),
+            "counters": {"owned_quality_sum": self.counters.owned_quality_sum},  # 浮点累加和，按原值恢复
+            "rng": {"random": self.random.getstate()},
+            "grid": {"width": self.grid.width, "height": self.grid.height},
+        }
+
+    @classmethod
+    def from_state(cls, state, params=None, seed=None, matching="fifo", demography=None):
+        """ 由 state_dict() 重建模型（不重新初始化、不执行初始 step） """
+        agents = state["agents"]
+        model = cls.__new__(cls)
+        Model.__init__(model)
+        model._setup(int(agents["group"].size), params, seed, matching, demography,
+                     state.get("grid", {}).get("width", GRID_SIZE))
+        for i in range(agents["group"].size):
+            agent = HouseholdAgent.restore(
+                int(agents["unique_id"][i]), model, GROUPS[agents["group"][i]], bool(agents["has_house"][i]),
+                float(agents["house_quality"][i]), float(agents["rental_quality"][i]), bool(agents["is_new_home"][i]))
+            model.schedule.add(agent)
+            model.grid.place_agent(agent, (int(agents["pos_x"][i]), int(agents["pos_y"][i])))
+        model.released_houses.extend(None if q != q else float(q) for q in state["released"])
+        for k, v in state["scalars"].items():
+            setattr(model, k, v)
+        model.events.counts.update(state.get("events", {}))
+        model.counters.owned_quality_sum = state["counters"]["owned_quality_sum"]
+        model.random.setstate(state["rng"]["random"])
+        return model
+
+    def step(self):
+        """ 执行每个时间步的市场更新 """
+        random = self.random
+        prof = self.profiler
+        prof.start()
+        self.schedule.step()  # 所有代理执行一次行动
+        prof.lap("agents")
+        prof.count("agents_activated", len(self.schedule.agents))
+        # 每一步后增加当前步数
+        self.current_step += 1
+
+        # 统计租赁市场交易：租房代理为没有房产的低收入和中等收入群体
+        rental_count = self.counters.counts[("low", False)] + self.counters.counts[("middle", False)]
+        self.rental_market_transactions += rental_count  # 增加租房市场的交易次数
+
+        # 统计重置
+        self.new_home = 0
+        self.secondary_market = 0
+        self.high_income_swaps = 0  # 高收入群体的换房次数
+        self.upgrade_swaps = 0  # 升级置换次数
+        self.released_houses.clear()  # 清空被释放的二手房
+
+        # **根据市场需求调整新房供应量**（动态变化，由 PolicyContext 按政策参数预先计算）
+        self.new_supply = self.policy.new_supply
+        logger.debug("step %d new supply %d", self.current_step, self.new_supply)
+        prof.lap("supply")
+
+        # **高收入代理的换房与买新房**
+        high_pass = self.schedule.agents
+        for agent in high_pass:
+            # 高收入群体换房：当房屋质量低于 4.5 且有新房供应时，执行换房
+            if agent.group == "high" and agent.has_house and agent.house_quality < 4.5:
+                if self.new_supply > 0:
+                    agent.has_house = False  # 卖掉当前房产
+                    self.released_houses.append(agent.house_quality)  # 放入二手市场
+                    self.high_income_swaps += 1  # 记录换房次数
+                # 高收入代理买新房：如果没有房产且有新房供应
+            if agent.group == "high" and not agent.has_house and self.new_supply > 0:
+                new_house_quality = round(random.uniform(4.5, 5), 2)  # 新房质量设定
+                agent.has_house = True  # 购买新房
+                agent.house_quality = new_house_quality  # 新房质量
+                self.new_supply -= 1  # 新房供应量减少
+                self.new_home += 1  # 记录新房交易
+                agent.is_new_home = True  # 设置为新房，确保可视化显示为黑色圆形
+        prof.lap("new_homes")
+        # 处理二手房市场和置换
+        book_queries = 0
+        secondary_pass = self.schedule.agents
+        for agent in secondary_pass:
+            if agent.has_house:
+                if agent.group == "high" and random.random() < 0.8:  # 高收入群体置换二手房
+                    self.released_houses.append(agent.house_quality)  # 将旧房质量加入市场
+                    self.high_income_swaps += 1  # 记录高收入群体换房次数
+                    agent.has_house = False  # 高收入群体卖房
+
+                if agent.group in ["middle", "low"] and random.random() < 0.3:  # 中低收入群体置换
+                    self.released_houses.append(agent.house_quality)  # 将旧房质量加入市场
+                    self.upgrade_swaps += 1  # 记录中低收入群体置换次数
+                    agent.has_house = False  # 中低收入群体卖房
+
+            if not agent.has_house:  # 如果代理没有房产，尝试购买
+                if random.random() < 0.8:  # 假设 70% 的代理会尝试购买房产
+                    if agent.group == "high" and self.new_supply > 0:
+                        new_house_quality = round(random.uniform(4.5, 5), 2)  # 只有高收入群体购买新房
+                        agent.has_house = True  # 高收入代理购买新房
+                        agent.house_quality = new_house_quality  # 为新房设置质量
+                        self.new_supply -= 1  # 新房供应量减少
+                        self.new_home += 1  # 记录新房交易
+                elif agent.group in ["middle", "low"] and self.released_houses:
+                    # 设置最大可接受质量阈值
+                    quality_ceiling = 4.5 if agent.group == "middle" else 3
+
+                    # 在可接受范围内取一套房源（O(log n)，不再逐套筛选）
+                    house_to_buy = self.released_houses.pop_at_or_below(quality_ceiling, self.matching)
+                    book_queries += 1
+
+                    if house_to_buy is not None:
+                        agent.has_house = True
+                        agent.house_quality = house_to_buy
+                        self.secondary_market += 1
+
+                        # ⚠️ 调试：验证房屋质量是否超限（按次数聚合）
+                        if agent.group == "low" and agent.house_quality > 3:
+                            self.events.count("low_income_above_ceiling")
+                    else:
+                        # 如果没有合适的房子，就不买
+                        pass
+        prof.lap("secondary")
+        prof.count("agent_scans", len(high_pass) + len(secondary_pass))  # 两轮遍历实际经过的代理数
+        prof.count("book_queries", book_queries)
+        prof.count("new_home_matches", self.new_home)
+        prof.count("secondary_matches", self.secondary_market)
+
+        # 家庭退出（迁出 / 合并），再按稳态人口补足新增户数
+        exited = self.household_exits()
+        prof.lap("exits")
+        arrivals = self.demography.arrivals_for(random.randint(*self.demography.arrivals), len(self.schedule.agents))
+        for _ in range(arrivals):
+            idx = self.next_id()  # 有代理退出后 len(schedule.agents) 会与已有编号重复
+            grp = random.choices(["high", "middle", "low"], weights=[0.2, 0.5, 0.3])[0]
+            agent = HouseholdAgent(idx, self, grp)
+            self.schedule.add(agent)
+
+            # 不再检查是否为空位置，允许重叠
+            x = random.randrange(self.grid.width)
+            y = random.randrange(self.grid.height)
+            self.grid.place_agent(agent, (x, y))
+        prof.lap("spawn")
+        prof.count("spawned", arrivals)
+        prof.count("exited", exited)
+        prof.count("grid_moves", self.grid_moves)
+        self.grid_moves = 0
+
+    def household_exits(self):
+        """ 每户以 exit_rate 的概率退出模型，有房者的房产挂牌进入二手市场 """
+        exit_rate = self.demography.exit_rate
+        if exit_rate <= 0:
+            return 0
+        leaving = [a for a in self.schedule.agents if self.random.random() < exit_rate]
+        for agent in leaving:
+            if agent.has_house:
+                self.released_houses.append(agent.house_quality)
+            self.counters.remove(agent.group, agent.has_house, agent.house_quality)
+            agent._counted = False
+            self.grid.remove_agent(agent)
+            self.schedule.remove(agent)
+            agent.remove()  # 从模型的代理注册表中注销，避免已退出的代理继续占用内存
+        return len(leaving)
+
+    def render_model(self):
+        """ 用于更新可视化的模型渲染 """
+        self.profiler.start()
+        self.schedule.step()  # 让所有代理执行一次行动
+        self.profiler.lap("render")
+        self.profiler.count("agents_activated", len(self.schedule.agents))
+        # 网格由界面层根据 snapshot() 的数组快照绘制，模型本身不依赖 mesa.visualization
+
+    def snapshot(self):
+        """ 将最终代理状态导出为数组快照（与向量化引擎的 snapshot() 字段一致） """
+        agents = self.schedule.agents
+        return {
+            "group": np.array([GROUPS.index(a.group) for a in agents], dtype=np.int8),
+            "has_house": np.array([a.has_house for a in agents], dtype=bool),
+            "house_quality": np.array([np.nan if a.house_quality is None else a.house_quality for a in agents]),
+            "rental_quality": np.array([getattr(a, "rental_quality", np.nan) for a in agents]),
+            "is_new_home": np.array([a.is_new_home for a in agents], dtype=bool),
+            "pos_x": np.array([a.pos[0] for a in agents], dtype=np.int32),
+            "pos_y": np.array([a.pos[1] for a in agents], dtype=np.int32),
+        }
+
+    def step_statistics(self):
+        """ 每步模拟后的统计（history 的一行），直接读取增量计数器，O(1) """
+        c = self.counters
+        counts = c.counts
+        return {
+            "low_own": counts[("low", True)],
+            "low_rent": counts[("low", False)],
+            "mid_own": counts[("middle", True)],
+            "mid_rent": counts[("middle", False)],
+            "new_home_market": self.new_home,
+            "secondary_market": self.secondary_market,
+            "rental_market": counts[("low", False)] + counts[("middle", False)],  # 直接显示租房代理的数量
+            "high_income_swaps": self.high_income_swaps,
+            "upgrade_swaps": self.upgrade_swaps,
+            "avg_quality": c.avg_quality(),
+            "low_quality_ratio": c.low_quality_ratio(),
+            # 新房供应量和二手房交易量
+            "supply": self.new_supply + self.secondary_market,
+            "demand": c.renters(),
+            "pop_high": c.population("high"),
+            "pop_mid": c.population("middle"),
+            "pop_low": c.population("low"),
+            "secondary_supply": self.secondary_market,  # 二手房供应量
+        }
@@ -0,0 +1,182 @@
+from collections import deque
+from math import inf
+
+# ========== 二手房挂牌簿 ==========
+# 取代 model.released_houses 列表：挂牌房源按质量分桶（默认 0.01 一档），桶内按挂牌先后排队，
+# 桶之上用一棵线段树维护“各桶最早挂牌序号”，使以下操作都是 O(log B)（B 为桶数）：
+#   - pop_oldest()            最早挂牌的房源（原 pop(0)）
+#   - pop_first_at_or_below() 质量不超过上限的房源中最早挂牌的一套（原 eligible_houses[0] + remove）
+#   - pop_best_at_or_below()  质量不超过上限的最高质量档中最早挂牌的一套（按质量分档的 FIFO）
+
+MATCHING_POLICIES = ("fifo", "best")
+
+
+class ReleasedHousingBook:
+    """
+    按质量分桶的二手房挂牌簿。
+    质量为 None / nan 的挂牌（无房代理“置换”产生）单独放在最后一个桶，只会被 pop_oldest() 取出，
+    保持与原列表 pop(0) 相同的语义。
+    """
+
+    def __init__(self, max_quality=5.0, resolution=100):
+        self.resolution = resolution
+        self.n_buckets = int(max_quality * resolution) + 2  # 最后一桶存放无质量挂牌
+        self._none_bucket = self.n_buckets - 1
+        self._buckets = [deque() for _ in range(self.n_buckets)]
+        self._size = 1
+        while self._size < self.n_buckets:
+            self._size *= 2
+        self._tree = [inf] * (2 * self._size)  # 各桶队首的挂牌序号，空桶为 inf
+        self._seq = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def __iter__(self):
+        """ 按挂牌先后遍历质量（不修改挂牌簿） """
+        entries = sorted(e for bucket in self._buckets for e in bucket)
+        return iter(q for _, q in entries)
+
+    # ---------- 内部：分桶与线段树 ----------
+    def _bucket(self, q):
+        if q is None or q != q:
+            return self._none_bucket
+        return min(self._none_bucket - 1, max(0, int(q * self.resolution)))
+
+    def _refresh(self, b):
+        """ 桶 b 的队首变化后，沿线段树向上更新最小序号 """
+        bucket = self._buckets[b]
+        i = b + self._size
+        self._tree[i] = bucket[0][0] if bucket else inf
+        i //= 2
+        while i:
+            self._tree[i] = min(self._tree[2 * i], self._tree[2 * i + 1])
+            i //= 2
+
+    def _argmin(self, lo, hi):
+        """ 桶区间 [lo, hi) 中队首序号最小的桶，全空时返回 None """
+        best, best_b = inf, None
+        lo += self._size
+        hi += self._size
+        nodes = []
+        while lo < hi:
+            if lo & 1:
+                nodes.append(lo)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                nodes.append(hi)
+            lo //= 2
+            hi //= 2
+        for node in nodes:
+            if self._tree[node] < best:
+                best, best_b = self._tree[node], node
+        if best_b is None:
+            return None
+        while best_b < self._size:  # 沿最小值所在子树下降到叶子
+            best_b = 2 * best_b if self._tree[2 * best_b] == best else 2 * best_b + 1
+        return best_b - self._size
+
+    def _last_nonempty(self, hi):
+        """ 桶区间 [0, hi) 中编号最大的非空桶，全空时返回 None """
+        if hi <= 0:
+            return None
+        node, lo_node = hi - 1 + self._size, None
+        # 自叶子向上，找到第一个位于左侧且非空的兄弟子树
+        if self._tree[node] < inf:
+            return hi - 1
+        while node > 1:
+            if node & 1 and self._tree[node - 1] < inf:
+                lo_node = node - 1
+                break
+            node //= 2
+        if lo_node is None:
+            return None
+        while lo_node < self._size:
+            lo_node = 2 * lo_node + 1 if self._tree[2 * lo_node + 1] < inf else 2 * lo_node
+        return lo_node - self._size
+
+    def _take(self, b, pos=0):
+        bucket = self._buckets[b]
+        if pos == 0:
+            _, q = bucket.popleft()
+            self._refresh(b)
+        else:
+            _, q = bucket[pos]
+            del bucket[pos]
+        self._count -= 1
+        return q
+
+    # ---------- 挂牌 ----------
+    def push(self, q):
+        """ 挂牌一套房源 """
+        b = self._bucket(q)
+        bucket = self._buckets[b]
+        bucket.append((self._seq, q))
+        self._seq += 1
+        self._count += 1
+        if len(bucket) == 1:
+            self._refresh(b)
+
+    append = push  # 与原列表接口兼容
+
+    def extend(self, qualities):
+        """ 批量挂牌：逐桶追加，最后只刷新由空变为非空的桶 """
+        touched = set()
+        for q in qualities:
+            b = self._bucket(q)
+            bucket = self._buckets[b]
+            if not bucket:
+                touched.add(b)
+            bucket.append((self._seq, q))
+            self._seq += 1
+            self._count += 1
+        for b in touched:
+            self._refresh(b)
+
+    def clear(self):
+        for bucket in self._buckets:
+            bucket.clear()
+        self._tree = [inf] * (2 * self._size)
+        self._count = 0
+
+    # ---------- 成交 ----------
+    def pop_oldest(self):
+        """ 取出最早挂牌的房源（含无质量挂牌）；挂牌簿为空时抛出 IndexError """
+        b = self._argmin(0, self.n_buckets)
+        if b is None:
+            raise IndexError("pop from empty ReleasedHousingBook")
+        return self._take(b)
+
+    def _boundary(self, ceiling):
+        """ 上限所在的桶只部分可选：返回 (桶号, 可选挂牌在桶内的位置列表) """
+        kc = self._bucket(ceiling)
+        return kc, [i for i, (_, q) in enumerate(self._buckets[kc]) if q <= ceiling]
+
+    def pop_first_at_or_below(self, ceiling):
+        """ 质量 ≤ ceiling 的房源中最早挂牌的一套，没有则返回 None """
+        kc, eligible = self._boundary(ceiling)
+        b = self._argmin(0, kc)
+        if eligible and (b is None or self._buckets[kc][eligible[0]][0] < self._buckets[b][0][0]):
+            return self._take(kc, eligible[0])
+        return None if b is None else self._take(b)
+
+    def pop_best_at_or_below(self, ceiling):
+        """ 质量 ≤ ceiling 的最高质量档中最早挂牌的一套，没有则返回 None """
+        kc, eligible = self._boundary(ceiling)
+        if eligible:
+            return self._take(kc, eligible[0])
+        b = self._last_nonempty(kc)
+        return None if b is None else self._take(b)
+
+    def pop_at_or_below(self, ceiling, policy="fifo"):
+        """ 按匹配规则取出一套质量不超过上限的房源 """
+        if policy == "fifo":
+            return self.pop_first_at_or_below(ceiling)
+        if policy == "best":
+            return self.pop_best_at_or_below(ceiling)
+        raise ValueError(f"Unknown matching policy {policy!r}; expected one of {MATCHING_POLICIES}")
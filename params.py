@@ -0,0 +1,53 @@
+# ========== 模型常量与参数标准化 ==========
+# Mesa 引擎与向量化引擎共用同一套常量，避免两处各自维护
+
+PIR0, IG0 = 40.0, 0.10
+LR0, DPR0 = 0.08, 0.50
+GS0, ST0 = 0.20, 0.10
+ML0, RPR0 = 1.0, 10.0
+HSR0 = 5.0
+Q0 = 5.0
+delta = 0.1
+Q_pref = 1
+GRID_SIZE = 15  # 周期性网格的默认边长（两个引擎共用；人口很大时可按需放大）
+BETA = {"high": (1.5, 1.2, 0.5, 1.0), "middle": (1.2, 1.0, 1.0, 1.0), "low": (1.0, 0.8, 1.5, 0.8)}
+ALPHA = {"high": (0.5, 0.8, 0.3, 0.3, 1.0), "middle": (1.0, 1.2, 1.0, 1.0, 0.8), "low": (0.8, 1.5, 1.5, 1.5, 2.0)}
+
+# 收入组别及其初始抽样权重（顺序即向量化引擎中的组别编码 0/1/2）
+GROUPS = ("high", "middle", "low")
+GROUP_WEIGHTS = (0.2, 0.5, 0.3)
+
+# 九个政策参数（与侧边栏滑块一一对应）
+PARAM_KEYS = ("pir", "ig", "lr", "dpr", "gs", "stx", "ml", "rpr", "hsr")
+
+# 参数取值范围（与侧边栏滑块的上下限一致，供参数扫描抽样使用）
+PARAM_BOUNDS = {
+    "pir": (5, 40), "ig": (-5.0, 10.0), "lr": (3.0, 8.0), "dpr": (10, 50), "gs": (0, 20),
+    "stx": (0, 10), "ml": (0, 100), "rpr": (1.0, 10.0), "hsr": (0.1, 5.0),
+}
+
+# 预设情景参数（与侧边栏“选择情景”对应）
+SCENARIOS = {
+    "baseline_scenario": {"pir": 18, "ig": 3.0, "lr": 5.0, "dpr": 30, "gs": 5, "stx": 5, "ml": 50, "rpr": 3.5, "hsr": 2.5},
+    "credit_stimulus_scenario": {"pir": 12, "ig": 5.0, "lr": 3.0, "dpr": 15, "gs": 0, "stx": 3, "ml": 80, "rpr": 2.5, "hsr": 2.5},
+    "fiscal_subsidy_scenario": {"pir": 10, "ig": 3.0, "lr": 5.0, "dpr": 30, "gs": 20, "stx": 1, "ml": 80, "rpr": 3.2, "hsr": 2.5},
+}
+
+# 引擎逻辑版本号：修改某个引擎的行为后递增，使旧的缓存结果失效
+# mesa 2：随机数改由 SeedSequence 派生的 Generator 提供；mesa 3 / vectorized 2：稳态人口改为补足到目标规模
+ENGINE_VERSIONS = {"mesa": 3, "vectorized": 2}
+
+
+def normalize_params(params):
+    """ 将滑块取值标准化为决策方程使用的 til 字典 """
+    return {
+        "PIR": params["pir"] / PIR0,
+        "IG": (params["ig"] / 100) / IG0,
+        "LR": (params["lr"] / 100) / LR0,
+        "DPR": (params["dpr"] / 100) / DPR0,
+        "GS": (params["gs"] / 100) / GS0,
+        "ST": (params["stx"] / 100) / ST0,
+        "ML": (params["ml"] / 100) / ML0,
+        "RPR": params["rpr"] / RPR0,
+        "HSR": params["hsr"] / HSR0
+    }
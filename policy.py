@@ -0,0 +1,84 @@
+import numpy as np
+
+from housing_market_sim.params import ALPHA, BETA, GROUPS, PARAM_KEYS, normalize_params
+
+# ========== 政策上下文 ==========
+# 卖 / 买概率与新房供应量只依赖九个政策参数：参数变化时按组别计算一次，
+# 两个引擎逐户决策时直接查表，不再每户每步重新标准化参数、计算 z 值和 np.exp。
+# PolicySchedule 描述按步生效的参数变化（例如第 40 步起降息），由模拟循环在对应步之前调用 model.set_params()。
+
+
+class PolicyContext:
+    """ 当前生效的政策参数及其派生量 """
+
+    def __init__(self, params):
+        self.update(params)
+
+    def update(self, params):
+        """ 换用新的政策参数并重新计算派生量 """
+        self.params = dict(params)
+        til = normalize_params(self.params)
+        self.p_sell = np.empty(len(GROUPS))  # 按组别编码索引（向量化引擎）
+        self.p_buy = np.empty(len(GROUPS))
+        for code, grp in enumerate(GROUPS):
+            b1, b2, b3, b4 = BETA[grp]
+            z_sell = b1 * til["ML"] + b2 * til["RPR"] - b3 * til["ST"] + b4 * til["HSR"]
+            a1, a2, a3, a4, a5 = ALPHA[grp]
+            z_buy = -a1 * til["PIR"] + a2 * til["IG"] - a3 * til["LR"] - a4 * til["DPR"] + a5 * til["GS"]
+            self.p_sell[code] = 1 / (1 + np.exp(-z_sell))
+            self.p_buy[code] = 1 / (1 + np.exp(-z_buy))
+        # 按组别名称索引（Mesa 引擎逐户查表）
+        self.sell_prob = dict(zip(GROUPS, self.p_sell.tolist()))
+        self.buy_prob = dict(zip(GROUPS, self.p_buy.tolist()))
+        # 根据市场需求调整的每步新房供应量
+        p = self.params
+        self.new_supply = max(0, int((p["ml"] / 100) * 20 * (1 + (p["ig"] / 100)) * (1 - (p["pir"] / 100)) * (1 - (p["lr"] / 100))))
+
+
+class PolicySchedule:
+    """
+    按步生效的政策参数变化：{步: {参数: 新值}}，第 s 步的变化在该步开始前生效并一直保持到下一次变化。
+    步号与 history 行号一致（第 1 步为初始化之后的第一次 step）。
+    """
+
+    def __init__(self, changes=None):
+        self.changes = {}
+        for step, update in sorted((changes or {}).items(), key=lambda kv: int(kv[0])):
+            if int(step) < 1:
+                raise ValueError(f"Policy changes start at step 1, got step {step}")
+            unknown = set(update) - set(PARAM_KEYS)
+            if unknown:
+                raise ValueError(f"Unknown policy parameters {sorted(unknown)}; expected keys from {PARAM_KEYS}")
+            self.changes[int(step)] = dict(update)
+
+    def __bool__(self):
+        return bool(self.changes)
+
+    def at(self, step):
+        """ 第 step 步开始前要生效的变化，没有时返回 None """
+        return self.changes.get(step)
+
+    def column(self, key, base, steps):
+        """ 参数 key 在第 1..steps 步实际生效的取值（导出 history 时作为逐步的参数列） """
+        values = np.full(steps, float(base[key]))
+        for s, update in self.changes.items():
+            if key in update:
+                values[s - 1:] = update[key]
+        return values
+
+    def to_dict(self):
+        """ 可写成 JSON 的形式（键为字符串），用于缓存键与结果元数据 """
+        return {str(s): dict(update) for s, update in self.changes.items()}
+
+    @classmethod
+    def parse(cls, items):
+        """ 解析命令行形式 "40:lr=3.5,ml=60"（可重复给出） """
+        changes = {}
+        for item in items or []:
+            step, _, assignments = item.partition(":")
+            try:
+                update = {k: float(v) for k, v in (a.split("=", 1) for a in assignments.split(","))}
+                changes.setdefault(int(step), {}).update(update)
+            except ValueError:
+                raise ValueError(f"Expected STEP:KEY=VALUE[,KEY=VALUE...], got {item!r}") from None
+        return cls(changes)
@@ -0,0 +1,140 @@
+import cProfile
+import io
+import pstats
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# ========== 分阶段计时 ==========
+# 模型的 step() 在各阶段之间调用 profiler.lap("阶段名")，记录自上一次打点以来的耗时；
+# 计数器记录被激活的代理数、撮合成交数、整表扫描次数等。
+# 默认挂的是 NULL_PROFILER，打点与计数都是空操作；simulate(profile=True) 时换成 StepProfiler。
+
+
+class StepProfiler:
+    """ 逐步记录各阶段耗时（秒）与计数，end_step() 时形成计时表的一行 """
+    enabled = True
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.rows = []
+        self._phases = {}
+        self._counts = Counter()
+        self._mark = clock()
+
+    def start(self):
+        """ 设置打点起点（阶段计时从这里开始） """
+        self._mark = self.clock()
+
+    def lap(self, phase):
+        """ 把自上次打点以来的耗时记到 phase 上 """
+        now = self.clock()
+        self._phases[phase] = self._phases.get(phase, 0.0) + (now - self._mark)
+        self._mark = now
+
+    def count(self, name, n=1):
+        self._counts[name] += n
+
+    def end_step(self, step):
+        self.rows.append({"step": step, **self._phases, **self._counts})
+        self._phases = {}
+        self._counts = Counter()
+
+    # ---------- 汇总 ----------
+    def phase_names(self):
+        names = []
+        for row in self.rows:
+            for k, v in row.items():
+                if k != "step" and isinstance(v, float) and k not in names:
+                    names.append(k)
+        return names
+
+    def summary(self):
+        """ 各阶段总耗时、每步平均毫秒数与占比，以及各计数器的总和 """
+        phases = self.phase_names()
+        totals = {p: sum(row.get(p, 0.0) for row in self.rows) for p in phases}
+        grand = sum(totals.values()) or 1.0
+        steps = len(self.rows) or 1
+        counters = Counter()
+        for row in self.rows:
+            counters.update({k: v for k, v in row.items() if k != "step" and k not in totals})
+        return {
+            "steps": len(self.rows),
+            "phases": {p: {"total_s": round(totals[p], 6), "mean_ms": round(1000 * totals[p] / steps, 4),
+                           "share": round(totals[p] / grand, 4)} for p in phases},
+            "counters": dict(counters),
+        }
+
+    def format_table(self):
+        """ 文本计时表：每个阶段一行（按总耗时降序） """
+        summary = self.summary()
+        lines = [f"{'phase':<16}{'total s':>10}{'ms/step':>10}{'share':>8}"]
+        for p, s in sorted(summary["phases"].items(), key=lambda kv: -kv[1]["total_s"]):
+            lines.append(f"{p:<16}{s['total_s']:>10.3f}{s['mean_ms']:>10.3f}{s['share']:>8.1%}")
+        for k, v in summary["counters"].items():
+            lines.append(f"{k:<16}{v:>10}")
+        return "\n".join(lines)
+
+
+class NullProfiler:
+    """ 关闭时使用的空实现 """
+    enabled = False
+    rows = ()
+
+    def start(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def end_step(self, step):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+CAPTURE_MODES = ("cprofile", "pyinstrument")
+
+
+@contextmanager
+def capture(mode, out=None):
+    """
+    在代码块外包一层函数级剖析：
+    cprofile 写出 .prof（可用 snakeviz 查看），未给 out 时把前 30 个热点打印到 stderr；
+    pyinstrument（需另行安装）写出 .html，未给 out 时打印文本调用树。
+    """
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            if out:
+                profiler.dump_stats(out)
+            else:
+                buf = io.StringIO()
+                pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(30)
+                sys.stderr.write(buf.getvalue())
+    elif mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError as e:
+            raise ImportError("pyinstrument capture requires pyinstrument (pip install pyinstrument)") from e
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            if out:
+                with open(out, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+            else:
+                sys.stderr.write(profiler.output_text(unicode=True))
+    else:
+        raise ValueError(f"Unknown capture mode {mode!r}; expected one of {CAPTURE_MODES}")
@@ -0,0 +1,225 @@
+from types import MappingProxyType
+
+from housing_market_sim.counters import tenure_counts
+
+# ========== 大模型总结的提示词 ==========
+# 界面上的“生成总结”与批量总结（summarize.py）共用：由一次模拟的参数、history 与最终快照
+# 整理出 data_dict，再按语言与角色拼出 system / user 两条消息。
+
+LANGUAGES = ("中文", "English")
+SUMMARY_ROLES = ("policymaker", "regulator", "analyst")
+
+
+def generate_system_prompt(language, summary_role):
+    """
+    最终版 System Prompt 生成器：三角色差异化逻辑，精简中国特色任务逻辑，去除重复 policy_reference。
+    """
+
+    if language == "中文":
+        output_structure = (
+            "【背景说明】本任务基于中国住房市场制度改革与政策模拟情境。\n\n"
+            "你的输出请严格按照以下结构生成：\n"
+            "一、政策情景参数设定（直接呈现输入参数）；\n"
+            "二、模型输出结果归纳（在总结模型输出结果时，请重点识别数据所反映的市场运行态势与变化趋势，如整体上升、稳中有降、波动、结构恶化等，避免简单静态数据复述，限150字以内）；\n"
+            "三、政策建议（提出不超过4条，每条包含【对策标题】与建议内容，总字数控制在600字以内）。\n"
+        )
+
+        role_definitions = {
+            "policymaker": (
+                "你是一名住房制度改革政策制定专家，需基于ABM模拟结果提出制度性政策改革方案。\n"
+                "请关注以下制度优化方向（不限于此，允许你自主发现新问题与新机制）：\n"
+                "- 供需结构失衡、群体置换阻滞、过滤链条断点等制度短板；\n"
+                "- 保障性住房供给体系完善、城市更新与老旧小区改造；\n"
+                "- 多层次租赁市场完善、租购通道优化、品质提升与绿色改造；\n"
+                "- 住房金融分层支持、信贷风险防控与制度创新设计。\n"
+                "禁止数据复述与泛化政策套话，强调机制逻辑与制度创新性。"
+            ),
+
+            "regulator": (
+                "你是一名住房市场监管专家，需基于ABM模拟结果识别制度性风险并提出防控机制。\n"
+                "请关注以下监管重点方向（不限于此，允许你自主识别风险逻辑链条）：\n"
+                "- 品质风险、租赁金融化、杠杆扩张、二手流通障碍、平台违规行为等风险成因与扩散路径；\n"
+                "- 动态监测预警、征信管理、信用黑名单、平台治理、联合监管机制设计；\n"
+                "建议需具体可操作、逻辑清晰，禁止重复现象叙述与宏观套话。"
+            ),
+
+            "analyst": (
+                "你是一名住房制度演化与政策模拟研究员，需基于ABM模型结果提炼制度机制逻辑与模型扩展建议。\n"
+                "请关注以下研究拓展方向（不限于此，允许你自主探索制度机制建模空间）：\n"
+                "- 过滤链条演化机制、群体行为跃迁、路径依赖与制度反馈逻辑；\n"
+                "- 补贴制度、租购通道、信贷变量、财政反馈与品质结构性模型扩展；\n"
+                "- 多源数据整合、微观行为建模与制度评估闭环系统设计。\n"
+                "建议应突出学术创新性、机制建构逻辑与建模深化，避免一般性政策建议复述。"
+            )
+        }
+
+    else:  # English
+
+        output_structure = (
+            "【Context】This task is based on China's housing system reform and policy simulation context.\n\n"
+            "Your output must strictly follow the structure below:\n"
+            "1. Policy Scenario Parameters (directly present all input values);\n"
+            "2. Model Output Summary (within 150 words; focus on identifying market dynamics and structural tensions such as rise, fall, fluctuation, or imbalance; avoid simple static data listing);\n"
+            "3. Policy Recommendations (max 4 items; each includes [Policy Title] + recommendation content; total within 600 words).\n"
+        )
+
+        role_definitions = {
+            "policymaker": (
+                "You are a policymaker specialized in housing institutional reform. Based on ABM simulation results, propose institutional policy reform plans.\n"
+                "Focus areas (not limited to these):\n"
+                "- Supply-demand mismatch, group mobility barriers, filtering chain disruptions;\n"
+                "- Affordable housing system construction, urban renewal and old neighborhood renovation;\n"
+                "- Multi-level rental market development, rental-to-ownership pathways, quality enhancement and green retrofitting;\n"
+                "- Tiered financial credit support and systemic risk management.\n"
+                "Avoid simple data restatements and generic policy statements; emphasize institutional logic and innovative mechanisms."
+            ),
+
+            "regulator": (
+                "You are a housing market regulator. Based on ABM simulation outputs, identify systemic risks and propose regulatory mechanisms.\n"
+                "Focus areas (not limited to these):\n"
+                "- Quality risks, rental financialization, leverage expansion, resale market frictions, platform misconduct;\n"
+                "- Dynamic monitoring, credit scoring, blacklists, platform supervision, cross-departmental joint regulation.\n"
+                "Recommendations must be specific, operational, and logically clear, avoiding repetition of phenomena or broad policy slogans."
+            ),
+
+            "analyst": (
+                "You are a housing institutional dynamics researcher. Based on ABM model outputs, extract institutional logic and propose modeling extensions.\n"
+                "Focus areas (not limited to these):\n"
+                "- Filtering chain dynamics, group behavioral transitions, path dependency, policy feedback loops;\n"
+                "- Subsidy design, rental pathways, credit variables, fiscal feedback, quality structure modeling;\n"
+                "- Micro-level data integration, behavioral modeling, and institutional evaluation frameworks.\n"
+                "Proposals should emphasize academic innovation, mechanism construction, and modeling depth; avoid simple policy recommendations."
+            )
+        }
+
+    role_prompt = role_definitions.get(summary_role, "")
+    final_prompt = f"{role_prompt}\n\n{output_structure}"
+    return final_prompt
+
+# =============== 用户提示词模板 User Prompt ===============
+
+user_prompt_template = """
+【模拟数据输入】
+
+- 房价收入比（PIR）：{pir}
+- 收入增速（IG）：{ig}
+- 贷款利率（LR）：{lr}
+- 首付比例（DPR）：{dpr}
+- 购房补贴（GS）：{gs}
+- 二手房交易税（ST）：{stx}
+- 市场流动性（ML）：{ml}
+- 二手房售价/收入比（RPR）：{rpr}
+- 存量住房/家庭比（HSR）：{hsr}
+
+- 模型输出：
+  - 新房交易量：{new_home_sales}
+  - 二手房交易量：{second_home_sales}
+  - 租赁交易量：{rental_sales}
+  - 平均住房质量：{avg_quality}
+  - 低质房源占比：{low_quality_ratio}
+  - 各收入群体购租人口占比：{group_distribution}
+
+【任务要求】
+
+请基于以上数据，按照你的职责逻辑，完成完整分析与建议生成任务。
+"""
+
+# =============== 英文 User Prompt 版本（可选扩展） ===============
+
+user_prompt_template_en = """
+[Simulation Data Input]
+
+- Price-to-Income Ratio (PIR): {pir}
+- Income Growth (IG): {ig}
+- Loan Rate (LR): {lr}
+- Down Payment Ratio (DPR): {dpr}
+- Government Subsidy (GS): {gs}
+- Secondary Housing Tax (ST): {stx}
+- Market Liquidity (ML): {ml}
+- Resale Price-to-Income Ratio (RPR): {rpr}
+- Housing Stock-to-Family Ratio (HSR): {hsr}
+
+- Model Outputs:
+  - New Home Transactions: {new_home_sales}
+  - Resale Home Transactions: {second_home_sales}
+  - Rental Transactions: {rental_sales}
+  - Average Housing Quality: {avg_quality}
+  - Low Quality Housing Share: {low_quality_ratio}
+  - Ownership/Rental Population Distribution by Income Groups: {group_distribution}
+
+[Task Requirements]
+
+Based on the above data, please perform a full institutional analysis and policy recommendation task according to your designated role.
+"""
+
+
+# ✅ 三种角色 × 两种语言的 system prompt 与两种语言的 user prompt 模板在导入时生成一次，之后只查表
+SYSTEM_PROMPTS = MappingProxyType({(language, role): generate_system_prompt(language, role)
+                                   for language in LANGUAGES for role in SUMMARY_ROLES})
+USER_PROMPT_TEMPLATES = MappingProxyType({"中文": user_prompt_template, "English": user_prompt_template_en})
+
+
+def calculate_group_distribution(state, total_agents):
+    """ 根据最终代理快照计算各收入群体的购/租人口占比 """
+    counts = tenure_counts(state["group"], state["has_house"])  # 一次 bincount 得到六个计数
+    high_income_buyers = counts[("high", True)]
+    mid_income_buyers = counts[("middle", True)]
+    low_income_buyers = counts[("low", True)]
+
+    high_income_renters = counts[("high", False)]
+    mid_income_renters = counts[("middle", False)]
+    low_income_renters = counts[("low", False)]
+
+
+    return (
+        f"高收入群体购房占比约 {high_income_buyers/total_agents:.2%}，"
+        f"中收入群体购房占比约 {mid_income_buyers/total_agents:.2%}，"
+        f"低收入群体购房占比约 {low_income_buyers/total_agents:.2%}；"
+        f"高收入群体租房占比约 {high_income_renters/total_agents:.2%}，"
+        f"中收入群体租房占比约 {mid_income_renters/total_agents:.2%}，"
+        f"低收入群体租房占比约 {low_income_renters/total_agents:.2%}。"
+    )
+
+
+def summary_data(params, history, final_state, n_agents):
+    """ 生成 data_dict 给LLM用：政策参数 + 动态趋势摘要 + 群体分布 """
+    # 动态趋势提取
+    trend_summary = {
+        "avg_quality_start": history["avg_quality"][0],
+        "avg_quality_end": history["avg_quality"][-1],
+        "avg_quality_trend": "下降" if history["avg_quality"][-1] < history["avg_quality"][0] else "上升",
+
+        "low_quality_ratio_start": history["low_quality_ratio"][0],
+        "low_quality_ratio_end": history["low_quality_ratio"][-1],
+        "low_quality_trend": "恶化" if history["low_quality_ratio"][-1] > history["low_quality_ratio"][0] else "改善",
+
+        "new_home_total": sum(history["new_home_market"]),
+        "secondary_total": sum(history["secondary_market"]),
+        "rental_total": sum(history["rental_market"])
+    }
+
+    # 更符合LLM理解的数据字典
+    return {
+        **{k: params[k] for k in ("pir", "ig", "lr", "dpr", "gs", "stx", "ml", "rpr", "hsr")},
+        "new_home_sales": trend_summary["new_home_total"],
+        "second_home_sales": trend_summary["secondary_total"],
+        "rental_sales": trend_summary["rental_total"],
+        "avg_quality": f"{trend_summary['avg_quality_start']:.2f} → {trend_summary['avg_quality_end']:.2f}（{trend_summary['avg_quality_trend']}）",
+        "low_quality_ratio": f"{trend_summary['low_quality_ratio_start']:.2%} → {trend_summary['low_quality_ratio_end']:.2%}（{trend_summary['low_quality_trend']}）",
+        "group_distribution": calculate_group_distribution(final_state, n_agents)
+    }
+
+
+def build_messages(language, summary_role, data_dict):
+    """ 一次总结请求的 system / user 消息 """
+    # 预先生成的 system_prompt（未知角色时按原逻辑即时生成）
+    system_prompt = SYSTEM_PROMPTS.get((language, summary_role)) or generate_system_prompt(language, summary_role)
+
+    # 填入数据的 user_prompt
+    template = user_prompt_template if language == "中文" else user_prompt_template_en
+    user_prompt = template.format(**data_dict)
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
@@ -0,0 +1,143 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from housing_market_sim.simulation import HISTORY_KEYS, simulate
+
+# ========== 蒙特卡洛重复模拟 ==========
+# 同一情景用 R 个种子在子进程中并行运行，父进程在线归约（均值、标准差、分位数），
+# 内存只与步数成正比，与重复次数无关。
+
+
+class P2Quantile:
+    """
+    P² 在线分位数估计（Jain & Chlamtac, 1985），对每个时间步并行维护 5 个标记。
+    前 5 次观测直接保存，之后只保留标记高度与位置。
+    """
+
+    def __init__(self, p, size):
+        self.p = p
+        self.count = 0
+        self._buffer = np.empty((5, size))
+        self.q = None  # 标记高度 (5, T)
+        self.n = None  # 标记实际位置 (5, T)
+        self.np_ = np.array([0, 2 * p, 4 * p, 2 + 2 * p, 4])[:, None]  # 期望位置
+        self.dn = np.array([0, p / 2, p, (1 + p) / 2, 1])[:, None]
+
+    def update(self, x):
+        x = np.asarray(x, dtype=float)
+        if self.count < 5:
+            self._buffer[self.count] = x
+            self.count += 1
+            if self.count == 5:
+                self.q = np.sort(self._buffer, axis=0)
+                self.n = np.tile(np.arange(5, dtype=float)[:, None], (1, x.size))
+                self.np_ = np.tile(self.np_, (1, x.size))
+            return
+        self.count += 1
+        q, n = self.q, self.n
+        # 更新极值并找到 x 所在的区间 k ∈ [0, 3]
+        np.minimum(q[0], x, out=q[0])
+        np.maximum(q[4], x, out=q[4])
+        k = (x >= q[1]).astype(int) + (x >= q[2]) + (x >= q[3])
+        n += np.arange(5)[:, None] > k[None, :]
+        self.np_ += self.dn
+        # 调整中间三个标记
+        for i in (1, 2, 3):
+            d = self.np_[i] - n[i]
+            move = ((d >= 1) & (n[i + 1] - n[i] > 1)) | ((d <= -1) & (n[i - 1] - n[i] < -1))
+            if not move.any():
+                continue
+            s = np.sign(d)
+            parabolic = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+            )
+            neighbour_q = np.where(s > 0, q[i + 1], q[i - 1])
+            neighbour_n = np.where(s > 0, n[i + 1], n[i - 1])
+            linear = q[i] + s * (neighbour_q - q[i]) / (neighbour_n - n[i])
+            ok = (q[i - 1] < parabolic) & (parabolic < q[i + 1])
+            q[i] = np.where(move, np.where(ok, parabolic, linear), q[i])
+            n[i] = np.where(move, n[i] + s, n[i])
+
+    def value(self):
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            return np.quantile(self._buffer[:self.count], self.p, axis=0)
+        return self.q[2].copy()
+
+
+class ReplicationReducer:
+    """ 对多次重复的 history 逐条在线归约：Welford 均值/方差 + P² 分位数 """
+
+    def __init__(self, steps, quantiles=(0.05, 0.5, 0.95), keys=HISTORY_KEYS):
+        self.steps = steps
+        self.quantiles = tuple(quantiles)
+        self.keys = tuple(keys)
+        self.count = 0
+        self._mean = {k: np.zeros(steps) for k in self.keys}
+        self._m2 = {k: np.zeros(steps) for k in self.keys}
+        self._q = {k: [P2Quantile(p, steps) for p in self.quantiles] for k in self.keys}
+
+    def update(self, history):
+        self.count += 1
+        for k in self.keys:
+            x = np.asarray(history[k], dtype=float)
+            delta = x - self._mean[k]
+            self._mean[k] += delta / self.count
+            self._m2[k] += delta * (x - self._mean[k])
+            for est in self._q[k]:
+                est.update(x)
+
+    def mean(self, key):
+        return self._mean[key].copy()
+
+    def std(self, key):
+        if self.count < 2:
+            return np.zeros(self.steps)
+        return np.sqrt(self._m2[key] / (self.count - 1))
+
+    def quantile(self, key, p):
+        return self._q[key][self.quantiles.index(p)].value()
+
+    def band(self, key):
+        """ 最低与最高分位数构成的阴影带 """
+        return self.quantile(key, self.quantiles[0]), self.quantile(key, self.quantiles[-1])
+
+    def mean_history(self):
+        return {k: self.mean(k) for k in self.keys}
+
+    def to_rows(self):
+        """ 每步一行：各序列的均值、标准差与分位数 """
+        columns = {"step": np.arange(1, self.steps + 1)}
+        for k in self.keys:
+            columns[f"{k}_mean"] = self.mean(k)
+            columns[f"{k}_std"] = self.std(k)
+            for p in self.quantiles:
+                columns[f"{k}_q{round(p * 100):02d}"] = self.quantile(k, p)
+        return [{name: col[t].item() for name, col in columns.items()} for t in range(self.steps)]
+
+
+def _run_replicate(task):
+    """ 子进程中运行一次重复，只把 history 传回父进程；第 r 次重复使用随机流 (seed, (r,)) """
+    params, seed, r, n_agents, steps, engine = task
+    return simulate(params, seed, n_agents, steps, engine=engine, stream=(r,)).history
+
+
+def run_replicates(params, replicates, seed=42, n_agents=50, steps=100, engine="vectorized",
+                   max_workers=None, quantiles=(0.05, 0.5, 0.95)):
+    """ 并行运行 R 次重复并在线归约，返回 ReplicationReducer """
+    reducer = ReplicationReducer(steps, quantiles)
+    tasks = [(params, seed, r, n_agents, steps, engine) for r in range(replicates)]
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if max_workers <= 1:
+        for task in tasks:
+            reducer.update(_run_replicate(task))
+        return reducer
+    # 按重复编号顺序归约（pool.map 保序），使结果与进程数无关
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for history in pool.map(_run_replicate, tasks):
+            reducer.update(history)
+    return reducer
@@ -0,0 +1,214 @@
+import functools
+import io
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from housing_market_sim.cache import default_cache_dir, demography_values, result_key
+from housing_market_sim.demography import DEFAULT_DEMOGRAPHY, Demography
+from housing_market_sim.history import HISTORY_KEYS, HistoryRecorder
+from housing_market_sim.log import get_logger
+from housing_market_sim.params import ENGINE_VERSIONS, GRID_SIZE, PARAM_KEYS
+from housing_market_sim.policy import PolicySchedule
+from housing_market_sim.simulation import Result, simulate
+from housing_market_sim.sweep import history_metrics, run_point
+
+# ========== 持久化的模拟结果库 ==========
+# 每次完整模拟写入本地 SQLite 的一行，键为 cache.result_key（参数 + 种子 + 规模 + 步数 + 引擎版本 + 政策路径 + 人口动态）。
+# 九个政策参数、种子、规模、人口动态与汇总指标各占一列并建索引，可以按列条件查询，例如 lr < 4 且 gs > 10；
+# 条件只能使用 QUERY_COLUMNS 中的列与固定的比较符，取值一律作为绑定参数传入，不拼接进 SQL。
+# 完整 history 与最终代理快照压缩成一个 .npz 二进制块放在同一行。
+# 界面总是使用默认结果库；命令行与参数扫描指定 --store 时才在模拟前先按键查询并写入。
+# 算过的情景（包括以前扫描过的设计点）重启后也能在毫秒级读回。
+# 引擎行为改变时递增 params.ENGINE_VERSIONS，旧结果的键随之失效。
+#   python -m housing_market_sim sweep --store runs.sqlite ...
+#   python -m housing_market_sim results query --store runs.sqlite --where "lr<4" --where "gs>10" --out low_rate.csv
+
+SUMMARY_KEYS = ("new_home_total", "secondary_total", "rental_total", "avg_quality_start", "avg_quality_end",
+                "low_quality_ratio_start", "low_quality_ratio_end", "households_end")
+COLUMNS = (("key", "TEXT PRIMARY KEY"), ("engine", "TEXT"), ("engine_version", "INTEGER"), ("seed", "INTEGER"),
+           ("n_agents", "INTEGER"), ("steps", "INTEGER"), ("grid_size", "INTEGER"), ("schedule", "TEXT"),
+           ("created", "REAL"), *((k, "REAL") for k in PARAM_KEYS), *((k, "REAL") for k in SUMMARY_KEYS),
+           ("arrays", "BLOB"), ("arrivals_lo", "INTEGER"), ("arrivals_hi", "INTEGER"), ("exit_rate", "REAL"),
+           ("target_population", "INTEGER"))
+DEMOGRAPHY_COLUMNS = ("arrivals_lo", "arrivals_hi", "exit_rate", "target_population")
+INDEXED = PARAM_KEYS + ("seed", "n_agents", "steps", "engine") + DEMOGRAPHY_COLUMNS + SUMMARY_KEYS
+META_COLUMNS = tuple(name for name, _ in COLUMNS if name != "arrays")
+QUERY_COLUMNS = tuple(name for name in META_COLUMNS if name not in ("key", "schedule"))  # 可用于条件与排序的列
+OPERATORS = ("<", "<=", ">", ">=", "=", "!=")
+_FILTER = re.compile(r"^\s*(\w+)\s*(<=|>=|!=|=|<|>)\s*(.+?)\s*$")
+
+log = get_logger("results")
+
+
+def default_store_path():
+    """ 默认结果库：缓存目录下的 results.sqlite（与大模型总结缓存同一目录） """
+    return default_cache_dir() / "results.sqlite"
+
+
+def _pack(result):
+    """ history 与最终快照 -> 压缩的 .npz 字节 """
+    arrays = {f"history/{k}": np.asarray(result.history[k]) for k in HISTORY_KEYS}
+    arrays.update({f"final/{k}": np.asarray(v) for k, v in result.final_state.items()})
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def _unpack(blob):
+    with np.load(io.BytesIO(blob)) as data:
+        history = {k.split("/", 1)[1]: data[k] for k in data.files if k.startswith("history/")}
+        final_state = {k.split("/", 1)[1]: data[k] for k in data.files if k.startswith("final/")}
+    return history, final_state
+
+
+class ResultStore:
+    """ 以 result_key 为主键的模拟结果库（SQLite）；各线程共用一个连接，读写加锁 """
+
+    def __init__(self, path=None, timeout=30.0):
+        self.path = Path(path) if path is not None else default_store_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # timeout 为等待其他进程（参数扫描的工作进程）写锁的秒数
+        self._conn = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS runs ({', '.join(f'{n} {t}' for n, t in COLUMNS)})")
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+            for name, kind in COLUMNS:  # 旧版本建的库补上新增的列
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE runs ADD COLUMN {name} {kind}")
+            for name in INDEXED:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS runs_{name} ON runs ({name})")
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM runs WHERE key = ?", (key,)).fetchone() is not None
+
+    def get(self, key):
+        """ 按键读回 Result；不存在时返回 None """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT engine, seed, n_agents, steps, grid_size, schedule, arrays, "
+                f"{', '.join(DEMOGRAPHY_COLUMNS)}, {', '.join(PARAM_KEYS)} FROM runs WHERE key = ?",
+                (key,)).fetchone()
+        if row is None:
+            return None
+        engine, seed, n_agents, steps, grid_size, schedule, blob, lo, hi, exit_rate, target = row[:11]
+        history, final_state = _unpack(blob)
+        demography = Demography(arrivals=(lo, hi), exit_rate=exit_rate, target_population=target) \
+            if lo is not None else DEFAULT_DEMOGRAPHY
+        return Result(dict(zip(PARAM_KEYS, row[11:])), seed, n_agents, steps, engine,
+                      HistoryRecorder.from_columns(history), final_state,
+                      schedule=PolicySchedule(json.loads(schedule)) if schedule else None, grid_size=grid_size,
+                      demography=demography)
+
+    def put(self, key, result):
+        """ 写入一次完整模拟的结果（同键覆盖） """
+        summary = result.summary()
+        (lo, hi), exit_rate, target = demography_values(result.demography or DEFAULT_DEMOGRAPHY)
+        row = {
+            "key": key, "engine": result.engine, "engine_version": ENGINE_VERSIONS[result.engine],
+            "seed": int(result.seed), "n_agents": int(result.n_agents), "steps": int(result.steps),
+            "grid_size": int(result.grid_size),
+            "schedule": json.dumps(result.schedule.to_dict()) if result.schedule else None, "created": time.time(),
+            **{k: float(result.params[k]) for k in PARAM_KEYS}, **{k: summary[k] for k in SUMMARY_KEYS},
+            "arrivals_lo": int(lo), "arrivals_hi": int(hi), "exit_rate": exit_rate,
+            "target_population": None if target is None else int(target), "arrays": _pack(result),
+        }
+        with self._lock, self._conn:
+            self._conn.execute(f"INSERT OR REPLACE INTO runs ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                               tuple(row.values()))
+
+    def query(self, filters=(), order_by="created", descending=False, limit=None):
+        """
+        按条件查询运行记录（不含数组），返回字典列表。filters 为 (列, 比较符, 取值) 的序列，各条件同时满足，
+        例如 query([("lr", "<", 4), ("gs", ">", 10)])；列与 order_by 必须在 QUERY_COLUMNS 中，比较符见 OPERATORS。
+        """
+        conditions, args = [], []
+        for column, op, value in filters:
+            _check_column(column)
+            if op not in OPERATORS:
+                raise ValueError(f"unknown comparison {op!r}; use one of {', '.join(OPERATORS)}")
+            conditions.append(f"{column} {op} ?")
+            args.append(value)
+        sql = f"SELECT {', '.join(META_COLUMNS)} FROM runs"
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        if order_by:
+            _check_column(order_by)
+            sql += f" ORDER BY {order_by}{' DESC' if descending else ''}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [dict(zip(META_COLUMNS, row)) for row in rows]
+
+
+def _check_column(column):
+    if column not in QUERY_COLUMNS:
+        raise ValueError(f"unknown column {column!r}; use one of {', '.join(QUERY_COLUMNS)}")
+
+
+def parse_filter(text):
+    """ "lr<4" / "engine=mesa" -> ("lr", "<", 4.0)；数值列的取值必须是数字 """
+    match = _FILTER.match(text)
+    if match is None:
+        raise ValueError(f"cannot parse condition {text!r}; expected e.g. lr<4 or engine=mesa")
+    column, op, value = match.groups()
+    _check_column(column)
+    if dict(COLUMNS)[column] == "TEXT":
+        return column, op, value
+    try:
+        return column, op, float(value)
+    except ValueError:
+        raise ValueError(f"column {column!r} is numeric; cannot compare it with {value!r}") from None
+
+
+def simulate_cached(store, params, seed=42, n_agents=50, steps=100, engine="mesa", schedule=None,
+                    grid_size=GRID_SIZE, demography=None):
+    """ 先查结果库，没有时模拟并写入；返回 (Result, 是否命中) """
+    key = result_key(params, seed, n_agents, steps, engine, schedule=schedule, grid_size=grid_size,
+                     demography=demography)
+    result = store.get(key)
+    if result is not None:
+        return result, True
+    result = simulate(params, seed, n_agents, steps, engine=engine, schedule=schedule, grid_size=grid_size,
+                      demography=demography)
+    store.put(key, result)
+    return result, False
+
+
+@functools.lru_cache(maxsize=None)
+def _worker_store(path):
+    """ 每个（工作）进程只打开一次结果库，之后的设计点共用这个连接 """
+    return ResultStore(path)
+
+
+def _stored_point(path, task):
+    """ 参数扫描的设计点：先查结果库（与 sweep.run_point 的参数与输出相同） """
+    run_id, params, seed, n_agents, steps, engine = task
+    try:
+        result, _ = simulate_cached(_worker_store(path), params, seed, n_agents, steps, engine)
+    except sqlite3.Error as e:  # 结果库不可用时照常模拟，不影响扫描
+        log.warning("Result store %s unavailable (%s); simulating without it", path, e)
+        return run_point(task)
+    return {"run": run_id, "seed": seed, **params, **history_metrics(result.history)}
+
+
+def stored_point_fn(path=None):
+    """ 供 run_sweep(point_fn=...) 使用的、先查结果库的设计点函数（可被进程池序列化） """
+    return functools.partial(_stored_point, str(path if path is not None else default_store_path()))
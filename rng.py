@@ -0,0 +1,67 @@
+import random
+
+import numpy as np
+
+# ========== 随机数 ==========
+# 每个模型持有自己的 numpy Generator（PCG64），由 SeedSequence(seed, spawn_key=stream) 派生，不再使用全局
+# random / np.random 状态：同一进程里并发运行的模型（例如 Streamlit 多会话线程）互不干扰，
+# 结果只取决于 (seed, stream)，与运行顺序、线程 / 进程数无关。
+# stream 是派生路径：第 r 次重复模拟用 (r,)，与 SeedSequence(seed).spawn(R)[r] 相同，
+# 因此任务可以按任意方式分给工作进程，每个任务自己构造随机流，不依赖其他任务是否先运行。
+# 向量化引擎直接在 Generator 上整批抽样；Mesa 引擎的调度器与逐户决策需要 random.Random 接口，
+# 由 GeneratorRandom 适配（按块从 Generator 取均匀数，逐个交给 random.Random 的各个方法）。
+
+
+def seed_sequence(seed, *stream):
+    """ 根种子 seed 下路径为 stream 的 SeedSequence；seed 已是 SeedSequence 时原样返回 """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed, spawn_key=tuple(int(s) for s in stream))
+
+
+def make_generator(seed, *stream):
+    """ (seed, stream) 对应的 Generator """
+    return np.random.Generator(np.random.PCG64(seed_sequence(seed, *stream)))
+
+
+class GeneratorRandom(random.Random):
+    """
+    以 numpy Generator 为底层的 random.Random：uniform / choice / choices / randint / shuffle 等方法
+    都经由 random() 取数，random() 每次从 Generator 批量取 BLOCK 个均匀数再逐个返回。
+    """
+    BLOCK = 4096
+
+    def __init__(self, generator):
+        self.generator = generator
+        self._block = []
+        self._pos = 0
+        self._block_state = None  # 取当前这一批之前 Generator 的状态（用于检查点重放）
+        super().__init__()
+
+    def seed(self, *args, **kwargs):
+        """ 种子由 Generator 决定，忽略 random.Random 的重新播种 """
+
+    def random(self):
+        pos = self._pos
+        if pos == len(self._block):
+            self._block_state = self.generator.bit_generator.state
+            self._block = self.generator.random(self.BLOCK).tolist()
+            pos = 0
+        self._pos = pos + 1
+        return self._block[pos]
+
+    def getstate(self):
+        """ 可写成 JSON 的状态：取当前批之前的 Generator 状态、批大小与已用个数，以及 Generator 当前状态 """
+        return {"block_state": self._block_state, "block_size": len(self._block), "position": self._pos,
+                "generator": self.generator.bit_generator.state}
+
+    def setstate(self, state):
+        bit_generator = self.generator.bit_generator
+        if state["block_state"] is not None:
+            bit_generator.state = state["block_state"]
+            self._block = self.generator.random(state["block_size"]).tolist()
+        else:
+            self._block = []
+        self._block_state = state["block_state"]
+        self._pos = state["position"]
+        bit_generator.state = state["generator"]
@@ -0,0 +1,195 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from housing_market_sim.checkpoint import Checkpoint, capture
+from housing_market_sim.demography import Demography
+from housing_market_sim.history import HISTORY_KEYS, HistoryRecorder
+from housing_market_sim.params import GRID_SIZE, PARAM_KEYS
+from housing_market_sim.policy import PolicySchedule
+from housing_market_sim.profiling import StepProfiler
+from housing_market_sim.rng import seed_sequence
+from housing_market_sim.vectorized import VectorizedHousingMarketModel
+
+# ========== 无界面副作用的模拟入口 ==========
+# 只依赖 numpy（以及按需导入的 mesa 核心），不导入 streamlit / openai / mesa.visualization，
+# 供命令行、批处理与服务端直接调用。
+
+ENGINES = ("mesa", "vectorized")
+
+
+def get_engine(engine):
+    """ 按名称返回模型类；Mesa 引擎按需导入 """
+    if engine == "vectorized":
+        return VectorizedHousingMarketModel
+    if engine == "mesa":
+        from housing_market_sim.model import HousingMarketModel
+        return HousingMarketModel
+    raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
+
+
+@dataclass
+class Result:
+    """ 一次模拟的完整输出：参数、逐步 history 与最终代理快照 """
+    params: dict
+    seed: int
+    n_agents: int
+    steps: int
+    engine: str
+    history: HistoryRecorder
+    final_state: dict
+    profile: StepProfiler = None  # simulate(profile=True) 时的分阶段计时表
+    checkpoint: Checkpoint = None  # simulate(checkpoint_at=k) 时第 k 步结束的检查点
+    schedule: PolicySchedule = None  # 按步生效的政策参数变化（params 为第 1 步的参数）
+    grid_size: int = GRID_SIZE  # 周期性网格边长（final_state 中 pos_x / pos_y 的取值范围）
+    demography: Demography = None  # 人口动态设置（None 为缺省：只进不出）
+
+    def summary(self):
+        """ 与 LLM 总结使用的趋势摘要口径一致的汇总指标 """
+        h = self.history
+        return {
+            "new_home_total": int(sum(h["new_home_market"])),
+            "secondary_total": int(sum(h["secondary_market"])),
+            "rental_total": int(sum(h["rental_market"])),
+            "avg_quality_start": float(h["avg_quality"][0]),
+            "avg_quality_end": float(h["avg_quality"][-1]),
+            "low_quality_ratio_start": float(h["low_quality_ratio"][0]),
+            "low_quality_ratio_end": float(h["low_quality_ratio"][-1]),
+            "households_end": int(self.final_state["group"].size),
+        }
+
+    def to_frame(self):
+        """ 每步一行的 history 表，附带参数列（需要 pandas） """
+        import pandas as pd
+        frame = pd.DataFrame({k: np.asarray(self.history[k]) for k in HISTORY_KEYS})
+        frame.insert(0, "step", np.arange(1, len(frame) + 1))
+        for k, v in self._param_columns().items():
+            frame[k] = v
+        frame["seed"] = self.seed
+        frame["engine"] = self.engine
+        return frame
+
+    def _param_columns(self):
+        """ 各政策参数的取值：不随时间变化时为标量，有政策路径时为逐步数组 """
+        columns = {k: float(self.params[k]) for k in PARAM_KEYS}
+        if self.schedule:
+            n = len(self.history[HISTORY_KEYS[0]])
+            for k in {k for update in self.schedule.changes.values() for k in update}:
+                columns[k] = self.schedule.column(k, self.params, n)
+        return columns
+
+    def _constants(self):
+        """ 导出表中每行附带的参数列 """
+        return {**self._param_columns(), "seed": self.seed, "engine": self.engine}
+
+    def save(self, path):
+        """ 按扩展名写出 history：.parquet / .csv（由列数组直接写出，需要 pyarrow）/ .json """
+        path = Path(path)
+        suffix = path.suffix.lower()
+        history = self.history
+        if not isinstance(history, HistoryRecorder):
+            history = HistoryRecorder.from_columns(history)
+        if suffix == ".parquet":
+            history.to_parquet(path, constants=self._constants())
+        elif suffix == ".csv":
+            history.to_csv(path, constants=self._constants())
+        elif suffix == ".json":
+            payload = {
+                "params": self.params, "seed": self.seed, "n_agents": self.n_agents, "steps": self.steps,
+                "engine": self.engine, "grid_size": self.grid_size,
+                "history": {k: np.asarray(history[k]).tolist() for k in HISTORY_KEYS},
+            }
+            if self.schedule:
+                payload["schedule"] = self.schedule.to_dict()
+            path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        else:
+            raise ValueError(f"Unsupported output format {suffix!r}; use .parquet, .csv or .json")
+        return path
+
+
+def simulate(params, seed=42, n_agents=50, steps=100, engine="mesa", demography=None, spill_dir=None,
+             profile=False, checkpoint_at=None, schedule=None, stream=(), grid_size=GRID_SIZE):
+    """
+    运行一次完整模拟并返回 Result；params 为九个政策参数组成的字典，
+    demography 为 Demography 人口动态设置（缺省只进不出，与原模型一致），
+    spill_dir 给定时 history 按块落盘（超长运行），profile=True 时记录每步各阶段耗时，
+    checkpoint_at=k 时在第 k 步结束后记录检查点（Result.checkpoint），供 resume() / branch() 继续运行，
+    schedule 为 PolicySchedule 政策路径（例如第 40 步起降息），对应步开始前更换参数；
+    stream 为随机流的派生路径（见 rng.py，例如第 r 次重复模拟用 (r,)），随机数只取决于 (seed, stream)，
+    grid_size 为周期性网格边长（人口很大时同步放大，保持每格户数不变）。
+    """
+    params = {k: params[k] for k in PARAM_KEYS}
+    model = get_engine(engine)(n_agents, params, seed=seed_sequence(seed, *stream), demography=demography,
+                               grid_size=grid_size)
+
+    history = HistoryRecorder(capacity=steps, spill_dir=spill_dir)
+    checkpoint = None
+    if checkpoint_at is not None:
+        if not 0 <= checkpoint_at <= steps:
+            raise ValueError(f"checkpoint_at must be within [0, {steps}], got {checkpoint_at}")
+        profiler = _advance(model, history, 1, checkpoint_at, profile, schedule)
+        # 检查点记录第 k 步实际生效的参数
+        checkpoint = capture(model, history, checkpoint_at, model.params, seed, n_agents, demography)
+        profiler = _advance(model, history, checkpoint_at + 1, steps, profiler, schedule)
+    else:
+        profiler = _advance(model, history, 1, steps, profile, schedule)
+    model.events.report(engine=engine, seed=seed, steps=steps)
+    return Result(params, seed, n_agents, steps, engine, history, model.snapshot(), profiler, checkpoint,
+                  schedule or None, grid_size, demography)
+
+
+def _advance(model, history, first, last, profiler=False, schedule=None):
+    """
+    运行第 first..last 步并逐步记录 history；profiler 为 True 时新建 StepProfiler，返回所用的 profiler。
+    schedule 中第 s 步的参数变化在该步开始前生效，只在变化的那一步重新计算一次决策概率。
+    """
+    if profiler is True:
+        profiler = StepProfiler()
+    if profiler:
+        model.profiler = profiler
+    for step in range(first, last + 1):
+        update = schedule.at(step) if schedule else None
+        if update:
+            model.set_params({**model.params, **update})
+        model.step()
+        model.render_model()  # 与界面一致：每步额外执行一次代理行动
+        history.append(model.step_statistics())
+        if profiler:
+            profiler.lap("collect")
+            profiler.end_step(step)
+    return profiler or None
+
+
+def resume(checkpoint, steps, params=None, profile=False, schedule=None):
+    """
+    从检查点继续运行到第 steps 步；params 给定时从第 checkpoint.step + 1 步起改用新的政策参数（政策冲击），
+    schedule 为之后各步的政策路径（只使用 checkpoint.step 之后的变化）。
+    返回的 Result 包含完整的 1..steps 步 history，前 checkpoint.step 步取自检查点。
+    """
+    if steps < checkpoint.step:
+        raise ValueError(f"steps ({steps}) is before the checkpoint step ({checkpoint.step})")
+    params = dict(checkpoint.params) if params is None else {k: params[k] for k in PARAM_KEYS}
+    model = get_engine(checkpoint.engine).from_state(checkpoint.state, params, seed=checkpoint.seed,
+                                                     demography=checkpoint.demography)
+    history = HistoryRecorder.from_columns(checkpoint.history, capacity=steps)
+    profiler = _advance(model, history, checkpoint.step + 1, steps, profile, schedule)
+    model.events.report(engine=checkpoint.engine, seed=checkpoint.seed, steps=steps,
+                        resumed_from=checkpoint.step)
+    return Result(params, checkpoint.seed, checkpoint.n_agents, steps, checkpoint.engine, history,
+                  model.snapshot(), profiler, grid_size=checkpoint.state.get("grid", {}).get("width", GRID_SIZE),
+                  demography=checkpoint.demography)
+
+
+def branch(checkpoint, policies, steps):
+    """
+    让多组反事实政策从同一检查点继续运行，共享前缀只模拟一次；
+    policies 为 {名称: 政策参数} 或 {名称: (政策参数, PolicySchedule)}，返回 {名称: Result}。
+    各分支从相同的随机数状态出发（共同随机数）。
+    """
+    results = {}
+    for name, policy in policies.items():
+        params, schedule = policy if isinstance(policy, tuple) else (policy, None)
+        results[name] = resume(checkpoint, steps, params, schedule=schedule)
+    return results
@@ -0,0 +1,138 @@
+import numpy as np
+
+# ========== 数组空间索引 ==========
+# 代理位置只保存在两列整数数组 (x, y) 里：批量迁移是对被选中代理的 O(1) 数组写入，不再逐户修改格内列表。
+# 需要按格查询时才对全部位置按格编号做一次稳定排序，得到按格排列的代理编号 order 与每格起点 start：
+# 格数不超过 2^16（例如 256x256 以内）时格编号用 uint16 表示，NumPy 对 16 位整数的稳定排序是基数排序
+# （逐字节的计数排序），O(N + 格数)；更大的网格退回比较排序，O(N log N)。
+# 之后“某格有哪些代理”是一次切片，“半径 r 邻域内的代理”是 (2r+1)^2 次切片，
+# 各格邻域人数是在占用计数图上的窗口求和，都与总户数无关，可以在此基础上加入就近找房等空间局部的搜索。
+# 网格为 width x height 的周期性网格（torus），大小可配置，人口很大时把网格同步放大即可保持每格户数不变。
+
+_RADIX_CELLS = 2 ** 16  # 格编号可用 uint16 表示的最大格数
+
+
+def wrap(x, y, width, height):
+    """ 周期性边界：把坐标折回网格内 """
+    return np.mod(x, width), np.mod(y, height)
+
+
+class SpatialIndex:
+    """
+    位置数组 (x, y) 的按格索引（构建时的快照）：
+    order 为按格编号排序的代理编号（同格内保持原顺序），start[c]:start[c + 1] 为第 c 格在 order 中的区间。
+    """
+
+    def __init__(self, x, y, width, height):
+        self.width = width
+        self.height = height
+        cells = np.asarray(y, dtype=np.int64) * width + np.asarray(x, dtype=np.int64)
+        self.counts = np.bincount(cells, minlength=width * height)
+        self.start = np.zeros(width * height + 1, dtype=np.int64)
+        np.cumsum(self.counts, out=self.start[1:])
+        if width * height <= _RADIX_CELLS:
+            cells = cells.astype(np.uint16)  # 走基数排序
+        self.order = np.argsort(cells, kind="stable")
+
+    def occupancy(self):
+        """ 每格代理数，形状 (height, width) """
+        return self.counts.reshape(self.height, self.width)
+
+    def cell(self, x, y):
+        """ 位于 (x, y) 格的代理编号 """
+        c = (y % self.height) * self.width + x % self.width
+        return self.order[self.start[c]:self.start[c + 1]]
+
+    def neighbors(self, x, y, radius=1, include_center=True):
+        """ 以 (x, y) 为中心、半径 radius 的 Moore 邻域（周期性）内的代理编号 """
+        radius = min(radius, max(self.width, self.height) // 2)  # 窗口超过网格时每格只取一次
+        xs = np.unique(np.arange(x - radius, x + radius + 1) % self.width)
+        ys = np.unique(np.arange(y - radius, y + radius + 1) % self.height)
+        cells = (ys[:, None] * self.width + xs[None, :]).ravel()
+        if not include_center:
+            cells = cells[cells != (y % self.height) * self.width + x % self.width]
+        parts = [self.order[self.start[c]:self.start[c + 1]] for c in cells]
+        return np.concatenate(parts) if parts else self.order[:0]
+
+    def neighbor_counts(self, radius=1):
+        """ 每格半径 radius 的 Moore 邻域（周期性，含本格）内的代理数，形状 (height, width) """
+        occupancy = self.occupancy()
+        rows = occupancy.copy()
+        for d in range(1, min(radius, self.height // 2) + 1):
+            rows += np.roll(occupancy, d, axis=0)
+            if 2 * d != self.height:  # 偶数边长时 +d 与 -d 是同一行，只计一次
+                rows += np.roll(occupancy, -d, axis=0)
+        total = rows.copy()
+        for d in range(1, min(radius, self.width // 2) + 1):
+            total += np.roll(rows, d, axis=1)
+            if 2 * d != self.width:
+                total += np.roll(rows, -d, axis=1)
+        return total
+
+
+class ArrayGrid:
+    """
+    Mesa MultiGrid 接口（place_agent / move_agent / remove_agent / get_cell_list_contents / get_neighbors）
+    的数组实现，供 Mesa 引擎使用：每个代理占一个槽位，位置写在 x / y 数组里，移动与移除都是 O(1)；
+    按格查询时由当前位置构建 SpatialIndex，位置不变时重复使用。
+    """
+
+    def __init__(self, width, height, torus=True):
+        if not torus:
+            raise ValueError("ArrayGrid only supports periodic (torus) grids")
+        self.width = width
+        self.height = height
+        self.torus = True
+        self.x = np.zeros(0, dtype=np.int32)
+        self.y = np.zeros(0, dtype=np.int32)
+        self._agents = []  # 槽位 -> 代理（已移除为 None）
+        self._free = []  # 已释放的槽位
+        self._index = None  # 位置变化后置为 None，查询时重建
+
+    def place_agent(self, agent, pos):
+        if self._free:
+            slot = self._free.pop()
+            self._agents[slot] = agent
+        else:
+            slot = len(self._agents)
+            self._agents.append(agent)
+            if slot == self.x.size:  # 几何扩容，摊还 O(1)
+                capacity = max(16, 2 * slot)
+                self.x = np.resize(self.x, capacity)
+                self.y = np.resize(self.y, capacity)
+        agent._grid_slot = slot
+        self._set(agent, pos)
+
+    def move_agent(self, agent, pos):
+        self._set(agent, pos)
+
+    def remove_agent(self, agent):
+        slot = agent._grid_slot
+        self._agents[slot] = None
+        self._free.append(slot)
+        agent.pos = None
+        self._index = None
+
+    def _set(self, agent, pos):
+        x, y = pos[0] % self.width, pos[1] % self.height
+        self.x[agent._grid_slot] = x
+        self.y[agent._grid_slot] = y
+        agent.pos = (x, y)
+        self._index = None
+
+    def index(self):
+        """ 当前位置的 SpatialIndex（只包含在网格上的代理，编号为槽位） """
+        if self._index is None:
+            slots = np.array([i for i, a in enumerate(self._agents) if a is not None], dtype=np.int64)
+            index = SpatialIndex(self.x[slots], self.y[slots], self.width, self.height)
+            index.order = slots[index.order]
+            self._index = index
+        return self._index
+
+    def get_cell_list_contents(self, pos):
+        return [self._agents[i] for i in self.index().cell(*pos)]
+
+    def get_neighbors(self, pos, moore=True, include_center=False, radius=1):
+        if not moore:
+            raise ValueError("ArrayGrid only supports Moore neighborhoods")
+        return [self._agents[i] for i in self.index().neighbors(*pos, radius, include_center)]
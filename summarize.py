@@ -0,0 +1,184 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from housing_market_sim.llm import DEFAULT_MODEL, DEFAULT_RETRIES, DEFAULT_TIMEOUT, MAX_TOKENS, TEMPERATURE, summary_key
+from housing_market_sim.log import get_logger
+from housing_market_sim.mock_llm import MockLLMServer
+from housing_market_sim.prompts import LANGUAGES, SUMMARY_ROLES, build_messages, summary_data
+from housing_market_sim.simulation import simulate
+from housing_market_sim.sweep import run_sweep
+
+# ========== 批量生成大模型总结 ==========
+# 先并行模拟全部设计点（与参数扫描共用进程池），每个 (运行, 语言, 角色) 组合拼成一条请求，
+# 再用 asyncio 并发发送：Semaphore 限制同时在途的请求数，令牌桶限制每秒请求数。
+# 每完成一条就向 JSONL 输出追加一行并刷新，中断后以同一输出文件重跑时跳过已完成的请求；
+# 结果同时写入 llm.SummaryCache，界面上对相同数据生成总结时直接命中。
+#   python -m housing_market_sim summarize --design lhs --samples 100 --out summaries.jsonl
+#   python -m housing_market_sim summarize --backend mock --mock-latency 0.5 --out mock.jsonl
+
+log = get_logger("summarize")
+
+
+# ---------- 后端 ----------
+class OpenAIBackend:
+    """ 任意 OpenAI 兼容接口；base_url 为空时使用 OPENAI_BASE_URL 或官方地址 """
+    name = "openai"
+
+    def __init__(self, api_key=None, base_url=None, model=DEFAULT_MODEL, timeout=DEFAULT_TIMEOUT,
+                 max_retries=DEFAULT_RETRIES):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client = None
+
+    async def complete(self, messages):
+        if self._client is None:  # 在事件循环内创建，连接池随循环一起使用
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, timeout=self.timeout,
+                                       max_retries=self.max_retries)
+        response = await self._client.chat.completions.create(
+            model=self.model, messages=messages, temperature=TEMPERATURE, max_tokens=MAX_TOKENS)
+        return response.choices[0].message.content
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class MockBackend(OpenAIBackend):
+    """ 启动本地替身服务（mock_llm.MockLLMServer）并通过真实的 HTTP 客户端调用它 """
+    name = "mock"
+
+    def __init__(self, model="mock", latency=0.0, tokens=64, **kwargs):
+        self.server = MockLLMServer(latency=latency, tokens=tokens).start()
+        super().__init__(api_key="mock", base_url=self.server.base_url, model=model, **kwargs)
+
+    async def aclose(self):
+        await super().aclose()
+        self.server.stop()
+
+
+BACKENDS = {"openai": OpenAIBackend, "mock": MockBackend}
+
+
+class RateLimiter:
+    """ 令牌桶：平均每秒 rate 个请求，最多连续放行 burst 个 """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# ---------- 请求 ----------
+def _summary_point(task):
+    """ 子进程中运行一个设计点并整理出 data_dict（与 sweep.run_point 参数相同） """
+    run_id, params, seed, n_agents, steps, engine = task
+    result = simulate(params, seed, n_agents, steps, engine=engine)
+    return {"run": run_id, "seed": seed, "params": params,
+            "data": summary_data(params, result.history, result.final_state, n_agents)}
+
+
+def simulate_runs(points, seed=42, n_agents=50, steps=100, engine="vectorized", max_workers=None):
+    """ 并行模拟全部设计点，按设计点顺序返回 [{run, seed, params, data}] """
+    return sorted(run_sweep(points, seed, n_agents, steps, engine=engine, max_workers=max_workers,
+                            point_fn=_summary_point), key=lambda run: run["run"])
+
+
+def summary_items(runs, languages=LANGUAGES, roles=SUMMARY_ROLES, model=DEFAULT_MODEL):
+    """ 每个 (运行, 语言, 角色) 一条请求；key 与界面上的缓存键一致 """
+    for run in runs:
+        for language in languages:
+            for role in roles:
+                yield {"key": summary_key(language, role, run["data"], model), "run": run["run"],
+                       "language": language, "role": role, "params": run["params"],
+                       "messages": build_messages(language, role, run["data"])}
+
+
+# ---------- 批量发送 ----------
+def load_progress(path):
+    """ 输出文件中已完成请求的键；中断时写了一半的末行忽略不计 """
+    done = set()
+    if not Path(path).exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["key"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+async def summarize_batch(items, backend, out, concurrency=8, rate=None, cache=None, on_result=None):
+    """
+    并发生成 items 中尚未完成的总结，逐条追加到 JSONL 文件 out。
+    返回计数：total / skipped（此前已完成）/ generated / cached / failed；失败的请求不写入，重跑时会再次尝试。
+    """
+    items = list(items)
+    done = load_progress(out)
+    pending = [item for item in items if item["key"] not in done]
+    stats = {"total": len(items), "skipped": len(items) - len(pending), "generated": 0, "cached": 0, "failed": 0}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = RateLimiter(rate) if rate else None
+
+    with open(out, "a", encoding="utf-8") as f:
+        async def one(item):
+            async with semaphore:
+                start = time.perf_counter()
+                text = cache.get(item["key"]) if cache is not None else None
+                source = "cache"
+                try:
+                    if text is None:
+                        if limiter is not None:
+                            await limiter.acquire()
+                        text = await backend.complete(item["messages"])
+                        source = "llm"
+                        if cache is not None:
+                            cache.put(item["key"], text, backend.model)
+                except Exception as e:
+                    log.warning("Summary for run %s (%s, %s) failed: %s", item["run"], item["language"],
+                                item["role"], e)
+                    stats["failed"] += 1
+                    row = {**{k: item[k] for k in ("key", "run", "language", "role")}, "error": str(e)}
+                else:
+                    stats["generated" if source == "llm" else "cached"] += 1
+                    row = {**{k: item[k] for k in ("key", "run", "language", "role", "params")},
+                           "model": backend.model, "source": source,
+                           "seconds": round(time.perf_counter() - start, 3), "text": text}
+                    f.write(json.dumps(row, ensure_ascii=False, default=float) + "\n")
+                    f.flush()
+                if on_result is not None:
+                    on_result(row, stats)
+
+        await asyncio.gather(*(one(item) for item in pending))
+    return stats
+
+
+def run_batch(items, backend, out, concurrency=8, rate=None, cache=None, on_result=None):
+    """ 同步入口：运行 summarize_batch 并在结束后关闭后端 """
+    async def main():
+        try:
+            return await summarize_batch(items, backend, out, concurrency, rate, cache, on_result)
+        finally:
+            await backend.aclose()
+
+    return asyncio.run(main())
@@ -0,0 +1,133 @@
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from housing_market_sim.params import PARAM_BOUNDS, PARAM_KEYS, SCENARIOS
+from housing_market_sim.simulation import HISTORY_KEYS, simulate
+
+# ========== 参数扫描 ==========
+# 在九个政策参数上生成试验设计（全因子 / 拉丁超立方 / Sobol），
+# 用进程池并行运行，每完成一次就把该次运行的汇总指标作为一行流式输出。
+
+
+def factorial_design(levels, base=None):
+    """ 全因子设计：levels 为 {参数: [取值, ...]}，其余参数取 base（默认基准情景） """
+    base = dict(SCENARIOS["baseline_scenario"] if base is None else base)
+    keys = [k for k in PARAM_KEYS if k in levels]
+    return [{**base, **dict(zip(keys, combo))} for combo in itertools.product(*(levels[k] for k in keys))]
+
+
+def _scale(unit, bounds, base):
+    """ 把 [0, 1) 上的样本矩阵映射到各参数区间 """
+    base = dict(SCENARIOS["baseline_scenario"] if base is None else base)
+    keys = [k for k in PARAM_KEYS if k in bounds]
+    lo = np.array([bounds[k][0] for k in keys], dtype=float)
+    hi = np.array([bounds[k][1] for k in keys], dtype=float)
+    values = lo + unit * (hi - lo)
+    return [{**base, **{k: float(v) for k, v in zip(keys, row)}} for row in values]
+
+
+def latin_hypercube_design(n, bounds=None, seed=None, base=None):
+    """ 拉丁超立方设计：每个参数的 n 个分层各取一个点 """
+    bounds = PARAM_BOUNDS if bounds is None else bounds
+    rng = np.random.default_rng(seed)
+    d = len(bounds)
+    strata = np.column_stack([rng.permutation(n) for _ in range(d)]) if d else np.empty((n, 0))
+    unit = (strata + rng.random((n, d))) / n
+    return _scale(unit, bounds, base)
+
+
+def sobol_design(n, bounds=None, seed=None, base=None):
+    """ Sobol 低差异序列设计（需要 scipy） """
+    try:
+        from scipy.stats import qmc
+    except ImportError as e:
+        raise ImportError("Sobol designs require scipy (pip install scipy)") from e
+    bounds = PARAM_BOUNDS if bounds is None else bounds
+    unit = qmc.Sobol(d=len(bounds), scramble=True, seed=seed).random(n)
+    return _scale(unit, bounds, base)
+
+
+DESIGNS = {"factorial": factorial_design, "lhs": latin_hypercube_design, "sobol": sobol_design}
+
+
+def history_metrics(history):
+    """ 每条 history 序列的均值与期末值 """
+    row = {}
+    for k in HISTORY_KEYS:
+        series = np.asarray(history[k], dtype=float)
+        row[f"{k}_mean"] = float(series.mean()) if series.size else 0.0
+        row[f"{k}_last"] = float(series[-1]) if series.size else 0.0
+    return row
+
+
+def run_point(task):
+    """ 子进程中运行一个设计点（顶层函数，便于进程池序列化）；task 为 (run, params, seed, n_agents, steps, engine) """
+    run_id, params, seed, n_agents, steps, engine = task
+    result = simulate(params, seed, n_agents, steps, engine=engine)
+    return {"run": run_id, "seed": seed, **params, **history_metrics(result.history)}
+
+
+def run_sweep(points, seed=42, n_agents=50, steps=100, engine="vectorized", max_workers=None, point_fn=run_point):
+    """
+    并行运行设计点，按完成顺序逐行产出汇总指标。
+    所有设计点默认共用同一随机种子（公共随机数），便于比较政策差异。
+    point_fn 决定每个设计点在子进程中产出什么（须为顶层函数，参数与 run_point 相同）。
+    """
+    tasks = [(i, p, seed, n_agents, steps, engine) for i, p in enumerate(points)]
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        for task in tasks:
+            yield point_fn(task)
+        return
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks) or 1)) as pool:
+        futures = [pool.submit(point_fn, task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _write_parquet_rows(rows, path, batch_rows):
+    """ 按批把行转为列写入 Parquet（每批一个 row group） """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    count, batch, writer = 0, [], None
+    try:
+        for row in rows:
+            batch.append(row)
+            count += 1
+            if len(batch) >= batch_rows:
+                table = pa.Table.from_pylist(batch)
+                writer = writer or pq.ParquetWriter(str(path), table.schema)
+                writer.write_table(table)
+                batch = []
+        if batch:
+            table = pa.Table.from_pylist(batch)
+            writer = writer or pq.ParquetWriter(str(path), table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def write_rows(rows, path, batch_rows=256):
+    """
+    把逐行产出的结果流式写出，返回写入行数。
+    .parquet 按 batch_rows 行一批列式写出（需要 pyarrow）；其余按 CSV 写出，每行写完即刷新。
+    """
+    if str(path).lower().endswith(".parquet"):
+        return _write_parquet_rows(rows, path, batch_rows)
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            f.flush()
+            count += 1
+    return count
@@ -0,0 +1,29 @@
+import atexit
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# 仓库根目录即 housing_market_sim 包本身（python -m housing_market_sim 从其上级目录运行）：
+# 直接在仓库里运行 pytest 时，在临时目录里建一个指向根目录的 housing_market_sim 链接并加入 sys.path，
+# 测试照常使用 housing_market_sim.xxx 导入；进程池的子进程继承 sys.path，同样可以导入
+ROOT = Path(__file__).resolve().parents[1]
+try:
+    import housing_market_sim  # noqa: F401  已安装或已在路径上时直接使用
+except ImportError:
+    _link_dir = Path(tempfile.mkdtemp(prefix="housing_market_sim-tests-"))
+    (_link_dir / "housing_market_sim").symlink_to(ROOT, target_is_directory=True)
+    sys.path.insert(0, str(_link_dir))
+    atexit.register(shutil.rmtree, _link_dir, ignore_errors=True)
+
+
+def assert_same_run(a, b):
+    """ 两次运行的 history 与最终快照逐位相同 """
+    from housing_market_sim.history import HISTORY_KEYS
+    for k in HISTORY_KEYS:
+        np.testing.assert_array_equal(np.asarray(a.history[k]), np.asarray(b.history[k]), err_msg=k)
+    assert a.final_state.keys() == b.final_state.keys()
+    for k in a.final_state:
+        np.testing.assert_array_equal(a.final_state[k], b.final_state[k], err_msg=k)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from housing_market_sim import cache
+from housing_market_sim.cache import ResultCache, result_key
+from housing_market_sim.demography import Demography
+from housing_market_sim.params import GRID_SIZE, SCENARIOS
+from housing_market_sim.policy import PolicySchedule
+
+PARAMS = SCENARIOS["baseline_scenario"]
+BASE = {"params": PARAMS, "seed": 42, "n_agents": 50, "steps": 100, "engine": "mesa"}
+
+
+def _key(**changes):
+    kwargs = {**BASE, **changes}
+    return result_key(kwargs.pop("params"), kwargs.pop("seed"), kwargs.pop("n_agents"), kwargs.pop("steps"),
+                      kwargs.pop("engine"), **kwargs)
+
+
+@pytest.mark.parametrize("changes", [
+    {"params": {**PARAMS, "lr": 4.0}}, {"seed": 43}, {"n_agents": 51}, {"steps": 101}, {"engine": "vectorized"},
+    {"replicates": 8}, {"schedule": PolicySchedule({10: {"lr": 3.5}})}, {"grid_size": GRID_SIZE + 1},
+    {"demography": Demography(exit_rate=0.02)}, {"demography": Demography(target_population=100)},
+    {"demography": Demography(arrivals=(1, 2))},
+], ids=lambda changes: next(iter(changes)))
+def test_every_field_changes_the_key(changes):
+    assert _key(**changes) != _key()
+
+
+def test_engine_version_changes_the_key(monkeypatch):
+    before = _key()
+    monkeypatch.setitem(cache.ENGINE_VERSIONS, "mesa", cache.ENGINE_VERSIONS["mesa"] + 1)
+    assert _key() != before
+
+
+def test_defaults_and_param_order_keep_the_key():
+    key = _key()
+    assert _key(params=dict(reversed(list(PARAMS.items())))) == key
+    assert _key(params={k: float(v) for k, v in PARAMS.items()}) == key
+    assert _key(params={**PARAMS, "unused": 1}) == key  # 只有九个政策参数进入键
+    assert _key(replicates=1, schedule=PolicySchedule({}), grid_size=GRID_SIZE, demography=Demography()) == key
+    assert _key(demography=Demography(capacity=10_000)) == key  # 预分配不影响结果
+
+
+def test_entry_limit_evicts_least_recently_used():
+    results = ResultCache(max_entries=2)
+    results.put("a", 1)
+    results.put("b", 2)
+    assert results.get("a") == 1  # a 变为最近使用
+    results.put("c", 3)
+    assert "b" not in results and "a" in results and "c" in results
+
+
+def test_byte_limit_evicts_least_recently_used():
+    block = np.zeros(1000)  # 8000 字节
+    results = ResultCache(max_bytes=20_000)
+    results.put("a", block.copy())
+    results.put("b", block.copy())
+    results.get("a")
+    results.put("c", block.copy())
+    assert list(results._data) == ["a", "c"] and results.nbytes == 16_000
+    results.put("huge", np.zeros(10_000))  # 超过上限的单条仍保留
+    assert list(results._data) == ["huge"]
+
+
+def test_get_or_compute_returns_cached_object():
+    results = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"history": np.arange(3)}
+
+    first = results.get_or_compute("k", compute)
+    assert results.get_or_compute("k", compute) is first
+    assert len(calls) == 1 and (results.hits, results.misses) == (1, 1)
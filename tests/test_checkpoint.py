@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from conftest import assert_same_run
+
+from housing_market_sim.checkpoint import Checkpoint
+from housing_market_sim.demography import Demography
+from housing_market_sim.history import HISTORY_KEYS
+from housing_market_sim.params import SCENARIOS
+from housing_market_sim.policy import PolicySchedule
+from housing_market_sim.simulation import ENGINES, branch, resume, simulate
+
+PARAMS = SCENARIOS["baseline_scenario"]
+DEMOGRAPHIES = {"grow": None, "exits": Demography(exit_rate=0.03, target_population=260)}
+
+
+@pytest.mark.parametrize("demography", DEMOGRAPHIES.values(), ids=DEMOGRAPHIES.keys())
+@pytest.mark.parametrize("engine", ENGINES)
+def test_resume_from_saved_checkpoint_is_bit_identical(engine, demography, tmp_path):
+    straight = simulate(PARAMS, 11, 200, 30, engine=engine, demography=demography)
+    head = simulate(PARAMS, 11, 200, 30, engine=engine, demography=demography, checkpoint_at=12)
+    assert_same_run(straight, head)  # 记录检查点不改变本次运行
+    path = head.checkpoint.save(tmp_path / "ck.npz")
+    assert_same_run(straight, resume(Checkpoint.load(path), 30))
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_branch_shares_prefix(engine):
+    schedule = PolicySchedule({20: {"lr": 3.0}})
+    base = simulate(PARAMS, 5, 200, 30, engine=engine, checkpoint_at=15)
+    shocked = {**PARAMS, "lr": 8.0}
+    runs = branch(base.checkpoint, {"same": PARAMS, "shock": shocked, "path": (PARAMS, schedule)}, 30)
+    assert_same_run(base, runs["same"])
+    assert_same_run(simulate(PARAMS, 5, 200, 30, engine=engine, schedule=schedule), runs["path"])
+    for k in HISTORY_KEYS:  # 冲击之前的前缀与基准完全相同
+        np.testing.assert_array_equal(np.asarray(runs["shock"].history[k])[:15], np.asarray(base.history[k])[:15])
+    assert runs["shock"].summary() != base.summary()
+
+
+def test_resume_rejects_earlier_step():
+    base = simulate(PARAMS, 5, 100, 10, engine="vectorized", checkpoint_at=8)
+    with pytest.raises(ValueError):
+        resume(base.checkpoint, 5)
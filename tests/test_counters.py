@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from housing_market_sim.counters import LOW_QUALITY, TenureCounters, tenure_counts
+from housing_market_sim.demography import Demography
+from housing_market_sim.model import HousingMarketModel
+from housing_market_sim.params import SCENARIOS
+
+DEMOGRAPHIES = {"grow": Demography(), "exits": Demography(exit_rate=0.05),
+                "steady": Demography(exit_rate=0.05, target_population=260)}
+
+
+def assert_counters_match(model):
+    """ 增量计数器与由代理快照全量重算的结果一致 """
+    state = model.snapshot()
+    assert model.counters.tenure_counts() == tenure_counts(state["group"], state["has_house"])
+    owned = state["house_quality"][state["has_house"] & ~np.isnan(state["house_quality"])]
+    assert model.counters.low_quality_owned == int((owned < LOW_QUALITY).sum())
+    assert model.counters.owned_quality_sum == pytest.approx(owned.sum())
+
+
+@pytest.mark.parametrize("demography", DEMOGRAPHIES.values(), ids=DEMOGRAPHIES.keys())
+def test_counters_match_full_recount_every_step(demography):
+    model = HousingMarketModel(200, SCENARIOS["credit_stimulus_scenario"], seed=4, demography=demography)
+    assert_counters_match(model)
+    for _ in range(30):
+        model.step()
+        assert_counters_match(model)
+
+
+def test_counters_survive_checkpoint_restore():
+    demography = Demography(exit_rate=0.05, target_population=260)
+    model = HousingMarketModel(200, seed=9, demography=demography)
+    for _ in range(10):
+        model.step()
+    restored = HousingMarketModel.from_state(model.state_dict(), model.params, seed=9, demography=demography)
+    assert_counters_match(restored)
+    assert restored.counters.tenure_counts() == model.counters.tenure_counts()
+    assert restored.counters.owned_quality_sum == model.counters.owned_quality_sum
+    for _ in range(10):
+        model.step()
+        restored.step()
+        assert_counters_match(restored)
+        assert restored.step_statistics() == model.step_statistics()
+
+
+def test_move_between_tenures():
+    counters = TenureCounters()
+    counters.add("low", False, None)
+    counters.move("low", False, None, True, 2.0)
+    assert counters.counts[("low", True)] == 1 and counters.low_quality_owned == 1
+    counters.move("low", True, 2.0, True, 3.0)  # 置换 / 折旧：质量变化，权属不变
+    assert counters.low_quality_owned == 0 and counters.avg_quality() == 3.0
+    counters.remove("low", True, 3.0)
+    assert counters.population() == 0 and counters.owned_quality_sum == 0
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from housing_market_sim.demography import Demography
+from housing_market_sim.params import SCENARIOS
+from housing_market_sim.simulation import ENGINES, simulate
+
+PARAMS = SCENARIOS["baseline_scenario"]
+
+
+def _population(result):
+    h = result.history
+    return np.asarray(h["pop_high"]) + np.asarray(h["pop_mid"]) + np.asarray(h["pop_low"])
+
+
+def test_arrivals_for():
+    assert Demography().arrivals_for(7, 1000) == 7
+    steady = Demography(target_population=400)
+    assert steady.arrivals_for(7, 300) == 100  # 一步补足到稳态人口
+    assert steady.arrivals_for(7, 395) == 5
+    assert steady.arrivals_for(7, 400) == 0
+    assert steady.arrivals_for(7, 450) == 0
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_default_population_grows_by_drawn_arrivals(engine):
+    growth = np.diff(_population(simulate(PARAMS, 3, 300, 20, engine=engine)))
+    assert growth.min() >= 5 and growth.max() <= 10
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_steady_state_tops_up_to_target(engine):
+    result = simulate(PARAMS, 3, 300, 20, engine=engine, demography=Demography(exit_rate=0.05, target_population=400))
+    assert (_population(result) == 400).all()
+    assert result.summary()["households_end"] == 400
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_population_above_target_only_shrinks(engine):
+    result = simulate(PARAMS, 3, 300, 20, engine=engine, demography=Demography(exit_rate=0.05, target_population=200))
+    population = _population(result)
+    assert (np.diff(population) <= 0).all()
+    assert population[-1] < 300
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from housing_market_sim.figures import DOWNSAMPLE_METHODS, bucket_mean, bucket_x, downsample
+
+
+def _series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(1, n + 1), np.cumsum(rng.normal(size=n))
+
+
+@pytest.mark.parametrize("method", DOWNSAMPLE_METHODS)
+@pytest.mark.parametrize("n", [1001, 5000, 123457])
+def test_keeps_endpoints_order_and_budget(method, n):
+    x, y = _series(n)
+    xs, ys = downsample(x, y, max_points=1000, method=method)
+    assert len(xs) == len(ys) <= 1000
+    assert xs[0] == x[0] and xs[-1] == x[-1]
+    assert (np.diff(xs) > 0).all()
+    np.testing.assert_array_equal(ys, y[xs - 1])  # 选中的都是原始点
+
+
+@pytest.mark.parametrize("method", DOWNSAMPLE_METHODS)
+def test_keeps_global_extremes(method):
+    x, y = _series(20000, seed=1)
+    high, low = y.max() + 50, y.min() - 50
+    y[7777], y[12345] = high, low  # 单点尖峰
+    _, ys = downsample(x, y, max_points=500, method=method)
+    assert ys.max() == high and ys.min() == low
+
+
+def test_short_series_unchanged():
+    x, y = _series(1000)
+    xs, ys = downsample(x, y, max_points=1000)
+    assert xs is x and ys is y
+
+
+def test_unknown_method():
+    x, y = _series(2000)
+    with pytest.raises(ValueError):
+        downsample(x, y, max_points=100, method="every_nth")
+
+
+def test_bucket_mean():
+    values = np.arange(1000, dtype=np.float64)
+    np.testing.assert_allclose(bucket_mean(values, 10), np.arange(10) * 100 + 49.5)
+    np.testing.assert_allclose(bucket_x(values, 10), np.arange(10) * 100 + 49.5)
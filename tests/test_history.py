@@ -0,0 +1,79 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from housing_market_sim import history as history_module
+from housing_market_sim.history import HISTORY_KEYS, HistoryRecorder
+from housing_market_sim.params import SCENARIOS
+from housing_market_sim.simulation import simulate
+
+STEPS = 50
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return simulate(SCENARIOS["baseline_scenario"], 2, 100, STEPS, engine="vectorized").history
+
+
+def _rows(history):
+    return [{k: history[k][t] for k in HISTORY_KEYS} for t in range(len(history[HISTORY_KEYS[0]]))]
+
+
+def _record(rows, **options):
+    recorder = HistoryRecorder(**options)
+    for row in rows:
+        recorder.append(row)
+    return recorder
+
+
+def assert_same_columns(history, reference):
+    for k in HISTORY_KEYS:
+        assert history[k].dtype == reference[k].dtype
+        np.testing.assert_array_equal(history[k], reference[k], err_msg=k)
+
+
+def test_preallocated_columns_grow(reference):
+    recorder = _record(_rows(reference), capacity=4)
+    assert recorder.n_rows == STEPS and recorder.capacity == 64
+    assert_same_columns(recorder, reference)
+    assert_same_columns(HistoryRecorder.from_columns({k: list(reference[k]) for k in HISTORY_KEYS}), reference)
+
+
+def test_spilled_columns_match_unspilled_run(reference, tmp_path):
+    recorder = _record(_rows(reference), capacity=STEPS, spill_dir=tmp_path, chunk_rows=8)
+    assert len(recorder._chunks) == STEPS // 8 and recorder.n_rows == STEPS
+    assert_same_columns(recorder, reference)
+    batches = list(recorder.batches())
+    assert [start for start, _ in batches] == list(range(0, STEPS, 8))
+    for k in HISTORY_KEYS:
+        np.testing.assert_array_equal(np.concatenate([columns[k] for _, columns in batches]), reference[k])
+    assert_same_columns(pickle.loads(pickle.dumps(recorder)), reference)
+    recorder.close()
+    assert not list(tmp_path.iterdir())
+
+
+def test_spilled_chunks_are_loaded_once_per_key(reference, tmp_path, monkeypatch):
+    rows = _rows(reference)
+    recorder = _record(rows[:40], spill_dir=tmp_path, chunk_rows=8)
+    loads = []
+    real_load = np.load
+    monkeypatch.setattr(history_module.np, "load", lambda *a, **kw: loads.append(a[0]) or real_load(*a, **kw))
+    for _ in range(3):
+        for k in HISTORY_KEYS:
+            recorder[k]
+    assert len(loads) == len(HISTORY_KEYS) * len(recorder._chunks)
+    for row in rows[40:]:  # 再次落盘后缓存作废，读到新块
+        recorder.append(row)
+    assert_same_columns(recorder, reference)
+    recorder.close()
+
+
+def test_arrow_export_of_spilled_history(reference, tmp_path):
+    pytest.importorskip("pyarrow")
+    recorder = _record(_rows(reference), spill_dir=tmp_path, chunk_rows=16)
+    table = recorder.to_arrow({"seed": 2})
+    assert table.num_rows == STEPS
+    assert table.column("step").to_pylist() == list(range(1, STEPS + 1))
+    np.testing.assert_array_equal(table.column("avg_quality").to_numpy(), reference["avg_quality"])
+    recorder.close()
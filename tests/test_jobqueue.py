@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from housing_market_sim.jobqueue import JobQueue, sweep_tasks, work
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(tmp_path / "q.sqlite")
+    yield queue
+    queue.close()
+
+
+def _tasks(n):
+    return sweep_tasks([{"lr": float(i)} for i in range(n)], n_agents=10, steps=2)
+
+
+def _echo(task):
+    run, params, seed, n_agents, steps, engine = task
+    return {"run": run, **params}
+
+
+def test_enqueue_is_idempotent(queue):
+    assert queue.enqueue(_tasks(3)) == 3
+    assert queue.enqueue(_tasks(4)) == 1  # 只加入新的设计点
+    assert queue.counts()["pending"] == 4
+
+
+def test_expired_lease_is_reclaimed(queue):
+    queue.enqueue(_tasks(1))
+    job_id, task = queue.claim("a", lease=0.05)
+    assert queue.claim("b", lease=0.05) is None  # 租约有效期内不会被他人领取
+    time.sleep(0.1)
+    assert queue.counts()["expired"] == 1
+    assert queue.claim("b", lease=60) == (job_id, task)
+    assert not queue.renew(job_id, "a")  # 原工作进程已失去租约
+    assert queue.renew(job_id, "b")
+
+
+def test_complete_keeps_first_result(queue):
+    queue.enqueue(_tasks(1))
+    job_id, _ = queue.claim("a", lease=0.05)
+    time.sleep(0.1)
+    queue.claim("b")
+    assert queue.complete(job_id, "b", {"by": "b"})
+    assert not queue.complete(job_id, "a", {"by": "a"})  # 迟到的重复结果被丢弃
+    assert list(queue.results()) == [{"by": "b"}]
+
+
+def test_repeated_crashes_end_in_failed(queue):
+    queue.enqueue(_tasks(1))
+    for _ in range(2):
+        assert queue.claim("w", lease=0.01, max_attempts=2) is not None
+        time.sleep(0.05)
+    assert queue.claim("w", lease=0.01, max_attempts=2) is None
+    assert queue.counts()["failed"] == 1
+    assert queue.errors()[0][1] == "lease expired"
+    assert queue.retry_failed() == 1 and queue.counts()["pending"] == 1
+
+
+def test_fail_requeues_until_attempts_run_out(queue):
+    queue.enqueue(_tasks(1))
+    job_id, _ = queue.claim("w", max_attempts=2)
+    assert queue.fail(job_id, "w", "boom", max_attempts=2)
+    assert queue.counts()["pending"] == 1
+    job_id, _ = queue.claim("w", max_attempts=2)
+    queue.fail(job_id, "w", "boom", max_attempts=2)
+    assert queue.counts()["failed"] == 1
+
+
+def test_work_drains_queue(queue):
+    queue.enqueue(_tasks(5))
+    assert work(queue.path, worker="w", point_fn=_echo) == 5
+    assert work(queue.path, worker="w", point_fn=_echo) == 0  # 已完成的任务不会重复运行
+    assert [row["run"] for row in queue.results()] == list(range(5))
+    assert queue.counts()["done"] == 5
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from housing_market_sim.llm import SummaryCache, SummaryService, summary_key
+from housing_market_sim.mock_llm import MockLLMServer, mock_reply
+
+DATA = {"lr": 5.0, "steps": 100, "avg_quality": [2.5, 2.4]}
+MESSAGES = [{"role": "user", "content": "summarize"}]
+
+
+@pytest.fixture
+def server():
+    with MockLLMServer(tokens=16, token_delay=0.01) as server:
+        yield server
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = SummaryService(cache=SummaryCache(tmp_path / "summaries.sqlite"), model="mock-model")
+    yield service
+    service._executor.shutdown(wait=True)
+
+
+def test_summary_key_is_stable():
+    key = summary_key("zh", "Policymaker", DATA)
+    assert summary_key("zh", "Policymaker", dict(reversed(list(DATA.items())))) == key
+    assert summary_key("zh", "Policymaker", {**DATA, "lr": np.float64(5.0), "steps": np.int64(100)}) == key
+    changed = [summary_key("en", "Policymaker", DATA), summary_key("zh", "Economist", DATA),
+               summary_key("zh", "Policymaker", {**DATA, "lr": 4.0}), summary_key("zh", "Policymaker", DATA, "other")]
+    assert len({key, *changed}) == 5
+
+
+def test_concurrent_submits_share_one_request(server, service):
+    key = service.key("zh", "Policymaker", DATA)
+    jobs = [service.submit(key, MESSAGES, "test-key", server.base_url) for _ in range(5)]
+    assert all(job is jobs[0] for job in jobs)
+    assert "".join(jobs[0].stream()) == "".join(mock_reply("mock-model", MESSAGES, 16))
+    assert jobs[0].error is None and not jobs[0].cached
+    assert server.requests == 1
+
+
+def test_cache_hit_returns_finished_job(server, service):
+    key = service.key("zh", "Policymaker", DATA)
+    first = service.submit(key, MESSAGES, "test-key", server.base_url)
+    assert first.wait(30)
+    again = service.submit(key, MESSAGES, "test-key", server.base_url)
+    assert again.cached and again.done
+    assert again.text == first.text
+    assert server.requests == 1
+    assert len(service.cache) == 1
+
+
+def test_failed_generation_is_not_cached(server, service):
+    key = service.key("zh", "Policymaker", DATA)
+    job = service.submit(key, MESSAGES, "test-key", server.base_url.replace("/v1", "/missing"))  # 未知路径返回 404
+    assert job.wait(30)
+    assert job.error is not None
+    assert len(service.cache) == 0
+    assert service.submit(key, MESSAGES, "test-key", server.base_url) is not job  # 失败后可以重新生成
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from housing_market_sim.orderbook import ReleasedHousingBook
+
+
+def _bucket(q):
+    return int(q * 100)
+
+
+class ListBook:
+    """ 原 released_houses 列表的语义，作为参照 """
+
+    def __init__(self):
+        self.items = []
+
+    def push(self, q):
+        self.items.append(q)
+
+    def pop_oldest(self):
+        return self.items.pop(0)
+
+    def pop_first_at_or_below(self, ceiling):
+        for i, q in enumerate(self.items):
+            if q is not None and q <= ceiling:
+                return self.items.pop(i)
+        return None
+
+    def pop_best_at_or_below(self, ceiling):
+        eligible = [(i, q) for i, q in enumerate(self.items) if q is not None and q <= ceiling]
+        if not eligible:
+            return None
+        top = max(_bucket(q) for _, q in eligible)
+        i = next(i for i, q in eligible if _bucket(q) == top)
+        return self.items.pop(i)
+
+
+def test_pop_oldest_is_fifo_including_unpriced_listings():
+    book = ReleasedHousingBook()
+    book.extend([3.2, None, 0.5])
+    book.push(4.9)
+    assert len(book) == 4
+    assert [book.pop_oldest() for _ in range(4)] == [3.2, None, 0.5, 4.9]
+    assert not book
+    with pytest.raises(IndexError):
+        book.pop_oldest()
+
+
+def test_pop_at_or_below_skips_unpriced_and_respects_ceiling():
+    book = ReleasedHousingBook()
+    book.extend([None, 2.505, 2.501, 1.0])
+    assert book.pop_first_at_or_below(2.502) == 2.501  # 上限所在的桶只取不超过上限的挂牌
+    assert book.pop_best_at_or_below(2.0) == 1.0
+    assert book.pop_first_at_or_below(0.5) is None
+    assert list(book) == [None, 2.505]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_list_semantics(seed):
+    rng = random.Random(seed)
+    book, reference = ReleasedHousingBook(), ListBook()
+    for _ in range(2000):
+        op = rng.random()
+        if op < 0.5:
+            q = None if rng.random() < 0.05 else round(rng.uniform(0, 5), 3)
+            book.push(q)
+            reference.push(q)
+        elif op < 0.6 and reference.items:
+            a, b = book.pop_oldest(), reference.pop_oldest()
+            assert a == b or (a is None and b is None)
+        elif op < 0.8:
+            ceiling = rng.uniform(0, 5)
+            assert book.pop_first_at_or_below(ceiling) == reference.pop_first_at_or_below(ceiling)
+        else:
+            ceiling = rng.uniform(0, 5)
+            assert book.pop_best_at_or_below(ceiling) == reference.pop_best_at_or_below(ceiling)
+        assert len(book) == len(reference.items)
+    assert [q for q in book] == reference.items
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        ReleasedHousingBook().pop_at_or_below(1.0, policy="random")
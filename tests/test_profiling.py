@@ -0,0 +1,16 @@
+import numpy as np
+
+from housing_market_sim.demography import Demography
+from housing_market_sim.params import SCENARIOS
+from housing_market_sim.simulation import simulate
+
+
+def test_agent_scans_count_agents_visited():
+    result = simulate(SCENARIOS["baseline_scenario"], 1, 80, 12, engine="mesa", profile=True,
+                      demography=Demography(exit_rate=0.05))
+    h = result.history
+    population = np.asarray(h["pop_high"]) + np.asarray(h["pop_mid"]) + np.asarray(h["pop_low"])
+    scans = np.array([row["agent_scans"] for row in result.profile.rows])
+    # 两轮撮合各遍历一次本步开始时的全部代理（即上一步结束时的人口）；人口变化时计数随之变化
+    np.testing.assert_array_equal(scans[1:], 2 * population[:-1])
+    assert np.unique(scans).size > 1
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from housing_market_sim.history import HISTORY_KEYS
+from housing_market_sim.params import SCENARIOS
+from housing_market_sim.replicate import P2Quantile, ReplicationReducer
+from housing_market_sim.simulation import simulate
+
+
+def _samples(n=400, seed=0):
+    """ 每列一种分布：正态、偏态（对数正态）、均匀、离散 """
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.normal(10, 2, n), rng.lognormal(0, 0.75, n), rng.uniform(-1, 1, n),
+                            rng.integers(0, 50, n).astype(float)])
+
+
+@pytest.mark.parametrize("p", [0.05, 0.5, 0.95])
+def test_p2_tracks_exact_quantiles(p):
+    samples = _samples()
+    estimator = P2Quantile(p, samples.shape[1])
+    for row in samples:
+        estimator.update(row)
+    exact = np.quantile(samples, p, axis=0)
+    spread = np.quantile(samples, 0.95, axis=0) - np.quantile(samples, 0.05, axis=0)
+    np.testing.assert_array_less(np.abs(estimator.value() - exact), 0.1 * spread)
+
+
+def test_p2_is_exact_for_first_five_observations():
+    samples = _samples(5)
+    estimator = P2Quantile(0.5, samples.shape[1])
+    assert estimator.value() is None
+    for i, row in enumerate(samples, start=1):
+        estimator.update(row)
+        np.testing.assert_array_equal(estimator.value(), np.quantile(samples[:i], 0.5, axis=0))
+
+
+@pytest.fixture(scope="module")
+def histories():
+    params = SCENARIOS["baseline_scenario"]
+    return [simulate(params, 8, 60, 15, engine="vectorized", stream=(r,)).history for r in range(12)]
+
+
+def test_reducer_matches_batch_statistics(histories):
+    reducer = ReplicationReducer(15)
+    for history in histories:
+        reducer.update(history)
+    assert reducer.count == len(histories)
+    means = reducer.mean_history()
+    for k in HISTORY_KEYS:
+        stacked = np.array([np.asarray(h[k], dtype=float) for h in histories])
+        np.testing.assert_allclose(means[k], stacked.mean(axis=0), rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(reducer.std(k), stacked.std(axis=0, ddof=1), rtol=1e-9, atol=1e-9)
+        for p in reducer.quantiles:  # P² 的标记始终落在观测的最小、最大值之间
+            estimate = reducer.quantile(k, p)
+            assert (stacked.min(axis=0) <= estimate).all() and (estimate <= stacked.max(axis=0)).all()
+
+
+def test_single_replicate_has_zero_std(histories):
+    reducer = ReplicationReducer(15)
+    reducer.update(histories[0])
+    assert not reducer.std("avg_quality").any()
+    assert len(reducer.to_rows()) == 15
@@ -0,0 +1,31 @@
+import dataclasses
+
+import pytest
+
+from housing_market_sim.resources import ICON_FILES, ICON_TITLES, TRANSLATIONS, get_bundle
+
+
+def test_bundle_is_built_once():
+    assert get_bundle() is get_bundle()
+
+
+def test_bundle_is_read_only():
+    bundle = get_bundle()
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        bundle.icons = {}
+    language = next(iter(bundle.translations))
+    for mapping in (bundle.icons, bundle.translations, bundle.translations[language], bundle.tooltips,
+                    bundle.static_recommendations):
+        with pytest.raises(TypeError):
+            mapping["new"] = "value"
+
+
+def test_icon_titles_are_formatted():
+    bundle = get_bundle()
+    assert set(bundle.icons) == set(ICON_FILES)
+    for language, strings in bundle.translations.items():
+        for key in ICON_TITLES:
+            assert strings[key] == TRANSLATIONS[language][key].format(**bundle.icons)
+            assert not any(f"{{{name}}}" in strings[key] for name in ICON_FILES)
+        untouched = set(strings) - set(ICON_TITLES)
+        assert all(strings[k] == TRANSLATIONS[language][k] for k in untouched)
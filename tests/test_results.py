@@ -0,0 +1,81 @@
+import sqlite3
+
+import pytest
+from conftest import assert_same_run
+
+from housing_market_sim.demography import Demography
+from housing_market_sim.params import SCENARIOS
+from housing_market_sim.policy import PolicySchedule
+from housing_market_sim.results import QUERY_COLUMNS, ResultStore, parse_filter, simulate_cached, stored_point_fn
+from housing_market_sim.sweep import run_point
+
+PARAMS = SCENARIOS["baseline_scenario"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(tmp_path / "runs.sqlite")
+    yield store
+    store.close()
+
+
+@pytest.mark.parametrize("options", [
+    {}, {"schedule": PolicySchedule({5: {"lr": 3.5}})}, {"grid_size": 30},
+    {"demography": Demography(exit_rate=0.02, target_population=250)},
+], ids=["plain", "schedule", "grid", "demography"])
+def test_round_trip(store, options):
+    first, hit = simulate_cached(store, PARAMS, 7, 200, 15, "vectorized", **options)
+    again, hit_again = simulate_cached(store, PARAMS, 7, 200, 15, "vectorized", **options)
+    assert (hit, hit_again) == (False, True)
+    assert_same_run(first, again)
+    assert again.summary() == first.summary()
+    assert again.grid_size == first.grid_size
+    assert bool(again.schedule) == bool(first.schedule)
+    assert again.demography == options.get("demography", Demography())
+
+
+def test_filtered_query(store):
+    for lr in (3.0, 5.0, 7.0):
+        simulate_cached(store, {**PARAMS, "lr": lr}, 1, 100, 5, "vectorized")
+    simulate_cached(store, {**PARAMS, "lr": 3.0}, 1, 100, 5, "vectorized", demography=Demography(exit_rate=0.1))
+    assert len(store) == 4
+    rows = store.query([("lr", "<", 6)], order_by="lr", descending=True)
+    assert [row["lr"] for row in rows] == [5.0, 3.0, 3.0]
+    rows = store.query([parse_filter("lr<=3"), parse_filter("exit_rate>0")])
+    assert len(rows) == 1 and rows[0]["exit_rate"] == 0.1
+    assert len(store.query([parse_filter("engine=vectorized")], limit=2)) == 2
+
+
+@pytest.mark.parametrize("text", ["lr<4; DROP TABLE runs", "key=1", "nope<1", "lr ~ 3", "lr<"])
+def test_invalid_filters_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse_filter(text)
+
+
+def test_query_checks_columns_and_operators(store):
+    with pytest.raises(ValueError):
+        store.query([("lr; DROP TABLE runs", "<", 1)])
+    with pytest.raises(ValueError):
+        store.query([("lr", "LIKE", 1)])
+    with pytest.raises(ValueError):
+        store.query(order_by="created; DROP TABLE runs")
+    assert "key" not in QUERY_COLUMNS
+
+
+def test_stored_point_matches_run_point(tmp_path):
+    task = (0, dict(PARAMS), 3, 100, 5, "vectorized")
+    point = stored_point_fn(tmp_path / "sweep.sqlite")
+    assert point(task) == run_point(task)
+    assert point(task) == run_point(task)  # 第二次从结果库读回
+    assert len(ResultStore(tmp_path / "sweep.sqlite")) == 1
+
+
+def test_old_database_gains_new_columns(tmp_path):
+    path = tmp_path / "old.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE runs (key TEXT PRIMARY KEY, engine TEXT, lr REAL)")
+    conn.commit()
+    conn.close()
+    store = ResultStore(path)
+    simulate_cached(store, PARAMS, 1, 100, 5, "vectorized")
+    assert len(store.query([("exit_rate", "=", 0)])) == 1
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from housing_market_sim.spatial import _RADIX_CELLS, ArrayGrid, SpatialIndex
+
+# (宽, 高)：小网格、恰好 2^16 格（基数排序路径的上限）、超过 2^16 格（比较排序路径），均含偶数边长
+GRIDS = [(16, 10), (7, 9), (256, 256), (300, 250)]
+
+
+def _torus_distance(a, b, size):
+    d = np.abs(a - b) % size
+    return np.minimum(d, size - d)
+
+
+def _agents(width, height, n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, width, n), rng.integers(0, height, n)
+
+
+def _probe_cells(width, height, seed=1):
+    rng = np.random.default_rng(seed)
+    corners = [(0, 0), (width - 1, 0), (0, height - 1), (width - 1, height - 1)]
+    return corners + list(zip(rng.integers(0, width, 20).tolist(), rng.integers(0, height, 20).tolist()))
+
+
+def _radii(width, height):
+    return sorted({0, 1, 2, width // 2, height // 2, max(width, height)})
+
+
+def test_grid_sizes_cover_both_sort_paths():
+    assert any(w * h == _RADIX_CELLS for w, h in GRIDS) and any(w * h > _RADIX_CELLS for w, h in GRIDS)
+
+
+@pytest.mark.parametrize("width,height", GRIDS)
+def test_cells_hold_their_agents_in_order(width, height):
+    x, y = _agents(width, height)
+    index = SpatialIndex(x, y, width, height)
+    np.testing.assert_array_equal(index.occupancy().sum(), x.size)
+    for cx, cy in _probe_cells(width, height):
+        expected = np.flatnonzero((x == cx) & (y == cy))
+        np.testing.assert_array_equal(index.cell(cx, cy), expected)  # 同格内保持原顺序
+    cells = y * width + x
+    assert (np.diff(cells[index.order]) >= 0).all()
+
+
+@pytest.mark.parametrize("width,height", GRIDS)
+def test_neighbors_match_brute_force(width, height):
+    x, y = _agents(width, height)
+    index = SpatialIndex(x, y, width, height)
+    for cx, cy in _probe_cells(width, height)[:8]:
+        for radius in _radii(width, height):
+            near = (_torus_distance(x, cx, width) <= radius) & (_torus_distance(y, cy, height) <= radius)
+            found = index.neighbors(cx, cy, radius)
+            assert found.size == np.unique(found).size  # 窗口绕回时每格只取一次
+            np.testing.assert_array_equal(np.sort(found), np.flatnonzero(near))
+            outer = index.neighbors(cx, cy, radius, include_center=False)
+            np.testing.assert_array_equal(np.sort(outer), np.flatnonzero(near & ~((x == cx) & (y == cy))))
+
+
+@pytest.mark.parametrize("width,height", GRIDS)
+def test_neighbor_counts_match_brute_force(width, height):
+    x, y = _agents(width, height)
+    index = SpatialIndex(x, y, width, height)
+    for radius in _radii(width, height):
+        counts = index.neighbor_counts(radius)
+        assert counts.shape == (height, width)
+        for cx, cy in _probe_cells(width, height):
+            near = (_torus_distance(x, cx, width) <= radius) & (_torus_distance(y, cy, height) <= radius)
+            assert counts[cy, cx] == near.sum(), (radius, cx, cy)
+
+
+def test_array_grid_tracks_moves_and_removals():
+    class Agent:
+        pass
+
+    grid = ArrayGrid(12, 8)
+    agents = [Agent() for _ in range(40)]
+    rng = np.random.default_rng(3)
+    for agent in agents:
+        grid.place_agent(agent, (int(rng.integers(0, 12)), int(rng.integers(0, 8))))
+    grid.move_agent(agents[0], (13, -1))  # 坐标折回网格内
+    assert agents[0].pos == (1, 7)
+    grid.remove_agent(agents[1])
+    for agent in agents[2:12]:
+        grid.move_agent(agent, (5, 5))
+    assert set(map(id, grid.get_cell_list_contents((5, 5)))) >= set(map(id, agents[2:12]))
+    alive = [a for a in agents if a.pos is not None]
+    for radius in (1, 4, 6):
+        expected = {id(a) for a in alive if a.pos != (5, 5)
+                    and _torus_distance(a.pos[0], 5, 12) <= radius and _torus_distance(a.pos[1], 5, 8) <= radius}
+        assert {id(a) for a in grid.get_neighbors((5, 5), radius=radius)} == expected
+    grid.place_agent(agents[1], (0, 0))  # 复用已释放的槽位
+    assert agents[1] in grid.get_cell_list_contents((0, 0))
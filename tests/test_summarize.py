@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from housing_market_sim.llm import SummaryCache
+from housing_market_sim.params import SCENARIOS
+from housing_market_sim.prompts import LANGUAGES, SUMMARY_ROLES, summary_data
+from housing_market_sim.simulation import simulate
+from housing_market_sim.summarize import MockBackend, load_progress, run_batch, summary_items
+
+PARAMS = SCENARIOS["baseline_scenario"]
+
+
+class FailingBackend:
+    """ 对指定请求抛出异常的后端 """
+    model = "mock"
+
+    def __init__(self, fail_messages):
+        self.fail_messages = fail_messages
+
+    async def complete(self, messages):
+        if json.dumps(messages) in self.fail_messages:
+            raise RuntimeError("upstream error")
+        return "ok"
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture(scope="module")
+def items():
+    runs = []
+    for run, lr in enumerate((3.0, 6.0)):
+        params = {**PARAMS, "lr": lr}
+        result = simulate(params, 1, 50, 5, engine="vectorized")
+        runs.append({"run": run, "params": params,
+                     "data": summary_data(params, result.history, result.final_state, 50)})
+    return list(summary_items(runs, model="mock"))
+
+
+def _rows(path):
+    return [json.loads(line) for line in open(path, encoding="utf-8")]
+
+
+def test_rerun_skips_finished_items(items, tmp_path):
+    out = tmp_path / "summaries.jsonl"
+    first = run_batch(items, MockBackend(tokens=8), out, concurrency=4)
+    assert len(items) == 2 * len(LANGUAGES) * len(SUMMARY_ROLES)
+    assert first == {"total": len(items), "skipped": 0, "generated": len(items), "cached": 0, "failed": 0}
+    second = run_batch(items, MockBackend(tokens=8), out)
+    assert second["skipped"] == len(items) and second["generated"] == 0
+    rows = _rows(out)
+    assert sorted(row["key"] for row in rows) == sorted(item["key"] for item in items)
+    assert load_progress(out) == {item["key"] for item in items}
+
+
+def test_failed_item_is_not_written_and_retried(items, tmp_path):
+    out = tmp_path / "summaries.jsonl"
+    failing = items[1]
+    stats = run_batch(items, FailingBackend({json.dumps(failing["messages"])}), out)
+    assert stats["failed"] == 1 and stats["generated"] == len(items) - 1
+    assert failing["key"] not in load_progress(out)
+    stats = run_batch(items, FailingBackend(set()), out)  # 重跑只补上失败的一条
+    assert stats["skipped"] == len(items) - 1 and stats["generated"] == 1
+    assert len(_rows(out)) == len(items)
+
+
+def test_cache_is_shared_across_outputs(items, tmp_path):
+    cache = SummaryCache(tmp_path / "summaries.sqlite")
+    run_batch(items[:3], FailingBackend(set()), tmp_path / "a.jsonl", cache=cache)
+    stats = run_batch(items[:3], FailingBackend({json.dumps(item["messages"]) for item in items}),
+                      tmp_path / "b.jsonl", cache=cache)
+    assert stats["cached"] == 3 and stats["failed"] == 0
+    assert len(cache) == 3
+
+
+def test_load_progress_ignores_torn_last_line(tmp_path):
+    out = tmp_path / "summaries.jsonl"
+    assert load_progress(out) == set()
+    out.write_text('{"key": "a", "text": "x"}\n{"key": "b", "te', encoding="utf-8")
+    assert load_progress(out) == {"a"}
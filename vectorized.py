@@ -0,0 +1,397 @@
+import numpy as np
+
+from housing_market_sim.counters import tenure_counts
+from housing_market_sim.demography import DEFAULT_DEMOGRAPHY
+from housing_market_sim.log import RunEvents, get_logger
+from housing_market_sim.profiling import NULL_PROFILER
+from housing_market_sim.params import (
+    GRID_SIZE, GROUP_WEIGHTS, GROUPS, Q0, Q_pref, delta
+)
+from housing_market_sim.policy import PolicyContext
+from housing_market_sim.rng import make_generator
+from housing_market_sim.spatial import SpatialIndex, wrap
+
+logger = get_logger("vectorized")
+
+# 组别编码（与 GROUPS 顺序一致）
+HIGH, MIDDLE, LOW = 0, 1, 2
+
+# 按组别编码索引的初始房屋质量 / 租房质量区间（高收入不会租房）
+_HOUSE_Q_LO = np.array([4.0, 2.5, 0.5])
+_HOUSE_Q_HI = np.array([5.0, 4.0, 3.0])
+_RENT_Q_LO = np.array([0.0, 2.5, 0.5])
+_RENT_Q_HI = np.array([0.0, 5.0, 3.0])
+_OWN_PROB = np.array([1.0, 0.8, 0.6])
+
+# 代理属性列：(dtype, 空槽填充值)
+_AGENT_FIELDS = {
+    "group": (np.int8, 0),
+    "has_house": (bool, False),
+    "house_quality": (float, np.nan),
+    "rental_quality": (float, np.nan),
+    "is_new_home": (bool, False),
+    "pos_x": (np.int32, 0),
+    "pos_y": (np.int32, 0),
+}
+
+
+class VectorizedHousingMarketModel:
+    """
+    结构化数组（struct-of-arrays）版住房市场模型。
+    每个代理属性是一列 NumPy 数组，HousingMarketModel.step 中逐代理的循环改为批量数组运算，
+    用于 10^5–10^6 户规模的模拟。
+    与 Mesa 引擎统计意义上等价：按加入顺序遍历的阶段（高收入换新房、二手房挂牌）与原逻辑一致，
+    随机激活顺序下的逐户交错（挂牌与购房穿插、中低收入争抢同一房源）改为按批次处理。
+    """
+    engine = "vectorized"
+
+    def __init__(self, N, params, seed=None, demography=None, grid_size=GRID_SIZE):
+        self._setup(N, params, seed, demography, grid_size)
+        self._spawn(N)
+        # 与 Mesa 引擎一致：初始化时先执行一次 step
+        self.step()
+
+    def _setup(self, N, params, seed, demography, grid_size=GRID_SIZE):
+        """ 参数、随机数发生器、空的代理槽位与统计变量，供构造与从检查点恢复共用 """
+        self.num_agents = N  # 代理数量
+        self.policy = PolicyContext(params)  # 卖/买概率与新房供应量按组别预先计算
+        self.params = self.policy.params
+        self.width = self.height = grid_size  # 与 Mesa 引擎相同的周期性网格
+        self._index = None  # 按格的空间索引，位置变化后置为 None，查询时重建
+        self.rng = make_generator(seed)  # 由 (seed, stream) 派生，见 rng.py
+        self.demography = DEFAULT_DEMOGRAPHY if demography is None else demography
+        self.events = RunEvents(logger)
+        self.profiler = NULL_PROFILER  # 分阶段计时（simulate(profile=True) 时替换）
+
+        # 代理状态数组；house_quality / rental_quality 用 nan 表示“无”。
+        # 各列预分配 capacity 个槽位，self.group 等属性是前 n 个活跃槽位的视图；
+        # 退出的代理被压实移除，空出的尾部槽位留给后续新增代理复用，容量不足时按倍数扩容。
+        self._n = 0
+        self._slots = {name: np.full(self.demography.initial_capacity(N), fill, dtype=dtype)
+                       for name, (dtype, fill) in _AGENT_FIELDS.items()}
+        self._bind_views()
+
+        # 新房、二手房交易的统计变量
+        self.new_supply = 10  # 初始的新房供应量
+        self.new_home = 0
+        self.secondary_market = 0
+        self.rental_market_transactions = 0
+        self.released_houses = np.empty(0)  # 二手房挂牌队列（FIFO）
+        self.high_income_swaps = 0
+        self.upgrade_swaps = 0
+        self.current_step = 1
+
+    def set_params(self, params):
+        """ 更换政策参数（政策冲击 / 按步生效的政策路径），从下一次行动起生效 """
+        self.policy.update(params)
+        self.params = self.policy.params
+
+    # ---------- 检查点 ----------
+    _STATE_SCALARS = ("new_supply", "new_home", "secondary_market", "rental_market_transactions",
+                      "high_income_swaps", "upgrade_swaps", "current_step")
+
+    def state_dict(self):
+        """ 当前完整状态：代理数组、二手房队列、标量状态与随机数发生器状态 """
+        return {
+            "agents": self.snapshot(),
+            "released": self.released_houses.copy(),
+            "scalars": {k: int(getattr(self, k)) for k in self._STATE_SCALARS},
+            "events": dict(self.events.counts),
+            "rng": {"generator": self.rng.bit_generator.state},
+            "grid": {"width": self.width, "height": self.height},
+        }
+
+    @classmethod
+    def from_state(cls, state, params, seed=None, demography=None):
+        """ 由 state_dict() 重建模型（不重新初始化、不执行初始 step） """
+        agents = state["agents"]
+        n = int(agents["group"].size)
+        model = cls.__new__(cls)
+        model._setup(n, params, seed, demography, state.get("grid", {}).get("width", GRID_SIZE))
+        model._reserve(n)
+        for name, (dtype, _) in _AGENT_FIELDS.items():
+            model._slots[name][:n] = np.asarray(agents[name], dtype=dtype)
+        model._n = n
+        model._bind_views()
+        model.released_houses = np.array(state["released"], dtype=float)
+        for k, v in state["scalars"].items():
+            setattr(model, k, v)
+        model.events.counts.update(state.get("events", {}))
+        model.rng.bit_generator.state = state["rng"]["generator"]
+        return model
+
+    # ---------- 空间索引 ----------
+    def spatial_index(self):
+        """ 当前位置的按格索引（SpatialIndex，代理编号即数组下标）；位置不变时重复使用 """
+        if self._index is None:
+            self._index = SpatialIndex(self.pos_x, self.pos_y, self.width, self.height)
+        return self._index
+
+    # ---------- 代理增删 ----------
+    @property
+    def capacity(self):
+        return self._slots["group"].size
+
+    def _bind_views(self):
+        for name, buf in self._slots.items():
+            setattr(self, name, buf[:self._n])
+        self._index = None  # 代理增删后编号变化，空间索引需要重建
+
+    def _reserve(self, n):
+        """ 保证至少有 n 个槽位（几何扩容，摊还 O(1)） """
+        if n <= self.capacity:
+            return
+        new_capacity = max(n, 2 * self.capacity)
+        for name, (dtype, fill) in _AGENT_FIELDS.items():
+            buf = np.full(new_capacity, fill, dtype=dtype)
+            buf[:self._n] = self._slots[name][:self._n]
+            self._slots[name] = buf
+
+    def _draw_rental_quality(self, grp):
+        rental = np.round(self.rng.uniform(_RENT_Q_LO[grp], _RENT_Q_HI[grp]), 2)
+        rental[grp == HIGH] = np.nan
+        return rental
+
+    def _spawn(self, k):
+        """ 批量创建 k 个新代理并随机放置到网格中 """
+        rng = self.rng
+        grp = rng.choice(len(GROUPS), size=k, p=GROUP_WEIGHTS).astype(np.int8)
+        own = rng.random(k) < _OWN_PROB[grp]
+        quality = np.round(rng.uniform(_HOUSE_Q_LO[grp], _HOUSE_Q_HI[grp]), 2)
+        quality[~own] = np.nan
+        rental = self._draw_rental_quality(grp)
+        rental[own] = np.nan
+
+        n = self._n
+        self._reserve(n + k)
+        new = slice(n, n + k)
+        self._slots["group"][new] = grp
+        self._slots["has_house"][new] = own
+        self._slots["house_quality"][new] = quality
+        self._slots["rental_quality"][new] = rental
+        self._slots["is_new_home"][new] = False
+        self._slots["pos_x"][new] = rng.integers(0, self.width, k, dtype=np.int32)
+        self._slots["pos_y"][new] = rng.integers(0, self.height, k, dtype=np.int32)
+        self._n = n + k
+        self._bind_views()
+
+    def household_exits(self):
+        """ 每户以 exit_rate 的概率退出，有房者的房产挂牌进入二手市场；存活代理保持原有顺序 """
+        exit_rate = self.demography.exit_rate
+        if exit_rate <= 0:
+            return 0
+        leaving = self.rng.random(self._n) < exit_rate
+        k = int(leaving.sum())
+        if k:
+            sold = leaving & self.has_house
+            self.released_houses = np.concatenate([self.released_houses, self.house_quality[sold]])
+            keep = ~leaving
+            m = self._n - k
+            for name, (dtype, fill) in _AGENT_FIELDS.items():
+                buf = self._slots[name]
+                buf[:m] = buf[:self._n][keep]
+                buf[m:self._n] = fill
+            self._n = m
+            self._bind_views()
+        return k
+
+    # ---------- 代理行为（对应 HouseholdAgent.step） ----------
+    def _agent_phase(self):
+        """ 对应 schedule.step()：所有代理以批量方式执行一次行动 """
+        rng = self.rng
+        g, own, q = self.group, self.has_house, self.house_quality
+        n = g.size
+
+        # 房屋质量折旧
+        q[own] = np.maximum(1.0, q[own] * (1 - delta))
+        self.is_new_home[:] = False
+        released = [self.released_houses]
+
+        # 高收入群体换房：质量低于 4 且有新房供应时，卖旧买新（每户消耗一套新房）
+        cand = np.flatnonzero((g == HIGH) & own & (q < 4))
+        if self.new_supply > 0 and cand.size:
+            chosen = rng.permutation(cand)[:self.new_supply]
+            released.append(q[chosen])
+            q[chosen] = np.round(rng.uniform(4.5, 5, chosen.size), 2)
+            self.is_new_home[chosen] = True
+            self.new_supply -= chosen.size
+            self.new_home += chosen.size
+            self.high_income_swaps += chosen.size
+
+        # 中低收入群体置换（原逻辑即使无房也会挂出 house_quality，nan 在购房时被跳过）
+        idx = rng.permutation(np.flatnonzero((g != HIGH) & (rng.random(n) < 0.2)))
+        released.append(q[idx])
+        own[idx] = False
+        self.upgrade_swaps += idx.size
+
+        # 卖房决策
+        idx = rng.permutation(np.flatnonzero(own & (rng.random(n) < self.policy.p_sell[g])))
+        released.append(q[idx])
+        own[idx] = False
+        self.secondary_market += idx.size
+        queue = np.concatenate(released)
+
+        # 买房决策：高收入优先买新房，其余按随机顺序从挂牌队列头部取房
+        buyers = rng.permutation(np.flatnonzero(~own & (rng.random(n) < self.policy.p_buy[g])))
+        if self.new_supply > 0 and buyers.size:
+            take = np.flatnonzero(g[buyers] == HIGH)[:self.new_supply]
+            new_buyers = buyers[take]
+            q[new_buyers] = Q0
+            own[new_buyers] = True
+            self.is_new_home[new_buyers] = True
+            self.new_supply -= new_buyers.size
+            self.new_home += new_buyers.size
+            buyers = np.delete(buyers, take)
+        m = min(buyers.size, queue.size)
+        popped, queue = queue[:m], queue[m:]
+        ok = popped > Q_pref  # nan 比较结果为 False
+        got = buyers[:m][ok]
+        q[got] = popped[ok]
+        own[got] = True
+        high_got = int((g[got] == HIGH).sum())
+        self.high_income_swaps += high_got
+        self.upgrade_swaps += got.size - high_got
+        self.new_home += got.size
+        self.released_houses = queue
+
+        # 代理迁移逻辑（周期性边界）
+        move = np.flatnonzero(rng.random(n) < 0.2)
+        self.pos_x[move], self.pos_y[move] = wrap(self.pos_x[move] + rng.integers(-1, 2, move.size),
+                                                  self.pos_y[move] + rng.integers(-1, 2, move.size),
+                                                  self.width, self.height)
+        self._index = None
+
+        # 新变成租户的代理补上租房质量
+        need = np.flatnonzero(~own & (g != HIGH) & np.isnan(self.rental_quality))
+        self.rental_quality[need] = self._draw_rental_quality(g[need])
+
+    # ---------- 模型步进（对应 HousingMarketModel.step） ----------
+    def step(self):
+        """ 执行每个时间步的市场更新 """
+        prof = self.profiler
+        prof.start()
+        self._agent_phase()
+        prof.lap("agents")
+        prof.count("agents_activated", self._n)
+        self.current_step += 1
+        rng = self.rng
+        g, own, q = self.group, self.has_house, self.house_quality
+
+        # 统计租赁市场交易：没有房产的低收入和中等收入群体
+        self.rental_market_transactions += int((~own & (g != HIGH)).sum())
+
+        # 统计重置
+        self.new_home = 0
+        self.secondary_market = 0
+        self.high_income_swaps = 0
+        self.upgrade_swaps = 0
+
+        # 根据市场需求调整新房供应量
+        self.new_supply = self.policy.new_supply
+        logger.debug("step %d new supply %d", self.current_step, self.new_supply)
+        prof.lap("supply")
+
+        # 高收入代理的换房与买新房：按加入顺序依次消耗新房供应
+        cand = np.flatnonzero((g == HIGH) & (~own | (q < 4.5)))[:self.new_supply]
+        sellers = cand[own[cand]]
+        released = [q[sellers]]
+        self.high_income_swaps += sellers.size
+        q[cand] = np.round(rng.uniform(4.5, 5, cand.size), 2)
+        own[cand] = True
+        self.is_new_home[cand] = True
+        self.new_supply -= cand.size
+        self.new_home += cand.size
+
+        prof.lap("new_homes")
+
+        # 二手房挂牌与置换（按加入顺序挂牌）
+        n = g.size
+        r = rng.random(n)
+        high_rel = own & (g == HIGH) & (r < 0.8)
+        low_mid_rel = own & (g != HIGH) & (r < 0.3)
+        idx = np.flatnonzero(high_rel | low_mid_rel)
+        released.append(q[idx])
+        own[idx] = False
+        self.high_income_swaps += int(high_rel.sum())
+        self.upgrade_swaps += int(low_mid_rel.sum())
+        pool = np.concatenate(released)
+
+        # 无房代理尝试购买：80% 高收入买新房，其余 20% 的中低收入进入二手房匹配
+        r = rng.random(n)
+        new_buyers = np.flatnonzero(~own & (g == HIGH) & (r < 0.8))[:self.new_supply]
+        q[new_buyers] = np.round(rng.uniform(4.5, 5, new_buyers.size), 2)
+        own[new_buyers] = True
+        self.new_supply -= new_buyers.size
+        self.new_home += new_buyers.size
+
+        # 质量上限更紧的低收入先匹配，再由中等收入在剩余房源中匹配
+        for code, quality_ceiling in ((LOW, 3), (MIDDLE, 4.5)):
+            buyers = np.flatnonzero(~own & (g == code) & (r >= 0.8))
+            eligible = np.flatnonzero(pool <= quality_ceiling)
+            k = min(buyers.size, eligible.size)
+            q[buyers[:k]] = pool[eligible[:k]]
+            own[buyers[:k]] = True
+            self.secondary_market += k
+            pool = np.delete(pool, eligible[:k])
+        self.released_houses = pool
+        prof.lap("secondary")
+        prof.count("new_home_matches", self.new_home)
+        prof.count("secondary_matches", self.secondary_market)
+
+        # 家庭退出后按稳态人口补足新增户数（缺省每步新增 5~10 户）
+        exited = self.household_exits()
+        prof.lap("exits")
+        lo, hi = self.demography.arrivals
+        arrivals = self.demography.arrivals_for(int(rng.integers(lo, hi + 1)), self._n)
+        self._spawn(arrivals)
+        prof.lap("spawn")
+        prof.count("spawned", arrivals)
+        prof.count("exited", exited)
+
+    def render_model(self):
+        """ 对应 HousingMarketModel.render_model 中额外的一次 schedule.step()（不渲染网格） """
+        self.profiler.start()
+        self._agent_phase()
+        self.profiler.lap("render")
+        self.profiler.count("agents_activated", self._n)
+
+    # ---------- 统计 ----------
+    def tenure_counts(self):
+        """ 返回 {(组别, 是否有房): 人数} """
+        return tenure_counts(self.group, self.has_house)
+
+    def snapshot(self):
+        """ 导出最终代理状态的数组快照（副本） """
+        return {
+            "group": self.group.copy(),
+            "has_house": self.has_house.copy(),
+            "house_quality": self.house_quality.copy(),
+            "rental_quality": self.rental_quality.copy(),
+            "is_new_home": self.is_new_home.copy(),
+            "pos_x": self.pos_x.copy(),
+            "pos_y": self.pos_y.copy(),
+        }
+
+    def step_statistics(self):
+        """ 与主循环中 Mesa 引擎记录的 history 字段一一对应的单步统计 """
+        c = self.tenure_counts()
+        owned_q = self.house_quality[self.has_house]
+        return {
+            "low_own": c[("low", True)],
+            "low_rent": c[("low", False)],
+            "mid_own": c[("middle", True)],
+            "mid_rent": c[("middle", False)],
+            "new_home_market": self.new_home,
+            "secondary_market": self.secondary_market,
+            "rental_market": c[("low", False)] + c[("middle", False)],
+            "high_income_swaps": self.high_income_swaps,
+            "upgrade_swaps": self.upgrade_swaps,
+            "avg_quality": float(owned_q.mean()) if owned_q.size else 0,
+            "low_quality_ratio": float((owned_q < 2.5).mean()) if owned_q.size else 0,
+            "supply": self.new_supply + self.secondary_market,
+            "demand": int((~self.has_house).sum()),
+            "pop_high": c[("high", True)] + c[("high", False)],
+            "pop_mid": c[("middle", True)] + c[("middle", False)],
+            "pop_low": c[("low", True)] + c[("low", False)],
+            "secondary_supply": self.secondary_market,
+        }